@@ -0,0 +1,12 @@
+"""Admin for the API app."""
+#pylint: disable = no-name-in-module
+from django.contrib import admin
+from api.models import OutboundMessage
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    """OutboundMessage Admin"""
+    #pylint: disable=protected-access
+    list_display = [f.name for f in OutboundMessage._meta.fields if f.name != 'payload']
+    list_filter = ['status', 'lane']
+    search_fields = ['recipient', 'upstream_reference']
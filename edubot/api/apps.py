@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        # Compile ACTION_TABLE at startup so a broken transition fails the boot,
+        # not the first user who reaches it.
+        # pylint: disable=import-outside-toplevel,unused-import
+        from services import state_machine  # noqa: F401
+        # Connect the signals that invalidate the course catalog snapshot,
+        # the course content manifests and the rendered tutorial steps.
+        from services import catalog, manifest, step_cache  # noqa: F401
@@ -0,0 +1,62 @@
+"""Measure the per-turn cost of resolving a message to its handler."""
+# pylint: disable=import-error
+import time
+from django.core.management.base import BaseCommand
+from services import intent_router, state_machine
+
+# (message, state in the session) pairs covering every resolution path.
+SAMPLES = (
+    ("menu", None),
+    ("Hi", "profile"),
+    ("back", "courses"),
+    ("profile", ["enroll", "courses", "assignments", "payments", "profile", "about", "help"]),
+    ("I have paid for the course and I want to join the class MATH101", "payments"),
+    ("Cancel payment", "payments"),
+    ("handle_payment", "menu"),
+    ("Tendai", "register"),
+    ("next_step", "courses"),
+    ("what is the answer to question 3?", "courses"),
+)
+
+
+def resolve(body, state):
+    """The state machine work ActionPickerService does for one turn, without I/O."""
+    route = intent_router.route(body)
+    state = route.state or state
+    if not route.back and route.menu:
+        state = "menu"
+    if isinstance(state, list) and route.text in state:
+        state = route.text
+    transition = state_machine.transition(state or "menu")
+    return transition.handler if transition else None
+
+
+class Command(BaseCommand):
+    """Time state resolution and handler lookup."""
+
+    help = "Microbenchmark of resolving a message to its ACTION_TABLE handler, per turn."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--turns", type=int, default=200000)
+
+    def handle(self, *args, **options):
+        turns = options["turns"]
+        started = time.perf_counter()
+        compiled = state_machine.compile_table(state_machine.ACTION_TABLE)
+        compile_time = time.perf_counter() - started
+        started = time.perf_counter()
+        for index in range(turns):
+            resolve(*SAMPLES[index % len(SAMPLES)])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"States       {len(compiled)}")
+        self.stdout.write(f"Compile      {compile_time * 1e6:.0f}us")
+        self.stdout.write(f"Turns        {turns}")
+        self.stdout.write(f"Per turn     {elapsed / turns * 1e9:.0f}ns")
+        text = " ".join(body for body, _ in SAMPLES).lower()
+        started = time.perf_counter()
+        for _ in range(turns // 10):
+            intent_router.route(text)
+        self.stdout.write(
+            f"Route        {(time.perf_counter() - started) / (turns // 10) * 1e9:.0f}ns "
+            f"for a {len(text)} character message, "
+            f"{len(intent_router.ROUTER.keywords)} keywords")
@@ -0,0 +1,57 @@
+"""Compare the session codecs on the sessions currently in Redis."""
+# pylint: disable=import-error
+import time
+from django.core.management.base import BaseCommand
+from django_redis import get_redis_connection
+from services.session_codec import codec, decode
+from services.session_store import session_pattern
+
+
+class Command(BaseCommand):
+    """Measure session size and encode/decode time per codec."""
+
+    help = (
+        "Load up to --users live session hashes and report, for pickle, msgpack "
+        "and msgpack+zlib, the bytes stored per active user and the time to "
+        "encode and decode one user's session."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000,
+                            help="Sessions sampled from Redis.")
+        parser.add_argument("--rounds", type=int, default=20,
+                            help="Encode/decode passes over the sample.")
+
+    def handle(self, *args, **options):
+        connection = get_redis_connection("default")
+        sample = []
+        for key in connection.scan_iter(match=session_pattern(), count=500):
+            sample.append({field: decode(raw) for field, raw in connection.hgetall(key).items()})
+            if len(sample) >= options["users"]:
+                break
+        if not sample:
+            self.stdout.write("No sessions in Redis to measure.")
+            return
+        self.stdout.write(f"Sessions     {len(sample)}")
+        self.stdout.write(f"{'codec':<14}{'bytes/user':>12}{'encode us':>12}{'decode us':>12}")
+        for label, candidate in (
+            ("pickle", codec("pickle")),
+            ("msgpack", codec("msgpack", compress_threshold=0)),
+            ("msgpack+zlib", codec("msgpack")),
+        ):
+            encoded = [[candidate.encode(value) for value in fields.values()] for fields in sample]
+            size = sum(len(raw) for fields in encoded for raw in fields) / len(sample)
+            started = time.perf_counter()
+            for _ in range(options["rounds"]):
+                for fields in sample:
+                    for value in fields.values():
+                        candidate.encode(value)
+            encode_time = (time.perf_counter() - started) / options["rounds"] / len(sample)
+            started = time.perf_counter()
+            for _ in range(options["rounds"]):
+                for fields in encoded:
+                    for raw in fields:
+                        decode(raw)
+            decode_time = (time.perf_counter() - started) / options["rounds"] / len(sample)
+            self.stdout.write(
+                f"{label:<14}{size:>12.0f}{encode_time * 1e6:>12.1f}{decode_time * 1e6:>12.1f}")
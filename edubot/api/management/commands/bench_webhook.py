@@ -0,0 +1,98 @@
+"""Load test a chatbot webhook endpoint."""
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+from django.core.management.base import BaseCommand
+
+
+def text_message(phone_number, body):
+    """Build a Cloud API text message webhook."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "bench",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "bench", "phone_number_id": "bench"},
+                    "contacts": [{"profile": {"name": "Bench"}, "wa_id": phone_number}],
+                    "messages": [{
+                        "from": phone_number,
+                        "id": f"wamid.bench.{uuid.uuid4().hex}",
+                        "timestamp": str(int(time.time())),
+                        "type": "text",
+                        "text": {"body": body},
+                    }],
+                },
+            }],
+        }],
+    }
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted sample list."""
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+class Command(BaseCommand):
+    """Fire concurrent synthetic webhooks at a running server."""
+
+    help = (
+        "Benchmark a webhook endpoint, e.g. the WSGI /api/v1/webhook/ under gunicorn "
+        "against /api/v1/async/webhook/ under uvicorn. Point GRAPH_API_URL of the "
+        "server under test at a stub so no real messages are sent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Webhook URL of the server under test.")
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--phones", type=int, default=200,
+                            help="Distinct simulated users.")
+        parser.add_argument("--body", default="menu")
+
+    def handle(self, *args, **options):
+        latencies, errors, elapsed = asyncio.run(self.run(options))
+        latencies.sort()
+        done = len(latencies)
+        self.stdout.write(f"URL          {options['url']}")
+        self.stdout.write(f"Requests     {done} ok, {errors} failed")
+        self.stdout.write(f"Concurrency  {options['concurrency']}")
+        self.stdout.write(f"Elapsed      {elapsed:.2f}s")
+        self.stdout.write(f"Throughput   {done / elapsed:.1f} req/s")
+        if latencies:
+            self.stdout.write(f"Latency mean {statistics.mean(latencies) * 1000:.1f}ms")
+            for label, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                self.stdout.write(
+                    f"Latency {label}  {percentile(latencies, fraction) * 1000:.1f}ms")
+
+    async def run(self, options):
+        """Send the requests, keeping ``concurrency`` of them in flight."""
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies = []
+        errors = 0
+        limits = httpx.Limits(max_connections=options["concurrency"])
+
+        async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+            async def fire(index):
+                nonlocal errors
+                phone_number = f"2637{index % options['phones']:08d}"
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(
+                            options["url"], json=text_message(phone_number, options["body"]))
+                        response.raise_for_status()
+                    except httpx.HTTPError:
+                        errors += 1
+                        return
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(fire(index) for index in range(options["requests"])))
+            elapsed = time.perf_counter() - started
+        return latencies, errors, elapsed
@@ -0,0 +1,37 @@
+"""Send the WhatsApp messages waiting in the outbox."""
+# pylint: disable=import-error
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from services.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    """Drain the outbox."""
+
+    help = "Deliver pending OutboundMessage rows through the pooled Graph sender."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50,
+                            help="Messages claimed and sent per batch.")
+        parser.add_argument("--interval", type=float, default=1.0,
+                            help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument("--once", action="store_true",
+                            help="Drain what is due now and exit.")
+
+    def handle(self, *args, **options):
+        self.running = True
+
+        def stop(*args):
+            self.running = False
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        while self.running:
+            close_old_connections()
+            sent = dispatch_batch(options["batch_size"])
+            if options["once"] and not sent:
+                break
+            if not sent:
+                time.sleep(options["interval"])
@@ -0,0 +1,46 @@
+"""Rewrite stored chat sessions in the configured session codec."""
+# pylint: disable=import-error
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_redis import get_redis_connection
+from services.session_codec import decode, encode, is_current
+from services.session_store import session_pattern
+
+
+class Command(BaseCommand):
+    """Re-encode every session hash."""
+
+    help = (
+        "Re-encode the fields of every session hash with SESSION_CODEC. "
+        "Sessions are readable in any format, so this only saves memory sooner "
+        "than the users' next turns would; it is safe to run while the bot serves."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Keys fetched per SCAN.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report the savings without writing.")
+
+    def handle(self, *args, **options):
+        connection = get_redis_connection("default")
+        sessions = rewritten = before = after = 0
+        for key in connection.scan_iter(match=session_pattern(), count=options["batch_size"]):
+            sessions += 1
+            fields = connection.hgetall(key)
+            stale = {}
+            for field, raw in fields.items():
+                before += len(raw)
+                if is_current(raw):
+                    after += len(raw)
+                    continue
+                stale[field] = encode(decode(raw))
+                after += len(stale[field])
+            if stale and not options["dry_run"]:
+                # HSET keeps the hash's TTL; a field the user's turn rewrote
+                # meanwhile is simply re-encoded from its newer value next run.
+                connection.hset(key, mapping=stale)
+            rewritten += bool(stale)
+        self.stdout.write(f"Codec        {settings.SESSION_CODEC}")
+        self.stdout.write(f"Sessions     {sessions} scanned, {rewritten} re-encoded")
+        self.stdout.write(f"Bytes        {before} -> {after}")
@@ -0,0 +1,40 @@
+"""Copy changed chat sessions into User.ongoing_session."""
+# pylint: disable=import-error
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from services.session_store import persist_batch
+
+
+class Command(BaseCommand):
+    """Write sessions behind to Postgres."""
+
+    help = (
+        "Snapshot the sessions changed since the last pass into User.ongoing_session, "
+        "from where they are rehydrated if Redis loses them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200,
+                            help="Sessions written per bulk update.")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds to sleep when no session changed.")
+        parser.add_argument("--once", action="store_true",
+                            help="Persist what has changed now and exit.")
+
+    def handle(self, *args, **options):
+        self.running = True
+
+        def stop(*args):
+            self.running = False
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        while self.running:
+            close_old_connections()
+            persisted = persist_batch(options["batch_size"])
+            if options["once"] and not persisted:
+                break
+            if not persisted:
+                time.sleep(options["interval"])
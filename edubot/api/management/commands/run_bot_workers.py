@@ -0,0 +1,66 @@
+"""Run the consumers that drain the webhook queue."""
+# pylint: disable=import-error
+import multiprocessing
+import signal
+import socket
+from django.core.management.base import BaseCommand
+from django.db import connections
+from services.message_queue import WebhookQueueConsumer
+
+
+def run_consumer(name, options):
+    """Entry point of a single worker process."""
+    consumer = WebhookQueueConsumer(
+        name=name,
+        batch_size=options["batch_size"],
+        block_ms=options["block"],
+        claim_idle_ms=options["claim_idle"],
+    )
+    signal.signal(signal.SIGTERM, consumer.stop)
+    signal.signal(signal.SIGINT, consumer.stop)
+    consumer.run()
+
+
+class Command(BaseCommand):
+    """Start webhook queue consumers."""
+
+    help = "Consume queued WhatsApp webhooks from the Redis stream."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Number of consumer processes to start on this node.")
+        parser.add_argument("--name", default=socket.gethostname(),
+                            help="Consumer name prefix, unique per node.")
+        parser.add_argument("--batch-size", type=int, default=10,
+                            help="Entries fetched per read.")
+        parser.add_argument("--block", type=int, default=5000,
+                            help="Milliseconds to block waiting for new entries.")
+        parser.add_argument("--claim-idle", type=int, default=60000,
+                            help="Milliseconds before an unacknowledged entry is reclaimed.")
+
+    def handle(self, *args, **options):
+        if options["processes"] <= 1:
+            run_consumer(f"{options['name']}-0", options)
+            return
+
+        # Forked children must not share the parent's database connections.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=run_consumer,
+                args=(f"{options['name']}-{index}", options),
+                daemon=False,
+            ) for index in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} bot workers")
+
+        def shutdown(*args):
+            for worker in workers:
+                worker.terminate()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        for worker in workers:
+            worker.join()
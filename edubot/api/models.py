@@ -0,0 +1,54 @@
+"""Models for the API app."""
+import uuid
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundMessage(models.Model):
+    """
+    WhatsApp message in the outbox.
+
+    Code that changes state and notifies a user writes the message in the same
+    transaction as the change; `manage.py dispatch_outbox` sends it afterwards.
+    A message is either delivered or ends up Dead, it is never silently lost.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipient = models.CharField(max_length=255)
+    payload = models.JSONField()
+    lane = models.CharField(
+        max_length=20,
+        choices=(
+            ('interactive', 'Interactive'),
+            ('background', 'Background'),
+        ), default='background'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=(
+            ('Pending', 'Pending'),
+            ('Sent', 'Sent'),
+            ('Dead', 'Dead'),
+        ), default='Pending'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    upstream_reference = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """Unicode representation of OutboundMessage."""
+        return f"{self.recipient} {self.status}"
+
+    class Meta:
+        """Meta definition for OutboundMessage."""
+
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    @classmethod
+    def enqueue(cls, payload, lane='background'):
+        """Put a Graph message payload in the outbox, call inside the writer's transaction."""
+        return cls.objects.create(recipient=payload.get('to', ''), payload=payload, lane=lane)
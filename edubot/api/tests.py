@@ -0,0 +1,1367 @@
+"""Chat path Tests"""
+import asyncio
+import datetime
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from unittest import mock
+import httpx
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.http import JsonResponse
+from django.test import (
+    AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature,
+)
+from django.utils import timezone
+from rest_framework.test import APIClient
+from django_redis import get_redis_connection
+from asgiref.sync import async_to_sync
+
+# pylint: disable = no-name-in-module
+from api.models import OutboundMessage
+from api.views import chatbot
+from courses.models import Course
+from material.models import CourseMaterial
+from users.models import User
+from tutorials.models import Lesson, Tutorial
+from services import (
+    catalog, circuit_breaker, dedupe, flows, http_client, identity, intent_router, mailbox, manifest, media,
+    message_queue, metrics, pager, outbox, rate_governor, senders, session_codec, session_store, state_machine,
+    step_cache, webhook_router,
+)
+
+
+def webhook(*messages):
+    """Cloud API webhook carrying ``(phone_number, timestamp, text)`` messages"""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "1", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "metadata": {"phone_number_id": "123"},
+            "contacts": [
+                {"wa_id": phone_number, "profile": {"name": "student"}}
+                for phone_number, _, _ in messages
+            ],
+            "messages": [
+                {"from": phone_number, "id": f"wamid.{timestamp}", "timestamp": str(timestamp),
+                 "type": "text", "text": {"body": text}}
+                for phone_number, timestamp, text in messages
+            ],
+        }}]}],
+    }
+
+
+def body(message):
+    """Text of a single-message webhook"""
+    return message["entry"][0]["changes"][0]["value"]["messages"][0]["text"]["body"]
+
+
+# Uploads made by the tests go here rather than into the tree's media folder.
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ChatTestCase(TestCase):
+    """A student in the course catalog"""
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the files the tests uploaded"""
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        """Create a student enrolled in one of two courses"""
+        self.user = User.objects.create_user(
+            phone_number="263770000000",
+            password="password",
+            username="student",
+            first_name="test",
+            last_name="student",
+            sex="FEMALE",
+            role="STUDENT",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(
+                name="Mathematics", code="MATH01", duration=3, description="Algebra")
+            Course.objects.create(
+                name="Physics", code="PHYS01", duration=3, description="Motion")
+        course.students.add(self.user)
+        self.user.enrolled_courses.add(course)
+        catalog.current()
+
+
+class TestIdentity(ChatTestCase):
+    """Per-turn identity map Test"""
+
+    def test_lookups_are_memoized(self):
+        """Each lookup is one query for the whole turn"""
+        with identity.turn(self.user.phone_number) as context:
+            with self.assertNumQueries(1):
+                self.assertTrue(context.users.exists())
+                self.assertIs(context.user, context.users.first())
+                self.assertEqual(context.users.count(), 1)
+            with self.assertNumQueries(1):
+                self.assertEqual(context.enrolled_codes, {"MATH01"})
+                self.assertEqual(context.enrolled_codes, {"MATH01"})
+            with self.assertNumQueries(1):
+                self.assertEqual(len(context.courses), 1)
+                self.assertEqual(context.courses.count(), 1)
+            with self.assertNumQueries(0):
+                course = context.course("MATH01")
+                self.assertIs(context.selected_course(
+                    {"data": {"selected_course": "MATH01"}}), course)
+            self.assertIs(identity.current(self.user.phone_number), context)
+
+    def test_profile_queries_the_user_once(self):
+        """The profile page is built from a single user query"""
+        handler = state_machine.transition("profile").handler
+        with identity.turn(self.user.phone_number):
+            with self.assertNumQueries(1):
+                response = handler(
+                    phone_number=self.user.phone_number,
+                    message="profile",
+                    session={"state": "profile", "data": None},
+                    payload={}
+                )
+        self.assertIn("test student", str(response["message"]))
+
+
+class TestCatalog(ChatTestCase):
+    """Course catalog snapshot Test"""
+
+    def test_enroll_menu_reads_the_snapshot(self):
+        """Enroll menus only query the user once the catalog is built"""
+        handler = state_machine.transition("enroll").handler
+        with identity.turn(self.user.phone_number):
+            # the user and the codes of their enrolled courses
+            with self.assertNumQueries(2):
+                response = handler(
+                    phone_number=self.user.phone_number,
+                    message="enroll",
+                    session={"state": "enroll", "data": None},
+                    payload={}
+                )
+        self.assertEqual(
+            [item["id"] for item in response["message"]["menu_items"]], ["PHYS01"])
+
+    def test_changes_rebuild_the_snapshot(self):
+        """Saving a course bumps the version and the next read rebuilds"""
+        version = catalog.current().version
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.filter(code="PHYS01").first().save()
+        snapshot = catalog.current()
+        self.assertGreater(snapshot.version, version)
+        self.assertEqual(snapshot.course("PHYS01").name, "Physics")
+
+
+class TestManifest(ChatTestCase):
+    """Course content manifest Test"""
+
+    def publish(self, count):
+        """Publish ``count`` tutorials in the student's course"""
+        course = Course.objects.get(code="MATH01")
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(count):
+                Tutorial.objects.create(
+                    published_by=self.user, course=course, published=True,
+                    title=f"Lesson {number}", description="x" * 80)
+        return course
+
+    def test_tutorial_pages_are_slices(self):
+        """Paging through tutorials runs no queries"""
+        course = self.publish(7)
+        self.assertEqual(len(manifest.for_course(course).tutorials), 7)
+        handler = flows.resolve("course_tutorials")
+        with identity.turn(self.user.phone_number) as context:
+            # my_courses has already looked up the user and their courses
+            users, courses = context.users, context.courses
+            with self.assertNumQueries(0):
+                response = handler(
+                    self.user.phone_number, "tutorials",
+                    {"state": "courses", "data": {"selected_course": "MATH01", "page": 1}},
+                    {}, users, courses)
+        rows = response["message"]["menu_items"]
+        self.assertEqual([row["name"] for row in rows[:5]], [f"Lesson {number}" for number in range(5)])
+        self.assertEqual(rows[0]["description"], "x" * 69 + "...")
+        self.assertEqual(rows[-1]["id"], pager.NEXT)
+
+    def test_material_pages_are_slices(self):
+        """The materials menu is paged from the manifest"""
+        course = Course.objects.get(code="MATH01")
+        with self.captureOnCommitCallbacks(execute=True):
+            materials = [CourseMaterial.objects.create(
+                title=f"Material {number}", description="notes", course=course,
+                file=ContentFile(b"x", name="notes.pdf")) for number in range(3)]
+        with identity.turn(self.user.phone_number) as context:
+            response = flows.resolve("course_material")(
+                self.user.phone_number, "materials",
+                {"state": "courses", "data": {"selected_course": "MATH01"}},
+                {}, context.users, context.courses)
+        self.assertEqual(
+            [row["id"] for row in response["message"]["menu_items"]],
+            [f"course_material_{material.id}" for material in materials])
+
+    def test_publishing_rebuilds_the_manifest(self):
+        """Publishing a tutorial bumps the course's version"""
+        course = self.publish(1)
+        before = manifest.for_course(course)
+        self.publish(1)
+        after = manifest.for_course(course)
+        self.assertGreater(after.version, before.version)
+        self.assertEqual(len(after.tutorials), 2)
+
+
+class TestPager(ChatTestCase):
+    """Keyset pager Test"""
+
+    def test_keyset_pages_walk_both_ways(self):
+        """Each page is one query and previous returns the same rows"""
+        for number in range(5):
+            Course.objects.create(
+                name=f"Course {number}", code=f"C{number}", duration=1, description="x")
+        paging = pager.Pager(Course.objects.all(), size=3, order=("code", "id"))
+        with self.assertNumQueries(1):
+            first = paging.page()
+        with self.assertNumQueries(1):
+            second = paging.page(first.cursor, pager.NEXT)
+        with self.assertNumQueries(1):
+            third = paging.page(second.cursor, pager.NEXT)
+        self.assertFalse(third.has_next)
+        self.assertEqual(
+            [course.code for page in (first, second, third) for course in page.items],
+            sorted(Course.objects.values_list("code", flat=True)))
+        back = paging.page(second.cursor, pager.PREVIOUS)
+        self.assertEqual(back.items, first.items)
+        self.assertEqual((back.number, back.has_previous), (1, False))
+
+
+class TestTutorialSteps(ChatTestCase):
+    """Positioned tutorial steps Test"""
+
+    def setUp(self):
+        """Publish a tutorial of three text steps"""
+        super().setUp()
+        self.tutorial = Tutorial.objects.create(
+            published_by=self.user, course=Course.objects.get(code="MATH01"),
+            published=True, title="Limits", description="Limits")
+        for number in range(3):
+            self.tutorial.append_step(Lesson.objects.create(
+                title=f"Step {number}", instructions="x", tutorial_class=self.tutorial))
+
+    def play(self, message, session):
+        """Send ``message`` to the tutorials flow"""
+        with identity.turn(self.user.phone_number) as context:
+            return flows.resolve("course_tutorials")(
+                self.user.phone_number, message, session, {}, context.users, context.courses)
+
+    def test_next_step_is_one_row_lookup(self):
+        """Stepping forward reads the step and the step count in one query"""
+        session = {"state": "courses", "data": {
+            "selected_course": "MATH01", "tutorial_stage": "ongoing_tutorial",
+            "selected_tutorial": str(self.tutorial.id), "step_position": 1}}
+        with self.assertNumQueries(1):
+            step = Lesson.step(self.tutorial.id, 2)
+            self.assertEqual(step.tutorial_class.step_count, 3)
+        response = self.play("tutorial_next", session)
+        self.assertEqual(response["message"]["text"], "*Step 1*\n\nx")
+        self.assertFalse(response["is_last_step"])
+        response = self.play("tutorial_next", session)
+        self.assertTrue(response["is_last_step"])
+        self.assertIn("The End", self.play("tutorial_next", session)["message"]["text"])
+
+    def test_reorder_and_remove_renumber_the_steps(self):
+        """Reordering and removing keep positions dense and the count in step"""
+        ids = [lesson.id for lesson in self.tutorial.ordered_steps()]
+        self.assertFalse(self.tutorial.reorder_steps(ids[:2]))
+        self.assertTrue(self.tutorial.reorder_steps(ids[::-1]))
+        self.assertEqual([lesson.id for lesson in self.tutorial.ordered_steps()], ids[::-1])
+        self.tutorial.remove_step(ids[1])
+        self.assertEqual(
+            list(self.tutorial.ordered_steps().values_list("id", "position")),
+            [(ids[2], 1), (ids[0], 2)])
+        self.assertEqual(Tutorial.objects.get(pk=self.tutorial.pk).step_count, 2)
+
+    def test_positions_are_unique(self):
+        """Two lessons cannot hold the same step of a tutorial"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Lesson.objects.create(
+                title="Copy", instructions="x", tutorial_class=self.tutorial, position=2)
+
+    def test_reassigned_lesson_moves_its_step(self):
+        """A lesson moved to another tutorial leaves a closed gap and becomes its last step"""
+        other = Tutorial.objects.create(
+            published_by=self.user, course=self.tutorial.course, title="Series", description="x")
+        other.append_step(Lesson.objects.create(
+            title="Step 0", instructions="x", tutorial_class=other))
+        ids = [lesson.id for lesson in self.tutorial.ordered_steps()]
+        tutor = User.objects.create_user(
+            phone_number="263770000001", password="password", username="tutor", role="TUTOR")
+        client = APIClient()
+        client.force_authenticate(tutor)
+        response = client.patch(
+            f"/dashboard/class/lessons/{ids[0]}/", {"tutorial_class": str(other.id)}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            list(self.tutorial.ordered_steps().values_list("id", "position")),
+            [(ids[1], 1), (ids[2], 2)])
+        self.assertEqual(
+            [position for _, position in other.ordered_steps().values_list("id", "position")], [1, 2])
+        self.assertEqual(other.ordered_steps().last().id, ids[0])
+        self.assertEqual(
+            [Tutorial.objects.get(pk=tutorial.pk).step_count for tutorial in (self.tutorial, other)],
+            [2, 2])
+
+    def test_next_step_is_served_warm(self):
+        """Serving a step queues the next one, which then needs no query"""
+        session = {"state": "courses", "data": {
+            "selected_course": "MATH01", "tutorial_stage": "select_tutorial"}}
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.play(str(self.tutorial.id), session)
+        self.assertEqual(len(callbacks), 1)
+        # what the prefetch thread runs once the turn is committed
+        step_cache.load(self.tutorial.id, step_cache.version(self.tutorial.id), 2)
+        with identity.turn(self.user.phone_number) as context:
+            users, courses = context.users, context.courses
+            with self.assertNumQueries(0):
+                response = flows.resolve("course_tutorials")(
+                    self.user.phone_number, "tutorial_next", session, {}, users, courses)
+        self.assertEqual(response["message"]["text"], "*Step 1*\n\nx")
+        self.assertEqual(session["data"]["step_position"], 2)
+
+
+@override_settings(BOT_QUEUE_STREAM="test:webhooks")
+class TestWebhookQueue(TestCase):
+    """Webhook stream Test"""
+
+    def setUp(self):
+        """Start from an empty stream"""
+        self.connection = get_redis_connection("default")
+        self.connection.delete("test:webhooks", "test:webhooks:dead")
+
+    def test_batch_is_one_entry(self):
+        """A batch is queued as one entry, in timestamp order"""
+        message_queue.enqueue_messages(list(webhook_router.split_messages(webhook(
+            ("263770000000", 2, "second"), ("263770000000", 1, "first")))))
+        entries = self.connection.xrange("test:webhooks")
+        self.assertEqual(len(entries), 1)
+        consumer = message_queue.WebhookQueueConsumer()
+        self.assertEqual(
+            [body(message) for message in consumer.messages(entries[0][1])], ["first", "second"])
+
+    def test_failures_are_dead_lettered_before_the_ack(self):
+        """A failed message goes to the dead-letter stream and the entry is acked after dispatch"""
+        handled = []
+
+        class Consumer(message_queue.WebhookQueueConsumer):
+            """Consumer whose chatbot fails on boom"""
+
+            @staticmethod
+            def handle(message):
+                if body(message) == "boom":
+                    raise RuntimeError("boom")
+                handled.append(body(message))
+
+        consumer = Consumer(block_ms=None)
+        consumer.ensure_group()
+        message_queue.enqueue_messages(list(webhook_router.split_messages(webhook(
+            ("263770000000", 1, "boom"), ("263770000001", 2, "fine")))))
+        for entry_id, fields in consumer.read():
+            self.assertEqual(self.connection.xpending("test:webhooks", consumer.group)["pending"], 1)
+            consumer.process(entry_id, fields)
+        self.assertEqual(handled, ["fine"])
+        self.assertEqual(self.connection.xpending("test:webhooks", consumer.group)["pending"], 0)
+        dead = self.connection.xrange("test:webhooks:dead")
+        self.assertEqual([body(message) for message in consumer.messages(dead[0][1])], ["boom"])
+
+
+    def test_busy_mailbox_requeues_the_rest_of_the_batch(self):
+        """Messages after a busy mailbox are queued again, the dispatched ones are not"""
+        handled = []
+
+        class Consumer(message_queue.WebhookQueueConsumer):
+            """Consumer whose second sender's mailbox is owned elsewhere"""
+
+            @staticmethod
+            def handle(message):
+                if body(message) == "busy":
+                    raise mailbox.MailboxBusy("owned")
+                handled.append(body(message))
+
+        consumer = Consumer(block_ms=None)
+        consumer.ensure_group()
+        message_queue.enqueue_messages(list(webhook_router.split_messages(webhook(
+            ("263770000000", 1, "first"), ("263770000001", 2, "busy"),
+            ("263770000002", 3, "third")))))
+        (entry_id, fields), = consumer.read()
+        consumer.process(entry_id, fields)
+        self.assertEqual(handled, ["first"])
+        self.assertEqual(self.connection.xpending("test:webhooks", consumer.group)["pending"], 0)
+        (_, requeued), = consumer.read()
+        self.assertEqual([body(message) for message in consumer.messages(requeued)], ["busy", "third"])
+
+
+class TestMailbox(TestCase):
+    """Per-phone mailbox Test"""
+
+    def setUp(self):
+        """Start from an empty mailbox"""
+        self.mailbox = mailbox.Mailbox("263770000000")
+        self.mailbox.connection.delete(self.mailbox.key, self.mailbox.processing)
+        self.messages = list(webhook_router.split_messages(webhook(
+            *[("263770000000", number, f"message {number}") for number in range(4)])))
+
+    def test_taken_messages_survive_a_dead_owner(self):
+        """Messages taken by an owner that died are dispatched by the next one, in order"""
+        self.mailbox.push(self.messages[0])
+        self.mailbox.push(self.messages[1])
+        self.assertEqual(len(self.mailbox.take()), 2)
+        # the owner dies here, before dispatching
+        self.mailbox.push(self.messages[2])
+        dispatched = []
+        mailbox.deliver(self.messages[3], lambda item: dispatched.append(body(item)))
+        self.assertEqual(dispatched, [f"message {number}" for number in range(4)])
+        self.assertEqual(self.mailbox.connection.llen(self.mailbox.processing), 0)
+
+
+    @override_settings(MAILBOX_LOCK_TIMEOUT=1)
+    def test_lost_lock_stops_the_drain_without_raising(self):
+        """A turn that outlives the lock stops draining and leaves the rest to the new owner"""
+        owner = mailbox.Mailbox("263770000000")
+        owner.connection.delete(owner.lock.name)
+        dispatched = []
+
+        def dispatch(item):
+            dispatched.append(body(item))
+            # the turn outlives the lock and another process takes the mailbox
+            owner.connection.delete(owner.lock.name)
+            owner.connection.set(owner.lock.name, "other")
+
+        self.mailbox.push(self.messages[0])
+        self.mailbox.push(self.messages[1])
+        before = metrics.counters().get("mailbox.lock_lost", 0)
+        mailbox.deliver(self.messages[2], dispatch)
+        self.assertEqual(dispatched, ["message 0"])
+        self.assertEqual(metrics.counters()["mailbox.lock_lost"], before + 1)
+        self.assertEqual(self.mailbox.connection.llen(self.mailbox.processing), 2)
+        # the queue consumer is told to queue its message again instead
+        owner.connection.delete(owner.lock.name)
+        with self.assertRaises(mailbox.MailboxBusy):
+            mailbox.deliver_now(self.messages[3], dispatch)
+        self.assertEqual(dispatched, ["message 0", "message 1"])
+        owner.connection.delete(owner.lock.name)
+
+
+class TestMetrics(TestCase):
+    """Buffered metrics Test"""
+
+    def test_batch_writes_when_it_ends(self):
+        """Metrics recorded in nested batches reach Redis when the outermost ends"""
+        before = metrics.counters().get("test.batched", 0)
+        with metrics.batch():
+            for _ in range(3):
+                metrics.incr("test.batched")
+            with metrics.batch():
+                metrics.incr("test.batched")
+                metrics.observe("test.latency", 0.01)
+            self.assertEqual(metrics.counters().get("test.batched", 0), before)
+        self.assertEqual(metrics.counters()["test.batched"], before + 4)
+        self.assertGreaterEqual(metrics.histograms()["test.latency"]["le_50"], 1)
+
+
+# Global intents as they were matched before the router: every phrase is tried
+# against the message and the last match wins.
+LEGACY_INTENTS = (
+    ("contains", "i have paid for the course and i want to join the class", "join_class"),
+    ("contains", "i have paid for the assignment", "join_class"),
+    ("contains", "cancel payment", "cancel_payment"),
+    ("equals", "handle_payment", "handle_payment"),
+)
+LEGACY_MENU_WORDS = frozenset(("menu", "hi", "hello", "hie", "reset"))
+
+
+def legacy_route(body):
+    """Route of ``body`` computed with the per-phrase matching"""
+    text = str(body).lower() if body is not None else ""
+    state = None
+    for kind, phrase, intent in LEGACY_INTENTS:
+        if (phrase in text) if kind == "contains" else (text == phrase):
+            state = intent
+    return intent_router.Route(
+        text=text, state=state, back=text == "back", menu=text in LEGACY_MENU_WORDS)
+
+
+class TestIntentRouter(TestCase):
+    """Global keyword routing Test"""
+
+    def test_overlapping_and_prefix_phrases(self):
+        """Every phrase is found, including phrases inside or sharing a prefix with others"""
+        automaton = intent_router.KeywordAutomaton()
+        for phrase in ("he", "she", "hers", "his"):
+            automaton.add(phrase, phrase)
+        automaton.build()
+        self.assertEqual(
+            sorted(automaton.scan("ushers his")),
+            [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers"), (7, 10, "his")])
+
+    def test_last_registered_phrase_wins(self):
+        """When several phrases match, the one registered last picks the state"""
+        router = intent_router.IntentRouter((
+            ("pay", "pay", False),
+            ("payment", "payment", False),
+        ))
+        self.assertEqual(router.route("payment please").state, "payment")
+        self.assertEqual(router.route("pay now").state, "pay")
+        router.register("pay", "late", False)
+        self.assertEqual(router.route("payment please").state, "late")
+
+    def test_whole_message_keywords_are_not_found_inside_words(self):
+        """Menu words and back only count as the whole message"""
+        for text in ("this", "hiking", "feedback", "go back", "menus", "hi there"):
+            route = intent_router.route(text)
+            self.assertFalse(route.menu, text)
+            self.assertFalse(route.back, text)
+        self.assertIsNone(intent_router.route("handle_payment now").state)
+        self.assertEqual(intent_router.route("Please CANCEL PAYMENTS").state, "cancel_payment")
+
+    def test_parity_with_per_phrase_matching(self):
+        """The router routes the menu words and phrases like the per-phrase matching did"""
+        messages = [
+            None, "", "1", "Menu", "HI", "hello", "hie", "reset", "back", "Back", "menu please",
+            "handle_payment", "Handle_Payment", "cancel payment", "I want to cancel payment now",
+            "I have paid for the course and I want to join the class",
+            "I have paid for the assignment",
+            "i have paid for the assignment, cancel payment",
+            "cancel payment. i have paid for the assignment",
+            "i have paid for the", "student@example.com",
+        ]
+        for message in messages:
+            self.assertEqual(intent_router.route(message), legacy_route(message), message)
+
+    def test_other_messages_fall_through_to_the_validators(self):
+        """Answers that are not keywords route nowhere and are left to the state validators"""
+        answers = {
+            "student@example.com": intent_router.EMAIL_ADDRESS,
+            "Tafadzwa": intent_router.LEGAL_NAME,
+            "2020-12-12 12:00": intent_router.DATE_TIME,
+            "12:00": intent_router.TIME,
+            "0771234567": intent_router.PHONE_NUMBER,
+        }
+        for text, validator in answers.items():
+            self.assertEqual(
+                intent_router.route(text),
+                intent_router.Route(text=text.lower(), state=None, back=False, menu=False))
+            self.assertTrue(validator.match(text), text)
+        self.assertFalse(intent_router.EMAIL_ADDRESS.match("menu"))
+
+
+@override_settings(
+    UPSTREAM_BULKHEADS={"test_upstream": 1}, CIRCUIT_FAILURE_THRESHOLD=2, CIRCUIT_COOLDOWN=30,
+    BULKHEAD_WAIT=0)
+class TestCircuitBreaker(TestCase):
+    """Upstream circuit breaker and bulkhead Test"""
+
+    def setUp(self):
+        """Start from a closed circuit"""
+        self.breaker = circuit_breaker.CircuitBreaker("test_upstream")
+        self.breaker.connection.delete(
+            self.breaker.key, self.breaker.probe_key, self.breaker.window_key())
+
+    def fail(self):
+        """Make one failing call through the guard"""
+        with self.assertRaises(RuntimeError):
+            with circuit_breaker.Guard("test_upstream"):
+                raise RuntimeError("upstream down")
+
+    def cool_down(self):
+        """Pretend the cooldown of the open circuit has elapsed"""
+        self.breaker.connection.hset(self.breaker.key, "opened_until", 1)
+
+    def test_circuit_opens_then_probes_then_closes(self):
+        """Failures open the circuit, one probe goes through after the cooldown and closes it"""
+        self.fail()
+        self.assertEqual(circuit_breaker.states()["test_upstream"]["state"], "closed")
+        self.fail()
+        self.assertEqual(circuit_breaker.states()["test_upstream"]["state"], "open")
+        with self.assertRaises(circuit_breaker.CircuitOpen):
+            with circuit_breaker.Guard("test_upstream"):
+                pass
+        self.cool_down()
+        self.assertEqual(circuit_breaker.states()["test_upstream"]["state"], "half-open")
+        with circuit_breaker.Guard("test_upstream"):
+            # only the probe is let through while it is in flight
+            with self.assertRaises(circuit_breaker.CircuitOpen):
+                circuit_breaker.CircuitBreaker("test_upstream").before_call()
+        self.assertEqual(
+            circuit_breaker.states()["test_upstream"], {"state": "closed", "failures": 0})
+
+    def test_failed_probe_reopens_the_circuit(self):
+        """A probe that fails opens the circuit for another cooldown"""
+        self.fail()
+        self.fail()
+        self.cool_down()
+        self.fail()
+        self.assertEqual(circuit_breaker.states()["test_upstream"]["state"], "open")
+        self.assertFalse(self.breaker.connection.exists(self.breaker.probe_key))
+
+    def check(self, status_code):
+        """Make one call through the guard that gets ``status_code``"""
+        with circuit_breaker.Guard("test_upstream") as guard:
+            guard.check(type("Response", (), {"status_code": status_code}))
+
+    def test_server_errors_count_as_failures(self):
+        """Responses passed to check with a 5xx status are failures, throttling is not"""
+        for status_code in (429, 429, 429, 503):
+            self.check(status_code)
+        self.assertEqual(
+            circuit_breaker.states()["test_upstream"], {"state": "closed", "failures": 1})
+        self.check(500)
+        self.assertEqual(circuit_breaker.states()["test_upstream"]["state"], "open")
+
+    def test_failures_age_out_with_their_window(self):
+        """Failures in an earlier window do not count, however close together they are"""
+        with mock.patch("services.circuit_breaker.time") as clock:
+            clock.time.return_value = 3000 * 30 + 29.0
+            self.breaker.connection.delete(self.breaker.window_key())
+            self.fail()
+            clock.time.return_value += 1
+            self.breaker.connection.delete(self.breaker.window_key())
+            self.fail()
+            self.assertEqual(
+                circuit_breaker.states()["test_upstream"], {"state": "closed", "failures": 1})
+            self.fail()
+            self.assertEqual(circuit_breaker.states()["test_upstream"]["state"], "open")
+            self.breaker.connection.delete(self.breaker.window_key())
+
+    def test_full_bulkhead_rejects_calls(self):
+        """Calls beyond the upstream's bulkhead fail fast and leave the circuit closed"""
+        with circuit_breaker.Guard("test_upstream"):
+            with self.assertRaises(circuit_breaker.BulkheadFull):
+                with circuit_breaker.Guard("test_upstream"):
+                    pass
+        with circuit_breaker.Guard("test_upstream"):
+            pass
+        self.assertEqual(
+            circuit_breaker.states()["test_upstream"], {"state": "closed", "failures": 0})
+
+
+def sent(message_id="wamid.sent"):
+    """Graph response to an accepted message"""
+    return httpx.Response(200, json={"messages": [{"id": message_id}]})
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3, OUTBOX_BASE_BACKOFF=5, OUTBOX_MAX_BACKOFF=15)
+class TestOutbox(TestCase):
+    """Outbox relay Test"""
+
+    def setUp(self):
+        """Queue one message"""
+        self.message = OutboundMessage.objects.create(
+            recipient="263770000000", payload={"to": "263770000000", "type": "text"})
+
+    def make_due(self):
+        """Pretend the message's backoff has elapsed"""
+        OutboundMessage.objects.filter(pk=self.message.pk).update(next_attempt_at=timezone.now())
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        """Retries wait exponentially longer, never more than OUTBOX_MAX_BACKOFF"""
+        self.assertEqual([outbox.retry_delay(attempts) for attempts in range(1, 5)], [5, 10, 15, 15])
+
+    def test_failures_are_retried_then_dead(self):
+        """A failing message is retried after its backoff and is Dead after the last attempt"""
+        with mock.patch("services.http_client.send_message", side_effect=httpx.ConnectError("down")):
+            before = timezone.now()
+            self.assertEqual(outbox.dispatch_batch(10), 1)
+            self.message.refresh_from_db()
+            self.assertEqual((self.message.status, self.message.attempts), ("Pending", 1))
+            self.assertGreaterEqual(self.message.next_attempt_at, before + datetime.timedelta(seconds=5))
+            # not due again until the backoff has elapsed
+            self.assertEqual(outbox.dispatch_batch(10), 0)
+            for _ in range(2):
+                self.make_due()
+                self.assertEqual(outbox.dispatch_batch(10), 1)
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), ("Dead", 3))
+        self.assertIn("down", self.message.last_error)
+        self.make_due()
+        self.assertEqual(outbox.dispatch_batch(10), 0)
+
+    def test_rejected_messages_are_dead_at_once(self):
+        """A 4xx that is not throttling is never retried, throttling is"""
+        rejected = httpx.Response(400, json={"error": {"code": 100}})
+        throttled = httpx.Response(429, headers={"retry-after": "1"})
+        with mock.patch("services.http_client.send_message", side_effect=[throttled, rejected]):
+            outbox.dispatch_batch(10)
+            self.message.refresh_from_db()
+            self.assertEqual(self.message.status, "Pending")
+            self.make_due()
+            outbox.dispatch_batch(10)
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), ("Dead", 2))
+
+    def test_retry_is_sent(self):
+        """A message that fails once is sent on its next attempt"""
+        with mock.patch(
+                "services.http_client.send_message",
+                side_effect=[httpx.Response(503), sent("wamid.retry")]) as send:
+            outbox.dispatch_batch(10)
+            self.make_due()
+            outbox.dispatch_batch(10)
+        self.message.refresh_from_db()
+        self.assertEqual(
+            (self.message.status, self.message.attempts, self.message.upstream_reference),
+            ("Sent", 2, "wamid.retry"))
+        send.assert_called_with(self.message.payload, lane="background")
+
+    def test_messages_are_leased_while_they_are_sent(self):
+        """A message being sent is not due for another dispatcher, and its outcome is saved"""
+        leased = []
+
+        def send(payload, lane):
+            leased.append(OutboundMessage.objects.get(pk=self.message.pk).next_attempt_at)
+            self.assertEqual(outbox.claim(10), [])
+            return sent()
+
+        with mock.patch("services.http_client.send_message", side_effect=send):
+            self.assertEqual(outbox.dispatch_batch(10), 1)
+        self.assertGreater(leased[0], timezone.now() + datetime.timedelta(seconds=60))
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, "Sent")
+
+    @override_settings(OUTBOX_LEASE=0)
+    def test_batch_past_half_its_lease_hands_messages_back(self):
+        """Messages a dispatcher has no lease left for are due again straight away"""
+        with mock.patch("services.http_client.send_message", return_value=sent()) as send:
+            self.assertEqual(outbox.dispatch_batch(10), 1)
+        send.assert_not_called()
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), ("Pending", 0))
+        self.assertLessEqual(self.message.next_attempt_at, timezone.now())
+
+    def test_rows_are_claimed_with_skip_locked(self):
+        """Dispatchers lock the rows they claim and skip the ones another holds"""
+        claim = mock.Mock(wraps=OutboundMessage.objects.select_for_update)
+        with mock.patch.object(OutboundMessage.objects, "select_for_update", claim), \
+                mock.patch("services.http_client.send_message", return_value=sent()):
+            outbox.dispatch_batch(10)
+        claim.assert_called_once_with(skip_locked=True)
+
+
+class TestOutboxConcurrency(TransactionTestCase):
+    """Outbox relays running side by side Test"""
+
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    def test_locked_rows_are_skipped(self):
+        """A dispatcher delivers the due messages another dispatcher has not claimed"""
+        claimed, free = [
+            OutboundMessage.objects.create(recipient=recipient, payload={"to": recipient})
+            for recipient in ("263770000000", "263770000001")]
+        delivered = []
+
+        def dispatch():
+            try:
+                delivered.append(outbox.dispatch_batch(10))
+            finally:
+                connection.close()
+
+        with mock.patch("services.http_client.send_message", return_value=sent()):
+            with transaction.atomic():
+                OutboundMessage.objects.select_for_update().get(pk=claimed.pk)
+                other = threading.Thread(target=dispatch)
+                other.start()
+                other.join()
+        self.assertEqual(delivered, [1])
+        self.assertEqual(OutboundMessage.objects.get(pk=claimed.pk).status, "Pending")
+        self.assertEqual(OutboundMessage.objects.get(pk=free.pk).status, "Sent")
+
+
+class TestSessionCodec(TestCase):
+    """Session field codec Test"""
+
+    value = {
+        "state": "menu",
+        "data": {"action": "tutorial_next", "step_position": 2, "payload": None},
+        "options": ["course_tutorials"] * 40,
+        "requested_at": datetime.datetime(2026, 1, 2, 3, 4, 5),
+    }
+
+    def test_round_trip(self):
+        """Every codec decodes what it encodes, compressing large msgpack values only"""
+        codecs = {
+            session_codec.PICKLE: session_codec.codec("pickle"),
+            session_codec.MSGPACK: session_codec.codec("msgpack", compress_threshold=0),
+            session_codec.MSGPACK_ZLIB: session_codec.codec("msgpack", compress_threshold=64),
+        }
+        for tag, codec in codecs.items():
+            raw = codec.encode(self.value)
+            self.assertEqual(raw[:1], tag)
+            self.assertEqual(session_codec.decode(raw), self.value)
+        small = session_codec.codec("msgpack", compress_threshold=64).encode("menu")
+        self.assertEqual((small[:1], session_codec.decode(small)), (session_codec.MSGPACK, "menu"))
+
+    @override_settings(SESSION_CODEC="msgpack")
+    def test_values_pickled_before_the_codec_are_read(self):
+        """Values django_redis pickled are decoded and reported as due for re-encoding"""
+        raw = pickle.dumps(self.value)
+        self.assertEqual(session_codec.decode(raw), self.value)
+        self.assertFalse(session_codec.is_current(raw))
+        self.assertTrue(session_codec.is_current(session_codec.encode(self.value)))
+
+    def test_legacy_json_session_starts_afresh(self):
+        """An ongoing_session saved before the versioned snapshots is not restored"""
+        User.objects.create_user(
+            phone_number="263770000009", password="password", username="legacy",
+            ongoing_session={"state": "menu", "data": {"action": "tutorial_next"}})
+        store = session_store.SessionStore("263770000009")
+        store.connection.delete(store.key)
+        self.assertEqual(store.load().fields, {})
+        self.assertIsNone(session_store.restore({}))
+
+    def test_snapshot_round_trip(self):
+        """A snapshot restores the encoded fields it was taken from"""
+        fields = {
+            session_store.STATE: session_codec.encode(self.value),
+            session_store.NAV: pickle.dumps("menu"),
+        }
+        history = [session_codec.encode({"state": "menu"})]
+        document = session_store.snapshot(fields, history, time.time() + 60)
+        self.assertEqual(session_store.restore(document), (fields, history))
+        with override_settings(SESSION_VERSION=document["version"] + 1):
+            self.assertIsNone(session_store.restore(document))
+
+
+class TestSessionRehydration(ChatTestCase):
+    """Sessions restored from User.ongoing_session Test"""
+
+    def setUp(self):
+        """Give the student a session with some history and snapshot it"""
+        super().setUp()
+        phone_number = self.user.phone_number
+        store = session_store.SessionStore(phone_number)
+        store.connection.delete(store.key, store.history_key)
+        with session_store.turn(phone_number):
+            session_store.put(phone_number, session_store.STATE, {"state": "courses"})
+            for state in ("menu", "courses", "course_tutorials"):
+                session_store.push_history(phone_number, {"state": state})
+        session_store.persist_batch(1000)
+        store.connection.delete(store.key, store.history_key)
+
+    def test_session_and_history_come_back(self):
+        """A session lost from Redis is restored with its history, so back still works"""
+        phone_number = self.user.phone_number
+        with session_store.turn(phone_number) as store:
+            self.assertEqual(store.get(session_store.STATE), {"state": "courses"})
+            self.assertEqual(session_store.pop_history(phone_number), {"state": "courses"})
+        self.assertTrue(get_redis_connection("default").exists(session_store.session_key(phone_number)))
+
+    def test_expired_session_is_not_revived(self):
+        """A snapshot whose session would have expired by now starts afresh"""
+        document = User.objects.get(pk=self.user.pk).ongoing_session
+        self.assertGreater(document["expires_at"], time.time())
+        document["expires_at"] = time.time() - 1
+        User.objects.filter(pk=self.user.pk).update(ongoing_session=document)
+        with session_store.turn(self.user.phone_number) as store:
+            self.assertIsNone(store.get(session_store.STATE))
+            self.assertIsNone(session_store.pop_history(self.user.phone_number))
+
+
+@override_settings(SESSION_HISTORY_LENGTH=3)
+class TestSessionHistory(TestCase):
+    """Navigation history Test"""
+
+    def setUp(self):
+        """Start the test number without a history"""
+        self.store = session_store.SessionStore("263770000009")
+        self.store.connection.delete(self.store.key, self.store.history_key)
+        self.addCleanup(self.store.connection.delete, self.store.key, self.store.history_key)
+
+    def visit(self, *states):
+        """Push a history entry per state, one flush per screen"""
+        for state in states:
+            self.store.push_history({"state": state})
+            self.store.flush()
+
+    def test_history_is_capped(self):
+        """Only the newest SESSION_HISTORY_LENGTH screens are kept"""
+        self.visit("menu", "courses", "course_tutorials", "tutorial", "quiz")
+        history = self.store.connection.lrange(self.store.history_key, 0, -1)
+        self.assertEqual(
+            [session_codec.decode(raw)["state"] for raw in history],
+            ["quiz", "tutorial", "course_tutorials"])
+
+    def test_back_stops_at_the_oldest_screen(self):
+        """Going back returns the previous screens and never pops the last entry"""
+        self.visit("menu", "courses", "course_tutorials")
+        self.assertEqual(self.store.pop_history(), {"state": "courses"})
+        self.assertEqual(self.store.pop_history(), {"state": "menu"})
+        self.assertIsNone(self.store.pop_history())
+        self.assertIsNone(self.store.pop_history())
+        self.assertEqual(
+            self.store.connection.lrange(self.store.history_key, 0, -1),
+            [session_codec.encode({"state": "menu"})])
+
+
+@override_settings(
+    GRAPH_SEND_RATE=1.0, GRAPH_SEND_BURST=3, GRAPH_SEND_INTERACTIVE_RESERVE=2,
+    GRAPH_THROTTLE_BACKOFF=5.0,
+    GRAPH_SEND_MAX_WAIT={"interactive": 2.0, "background": 0.5})
+class TestRateGovernor(TestCase):
+    """Graph send token bucket Test"""
+
+    def setUp(self):
+        """Start from a full bucket at a fixed time"""
+        self.governor = rate_governor.RateGovernor("test-number")
+        self.governor.connection.delete(self.governor.key, self.governor.pause_key)
+        self.now = 1000.0
+        self.clock = mock.patch("services.rate_governor.time")
+        clock = self.clock.start()
+        clock.time.side_effect = lambda: self.now
+        clock.monotonic.side_effect = lambda: self.now
+        clock.sleep.side_effect = self.sleep
+        self.addCleanup(self.clock.stop)
+
+    def sleep(self, seconds):
+        """Let ``seconds`` pass"""
+        self.now += seconds
+
+    def test_bucket_empties_and_refills(self):
+        """The burst is spent one token per send and comes back at the send rate"""
+        interactive = rate_governor.INTERACTIVE
+        self.assertEqual([self.governor.try_take(interactive) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.governor.try_take(interactive), 1.0)
+        self.now += 1
+        self.assertEqual(self.governor.try_take(interactive), 0)
+        self.now += 10
+        self.assertEqual([self.governor.try_take(interactive) for _ in range(4)], [0, 0, 0, 1.0])
+
+    def test_background_lane_leaves_the_reserve(self):
+        """Notifications stop while the reserve is left, replies can still use it"""
+        self.assertEqual(self.governor.try_take(rate_governor.BACKGROUND), 0)
+        self.assertEqual(self.governor.try_take(rate_governor.BACKGROUND), 1.0)
+        self.assertEqual(self.governor.try_take(rate_governor.INTERACTIVE), 0)
+        self.assertEqual(self.governor.try_take(rate_governor.INTERACTIVE), 0)
+        self.assertEqual(self.governor.try_take(rate_governor.INTERACTIVE), 1.0)
+
+    def test_acquire_waits_within_the_lanes_patience(self):
+        """A send waits for a token it can get in time and gives up on one it cannot"""
+        for _ in range(3):
+            self.governor.acquire()
+        self.governor.acquire()
+        self.assertEqual(self.now, 1001.0)
+        with self.assertRaises(rate_governor.RateLimited):
+            self.governor.acquire(rate_governor.BACKGROUND)
+
+    def test_backoff_pauses_every_lane(self):
+        """A throttled send pauses the bucket, and a shorter backoff does not cut the pause"""
+        self.governor.backoff(7)
+        self.governor.backoff(2)
+        self.assertEqual(self.governor.try_take(rate_governor.INTERACTIVE), 7.0)
+        self.now += 7
+        self.assertEqual(self.governor.try_take(rate_governor.INTERACTIVE), 0)
+
+    def test_throttle_delay(self):
+        """Only throttling answers ask for a pause, for retry-after or the default backoff"""
+        responses = [
+            (httpx.Response(200, json={}), None),
+            (httpx.Response(400, json={"error": {"code": 100}}), None),
+            (httpx.Response(500, text="down"), None),
+            (httpx.Response(429, headers={"retry-after": "7"}), 7.0),
+            (httpx.Response(429), 5.0),
+            (httpx.Response(400, json={"error": {"code": 130429}}), 5.0),
+            (httpx.Response(400, json={"error": {"code": 80007}}, headers={"retry-after": "3"}), 3.0),
+        ]
+        for response, delay in responses:
+            self.assertEqual(rate_governor.throttle_delay(response), delay, response)
+
+
+@override_settings(WEBHOOK_INGRESS_MODE="queue", BOT_QUEUE_STREAM="test:webhooks")
+class TestDedupe(TestCase):
+    """Webhook redelivery Test"""
+
+    def setUp(self):
+        """Forget the test messages and start from an empty stream"""
+        self.payload = webhook(("263770000000", 1, "first"), ("263770000001", 2, "second"))
+        self.messages = list(webhook_router.split_messages(self.payload))
+        connection = get_redis_connection("default")
+        connection.delete("test:webhooks", *[
+            dedupe.key(dedupe.message_id(message)) for message in self.messages])
+
+    def post(self):
+        """Deliver the webhook"""
+        return self.client.post("/api/v1/webhook/", self.payload, content_type="application/json")
+
+    def test_redelivery_is_dropped(self):
+        """A message is only fanned out the first time it arrives"""
+        self.assertFalse(dedupe.is_replay(self.messages[0]))
+        self.assertTrue(dedupe.is_replay(self.messages[0]))
+        self.assertEqual(len(webhook_router.fan_out(self.payload)), 1)
+        self.assertEqual(webhook_router.fan_out(self.payload), [])
+
+    def test_messages_that_failed_to_queue_are_accepted_again(self):
+        """A webhook that could not be queued is taken when Meta retries it"""
+        with mock.patch("api.views.chatbot.enqueue_messages", side_effect=ConnectionError("redis")):
+            with self.assertRaises(ConnectionError):
+                self.post()
+        self.assertEqual(self.post().json(), {"status": "queued", "messages": 2})
+        self.assertEqual(self.post().json(), {"status": "queued", "messages": 0})
+
+    @override_settings(WEBHOOK_INGRESS_MODE="inline")
+    def test_undelivered_messages_are_accepted_again(self):
+        """Messages after a failed delivery are released, those delivered are not"""
+        delivered = []
+
+        def deliver(message, dispatch):
+            if body(message) == "second":
+                raise ConnectionError("redis")
+            delivered.append(body(message))
+
+        with mock.patch("services.mailbox.deliver", side_effect=deliver):
+            with self.assertRaises(ConnectionError):
+                self.post()
+            self.assertEqual(delivered, ["first"])
+            delivered.clear()
+            with self.assertRaises(ConnectionError):
+                self.post()
+        self.assertEqual(delivered, [])
+        self.assertFalse(dedupe.is_replay(self.messages[1]))
+
+
+class TrackedStream(httpx.SyncByteStream):
+    """Response body that records whether it was closed"""
+
+    def __init__(self, content):
+        self.content = content
+        self.closed = False
+
+    def __iter__(self):
+        yield self.content
+
+    def close(self):
+        self.closed = True
+
+
+@override_settings(GRAPH_API_URL="https://graph.test", PHONE_NUMBER_IDS=["111"])
+class GraphTestCase(TestCase):
+    """Graph upstreams answered by a mock transport"""
+
+    def setUp(self):
+        """Route both Graph upstreams through a mock transport"""
+        self.requests = []
+        self.responses = []
+        transport = httpx.MockTransport(self.answer)
+        connection = get_redis_connection("default")
+        for upstream in (http_client.GRAPH_SEND, http_client.GRAPH_MEDIA):
+            breaker = circuit_breaker.CircuitBreaker(upstream)
+            connection.delete(breaker.key, breaker.probe_key, breaker.window_key())
+            key = (os.getpid(), upstream)
+            self.addCleanup(http_client._clients.pop, key, None)
+            http_client._clients[key] = httpx.Client(transport=transport)
+        connection.delete("edubot:ratelimit:111", "edubot:ratelimit:111:pause")
+        connection.hdel("edubot:senders", "263770000000")
+
+    def answer(self, request):
+        """Record the request and give the next queued response"""
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+
+class TestHttpClient(GraphTestCase):
+    """Pooled upstream client Test"""
+
+    def test_request(self):
+        """Requests go through the upstream's pool and server errors count against it"""
+        self.responses = [httpx.Response(200, json={"url": "https://cdn.test/1"}), httpx.Response(503)]
+        response = http_client.request(http_client.GRAPH_MEDIA, "GET", "https://graph.test/1")
+        self.assertEqual(response.json(), {"url": "https://cdn.test/1"})
+        self.assertEqual(http_client.request(http_client.GRAPH_MEDIA, "GET", "https://graph.test/1").status_code, 503)
+        self.assertEqual(circuit_breaker.states()[http_client.GRAPH_MEDIA]["failures"], 1)
+
+    def test_stream(self):
+        """A download stays open to be read, a failed one is closed straight away"""
+        body, failed = TrackedStream(b"%PDF"), TrackedStream(b"error")
+        self.responses = [httpx.Response(200, stream=body), httpx.Response(502, stream=failed)]
+        response = http_client.stream(http_client.GRAPH_MEDIA, "GET", "https://cdn.test/1")
+        self.assertFalse(body.closed)
+        self.assertEqual(b"".join(response.iter_bytes()), b"%PDF")
+        response.close()
+        self.assertTrue(body.closed)
+        self.assertEqual(
+            http_client.stream(http_client.GRAPH_MEDIA, "GET", "https://cdn.test/1").status_code, 502)
+        self.assertTrue(failed.closed)
+
+    def test_stream_closes_the_response_when_the_call_fails(self):
+        """An error once the response is open closes it before propagating"""
+        body = TrackedStream(b"%PDF")
+        self.responses = [httpx.Response(200, stream=body)]
+        with mock.patch.object(circuit_breaker.Guard, "check", side_effect=RuntimeError("check")):
+            with self.assertRaises(RuntimeError):
+                http_client.stream(http_client.GRAPH_MEDIA, "GET", "https://cdn.test/1")
+        self.assertTrue(body.closed)
+
+    def test_send_message(self):
+        """Messages are posted from the recipient's number and throttling pauses that number"""
+        self.responses = [httpx.Response(429, headers={"retry-after": "30"})]
+        response = http_client.send_message({"to": "263770000000", "type": "text"})
+        self.assertEqual(response.status_code, 429)
+        request, = self.requests
+        self.assertEqual(str(request.url), "https://graph.test/111/messages")
+        self.assertEqual(request.headers["authorization"], f"Bearer {http_client.settings.CLOUD_API_TOKEN}")
+        self.assertEqual(request.content, b"to=263770000000&type=text")
+        self.assertGreater(rate_governor.RateGovernor("111").try_take(rate_governor.INTERACTIVE), 25)
+
+    def test_clients_of_stopped_loops_are_closed(self):
+        """An event loop's AsyncClient is closed once a later loop asks for a client"""
+        async def current():
+            instance = http_client.async_client()
+            await asyncio.sleep(0)
+            return instance
+
+        first = asyncio.run(current())
+        self.assertFalse(first.is_closed)
+        second = asyncio.run(current())
+        self.assertTrue(first.is_closed)
+        self.assertNotIn(first, http_client._async_clients.values())
+        self.assertFalse(second.is_closed)
+
+
+@override_settings(WEBHOOK_INGRESS_MODE="inline")
+class TestAsyncWebhook(TransactionTestCase):
+    """ASGI webhook Test"""
+
+    def setUp(self):
+        """A registered student with no session"""
+        User.objects.create_user(
+            phone_number="263770000000", password="password", username="student",
+            first_name="test", last_name="student", role="STUDENT")
+        self.payload = webhook(("263770000000", 1, "menu"))
+        connection = get_redis_connection("default")
+        connection.delete(
+            session_store.session_key("263770000000"), session_store.history_key("263770000000"),
+            dedupe.key(dedupe.message_id(self.payload)))
+
+    def test_turn_runs_through_the_async_picker(self):
+        """A message posted to the async webhook is answered and moves the session"""
+        sent = httpx.Response(200, json={"messages": [{"id": "wamid.reply"}]})
+        with mock.patch("services.http_client.asend_message", return_value=sent) as send:
+            response = async_to_sync(AsyncClient().post)(
+                "/api/v1/async/webhook/", self.payload, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "success", "messages": 1})
+        (reply,), _ = send.call_args
+        self.assertEqual(reply["to"], "263770000000")
+        self.assertIsNotNone(session_store.get("263770000000", session_store.STATE))
+
+
+def status_webhook(*statuses):
+    """Cloud API webhook carrying ``(recipient, status)`` delivery receipts"""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "1", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "metadata": {"phone_number_id": "123"},
+            "statuses": [
+                {"id": f"wamid.{index}", "status": state, "recipient_id": recipient, "timestamp": "1"}
+                for index, (recipient, state) in enumerate(statuses)
+            ],
+        }}]}],
+    }
+
+
+class TestStatusFastLane(TestCase):
+    """Status callbacks Test"""
+
+    def test_classify(self):
+        """Bodies are told apart without parsing them twice"""
+        status = status_webhook(("263770000000", "read"))
+        mixed = webhook(("263770000000", 1, "hi"))
+        mixed["entry"][0]["changes"][0]["value"]["statuses"] = status["entry"][0]["changes"][0]["value"]["statuses"]
+        bare = {"status": "read", "recipient_id": "263770000000"}
+        bodies = [
+            (status, webhook_router.STATUS),
+            (bare, webhook_router.STATUS),
+            (mixed, webhook_router.MESSAGE),
+            (webhook(("263770000000", 1, "hi")), webhook_router.MESSAGE),
+            ({"object": "page"}, webhook_router.UNKNOWN),
+            ([1, 2], webhook_router.UNKNOWN),
+        ]
+        for payload, kind in bodies:
+            self.assertEqual(webhook_router.classify(json.dumps(payload).encode())[0], kind, payload)
+        self.assertEqual(webhook_router.classify(b"{not json"), (webhook_router.UNKNOWN, None))
+        self.assertEqual(webhook_router.statuses(bare), [bare])
+        self.assertEqual(
+            [event["status"] for event in webhook_router.statuses(
+                status_webhook(("263770000000", "sent"), ("263770000001", "read")))],
+            ["sent", "read"])
+
+    def test_statuses_skip_drf(self):
+        """A status callback is answered before the DRF view, a message reaches it"""
+        with mock.patch.object(
+                chatbot.CloudAPIWebhook, "post",
+                return_value=JsonResponse({"status": "view"})) as view:
+            response = self.client.post(
+                "/api/v1/webhook/", status_webhook(("263770000000", "delivered")),
+                content_type="application/json")
+            self.assertEqual(response.json(), {"status": "success"})
+            view.assert_not_called()
+            response = self.client.post(
+                "/api/v1/webhook/", webhook(("263770000000", 1, "hi")), content_type="application/json")
+            self.assertEqual(response.json(), {"status": "view"})
+            view.assert_called_once()
+
+    def test_failed_status_handler_still_answers(self):
+        """A status handler that fails is logged and counted, and the callback still gets a 200"""
+        handled = []
+
+        def on_status(event):
+            if event["recipient_id"] == "263770000000":
+                raise httpx.ConnectError("graph down")
+            handled.append(event["recipient_id"])
+
+        view = chatbot.status_fast_lane(mock.Mock(), on_status)
+        before = metrics.counters().get("webhook.status_failures", 0)
+        request = RequestFactory().post(
+            "/api/v1/navigation/",
+            json.dumps(status_webhook(("263770000000", "read"), ("263770000001", "read"))),
+            content_type="application/json")
+        self.assertEqual(view(request).status_code, 200)
+        self.assertEqual(handled, ["263770000001"])
+        self.assertEqual(metrics.counters()["webhook.status_failures"], before + 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestMedia(GraphTestCase):
+    """Lazy media handle Test"""
+
+    def setUp(self):
+        """Forget the test media's download URL"""
+        super().setUp()
+        cache.delete("media_url:media1")
+
+    def test_url_is_resolved_once(self):
+        """Handles of the same media ask Graph for its URL once and reuse it"""
+        self.responses = [httpx.Response(200, json={"url": "https://cdn.test/media1"})]
+        handle = media.MediaHandle("media1", "notes.pdf", "application/pdf")
+        self.assertEqual(self.requests, [])
+        self.assertEqual(handle, "media1")
+        self.assertEqual(handle.url, "https://cdn.test/media1")
+        self.assertEqual(media.MediaHandle("media1").url, "https://cdn.test/media1")
+        self.assertEqual([str(request.url) for request in self.requests], ["https://graph.test/media1"])
+
+    def test_download_streams_into_storage(self):
+        """The document is written chunk by chunk and the download closed after the last"""
+        body = TrackedStream(b"%PDF-1.4 notes")
+        self.responses = [
+            httpx.Response(200, json={"url": "https://cdn.test/media1"}),
+            httpx.Response(200, stream=body, headers={"content-type": "application/pdf"}),
+        ]
+        handle = media.MediaHandle("media1", "notes.pdf", "application/pdf")
+        upload = handle.open()
+        self.assertEqual((upload.name, upload.content_type), ("notes.pdf", "application/pdf"))
+        name = default_storage.save("materials/notes.pdf", upload)
+        self.addCleanup(default_storage.delete, name)
+        self.assertTrue(body.closed)
+        self.assertEqual(upload.size, len(b"%PDF-1.4 notes"))
+        with default_storage.open(name) as saved:
+            self.assertEqual(saved.read(), b"%PDF-1.4 notes")
+
+    def test_handle_survives_the_session(self):
+        """A handle read back from the session is the same media and still lazy"""
+        handle = media.MediaHandle("media1", "notes.pdf", "application/pdf")
+        restored = session_codec.decode(session_codec.encode({"file": handle}))["file"]
+        self.assertIsInstance(restored, media.MediaHandle)
+        self.assertEqual(
+            (restored.media_id, restored.filename, restored.mime_type),
+            ("media1", "notes.pdf", "application/pdf"))
+        self.assertEqual(self.requests, [])
+
+    def test_failed_download_is_closed(self):
+        """A download Graph refuses raises and gives its connection back"""
+        body = TrackedStream(b"gone")
+        self.responses = [
+            httpx.Response(200, json={"url": "https://cdn.test/media1"}),
+            httpx.Response(404, stream=body),
+        ]
+        with self.assertRaises(httpx.HTTPStatusError):
+            media.MediaHandle("media1").open()
+        self.assertTrue(body.closed)
+
+
+def arriving_on(phone_number_id, message):
+    """``message`` as delivered to the business number ``phone_number_id``"""
+    message["entry"][0]["changes"][0]["value"]["metadata"]["phone_number_id"] = phone_number_id
+    return message
+
+
+@override_settings(PHONE_NUMBER_IDS=["111", "222", "333"])
+class TestSenders(TestCase):
+    """Sender registry Test"""
+
+    phones = ("263770000001", "263770000002", "263770000003")
+
+    def setUp(self):
+        """Forget the test students' assignments"""
+        self.connection = get_redis_connection("default")
+        self.connection.hdel(senders.ASSIGNMENTS_KEY, *self.phones)
+
+    def assigned(self, phone_number):
+        """Number stored for ``phone_number``"""
+        sender = self.connection.hget(senders.ASSIGNMENTS_KEY, phone_number)
+        return sender and sender.decode()
+
+    def test_students_are_pinned_to_the_number_they_wrote_to(self):
+        """Each student is served from the number their message arrived on"""
+        senders.route_inbound([
+            arriving_on("222", webhook((self.phones[0], 1, "hi"))),
+            arriving_on("333", webhook((self.phones[1], 2, "hi"))),
+        ])
+        self.assertEqual(self.assigned(self.phones[0]), "222")
+        self.assertEqual(self.assigned(self.phones[1]), "333")
+        self.assertEqual(senders.sender_for(self.phones[0]), "222")
+
+    def test_latest_message_wins(self):
+        """A student who wrote to several numbers in one batch is served from the last"""
+        senders.route_inbound([
+            arriving_on("111", webhook((self.phones[0], 1, "hi"))),
+            arriving_on("333", webhook((self.phones[0], 2, "menu"))),
+            arriving_on("222", webhook((self.phones[0], 3, "1"))),
+        ])
+        self.assertEqual(self.assigned(self.phones[0]), "222")
+
+    def test_unknown_numbers_are_skipped(self):
+        """Messages to a number outside the registry leave the assignment alone"""
+        before = metrics.counters().get("senders.unknown_inbound", 0)
+        senders.route_inbound([
+            arriving_on("111", webhook((self.phones[0], 1, "hi"))),
+            arriving_on("999", webhook((self.phones[0], 2, "hi"), (self.phones[1], 3, "hi"))),
+        ])
+        self.assertEqual(self.assigned(self.phones[0]), "111")
+        self.assertIsNone(self.assigned(self.phones[1]))
+        self.assertEqual(metrics.counters()["senders.unknown_inbound"], before + 1)
+
+    def test_assignment_is_kept(self):
+        """A student keeps their number even when the registry grows"""
+        self.connection.hset(senders.ASSIGNMENTS_KEY, self.phones[0], "333")
+        with override_settings(PHONE_NUMBER_IDS=["111", "222", "333", "444"]):
+            self.assertEqual(senders.sender_for(self.phones[0]), "333")
+
+    def test_retired_number_is_reassigned(self):
+        """Students on a retired number move to a number still in the registry"""
+        self.connection.hset(senders.ASSIGNMENTS_KEY, self.phones[0], "999")
+        sender = senders.sender_for(self.phones[0])
+        self.assertEqual(sender, senders.default_sender(self.phones[0]))
+        self.assertIn(sender, ["111", "222", "333"])
+        self.assertEqual(self.assigned(self.phones[0]), sender)
+
+    def test_default_sender_is_stable(self):
+        """New students are spread by a hash that every process agrees on"""
+        for phone_number in self.phones:
+            expected = ["111", "222", "333"][zlib.crc32(phone_number.encode()) % 3]
+            self.assertEqual(senders.sender_for(phone_number), expected)
+            self.assertEqual(senders.sender_for(phone_number), expected)
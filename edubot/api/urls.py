@@ -5,12 +5,17 @@ from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.decorators.csrf import csrf_exempt
-from api.views.chatbot import CloudAPIWebhook, Navigation
+from api.views.chatbot import (
+    AsyncCloudAPIWebhook, BotMetrics, CloudAPIWebhook, Navigation,
+    ignore_status, navigation_status, status_fast_lane,
+)
 
 
 urlpatterns = [
-    path('v1/webhook/', csrf_exempt(CloudAPIWebhook.as_view()), name='webhook'),
-    path('v1/navigation/', csrf_exempt(Navigation.as_view()), name='navigation'),
+    path('v1/webhook/', csrf_exempt(status_fast_lane(CloudAPIWebhook.as_view(), ignore_status)), name='webhook'),
+    path('v1/async/webhook/', AsyncCloudAPIWebhook.as_view(), name='async_webhook'),
+    path('v1/navigation/', csrf_exempt(status_fast_lane(Navigation.as_view(), navigation_status)), name='navigation'),
+    path('v1/metrics/', BotMetrics.as_view(), name='bot_metrics'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
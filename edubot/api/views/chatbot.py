@@ -1,23 +1,71 @@
 """Chatbot API views."""
 # pylint: disable = import-error
 import json
-import requests
-from django.core.cache import cache
-from decouple import config
+import logging
+from functools import wraps
+from django.conf import settings
 from rest_framework import status
 from rest_framework.views import APIView
 from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
 from services.action_picker import ActionPickerService
+from services.async_action_picker import AsyncActionPickerService
+from services.message_queue import InvalidPayload, enqueue_messages, validate_payload
+from services import (
+    circuit_breaker, dedupe, http_client, mailbox, metrics, session_store, webhook_router,
+)
+from services.session_store import NAV
+from users.permissions import IsStaff
+
+logger = logging.getLogger(__name__)
+
 
 def send_response(response):
     """Send the response."""
-    url = f"https://graph.facebook.com/v15.0/{config('Phone_Number_ID')}/messages"
-    response = requests.post(
-        url=url,
-        data=response,
-        headers={'Authorization': f'Bearer {config("CLOUD_API_TOKEN")}'}
-    )
-    return response
+    return http_client.send_message(response)
+
+
+def dispatch_message(message):
+    """Run the chatbot for a single-message webhook."""
+    ActionPickerService(payload=message).dispatch_action()
+
+
+async def adispatch_message(message):
+    """Run the asyncio chatbot for a single-message webhook."""
+    action_picker = await AsyncActionPickerService.create(message)
+    await action_picker.adispatch_action()
+
+
+def ignore_status(payload):
+    """Delivery receipts on the chatbot webhook need no reply."""
+
+
+def status_fast_lane(view, on_status):
+    """
+    Answer status callbacks before DRF runs, calling ``on_status`` for each one.
+    Message events and anything unrecognised fall through to ``view``.
+    """
+    @wraps(view)
+    def fast_lane(request, *args, **kwargs):
+        if request.method == "POST" and request.content_type == "application/json":
+            kind, payload = webhook_router.classify(request.body)
+            if kind == webhook_router.STATUS:
+                events = webhook_router.statuses(payload)
+                metrics.incr("webhook.status_events", len(events))
+                for event in events:
+                    try:
+                        on_status(event)
+                    # pylint: disable=broad-except
+                    except Exception:
+                        # Answering with an error would only make Meta redeliver it.
+                        metrics.incr("webhook.status_failures")
+                        logger.exception("Failed to handle status %s", event)
+                return JsonResponse({"status": "success"}, status=status.HTTP_200_OK)
+        return view(request, *args, **kwargs)
+    return fast_lane
 
 
 class CloudAPIWebhook(APIView):
@@ -30,9 +78,29 @@ class CloudAPIWebhook(APIView):
         """POST request handler for the webhook."""
         payload = dict(request.data)
         # print("PAYLOAD >>>> ", payload)
-        action_picker = ActionPickerService(payload=payload)
-        action_picker.dispatch_action()
-        return JsonResponse({"status": "success"}, status=status.HTTP_200_OK)
+        if settings.WEBHOOK_INGRESS_MODE == "queue":
+            try:
+                validate_payload(payload)
+            except InvalidPayload as error:
+                return JsonResponse({"status": "error", "message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+            messages = webhook_router.fan_out(payload)
+            # One entry per batch: consumers share the stream, so separate
+            # entries of one sender could be dispatched out of order.
+            try:
+                enqueue_messages(messages)
+            except Exception:
+                dedupe.release(messages)
+                raise
+            return JsonResponse({"status": "queued", "messages": len(messages)}, status=status.HTTP_200_OK)
+        messages = webhook_router.fan_out(payload)
+        for index, message in enumerate(messages):
+            try:
+                mailbox.deliver(message, dispatch_message)
+            except Exception:
+                # Meta retries the webhook; let the undelivered messages through.
+                dedupe.release(messages[index:])
+                raise
+        return JsonResponse({"status": "success", "messages": len(messages)}, status=status.HTTP_200_OK)
 
 
     def get(self, request):
@@ -45,134 +113,192 @@ class CloudAPIWebhook(APIView):
         return HttpResponse(challenge,200)
 
 
-class Navigation(APIView):
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncCloudAPIWebhook(View):
     """
-        Webhook
+        Webhook for the ASGI server
     """
 
-    @staticmethod
-    def post(request):
+    async def post(self, request):
         """POST request handler for the webhook."""
-        payload = dict(request.data)
+        kind, payload = webhook_router.classify(request.body)
+        if kind == webhook_router.STATUS:
+            await sync_to_async(metrics.incr)(
+                "webhook.status_events", len(webhook_router.statuses(payload)))
+            return JsonResponse({"status": "success"}, status=status.HTTP_200_OK)
+        if payload is None:
+            return JsonResponse({"status": "error", "message": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+        if settings.WEBHOOK_INGRESS_MODE == "queue":
+            try:
+                validate_payload(payload)
+            except InvalidPayload as error:
+                return JsonResponse({"status": "error", "message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+            messages = await sync_to_async(webhook_router.fan_out)(payload)
+            try:
+                await sync_to_async(enqueue_messages)(messages)
+            except Exception:
+                await sync_to_async(dedupe.release)(messages)
+                raise
+            return JsonResponse({"status": "queued", "messages": len(messages)}, status=status.HTTP_200_OK)
+        messages = await sync_to_async(webhook_router.fan_out)(payload)
+        for index, message in enumerate(messages):
+            try:
+                await mailbox.adeliver(message, adispatch_message)
+            except Exception:
+                await sync_to_async(dedupe.release)(messages[index:])
+                raise
+        return JsonResponse({"status": "success", "messages": len(messages)}, status=status.HTTP_200_OK)
 
-        # all items in cache
-        print("NAVIGATION >>>> ", payload, cache.get(f"{payload.get('recipient_id')}_nav"))
-        record = cache.get(f"{payload.get('recipient_id')}_nav")
-        if record:
-            if payload.get('status') == "read" and record.get('type') in ["nav"]:
-                # print("READ >>>> ", record)
-                messages = {
-                    "document": "Use buttons for navigation",
-                    "audio": "Use buttons for navigation",
-                    "video": "Use the buttons below for navigation",
-                    "image": "Use the buttons below for navigation",
-                }
-                response_data = {
-                    "messaging_product": "whatsapp",
-                    "recipient_type": "individual",
-                    "to": payload.get('recipient_id'),
-                    "type": "interactive",
-                    "interactive": {
-                        "type": "button",
-                        "body": {
-                            "text": record.get('caption') if record.get('response_type') in ["audio"] else messages.get(record.get('response_type'))
-                        },
-                        "action": {
-                            "buttons": [
-                                {
-                                    "type": "reply",
-                                    "reply": {
-                                        "id": "tutorial_prev",
-                                        "title": "🔙 Previous"
-                                    }
-                                },
-                                {
-                                    "type": "reply",
-                                    "reply": {
-                                        "id": "tutorial_next",
-                                        "title": "🔜 Forward "
-                                    }
+    async def get(self, request):
+        """GET request handler for the webhook."""
+        return HttpResponse(request.GET.get('hub.challenge'), status=200)
+
+
+def navigation_status(payload):
+    """Send navigation controls once the user has read a message that needs them."""
+    if payload.get('status') != "read":
+        return
+    print("NAVIGATION >>>> ", payload)
+    record = session_store.get(payload.get('recipient_id'), NAV)
+    if record:
+        if record.get('type') in ["nav"]:
+            # print("READ >>>> ", record)
+            messages = {
+                "document": "Use buttons for navigation",
+                "audio": "Use buttons for navigation",
+                "video": "Use the buttons below for navigation",
+                "image": "Use the buttons below for navigation",
+            }
+            response_data = {
+                "messaging_product": "whatsapp",
+                "recipient_type": "individual",
+                "to": payload.get('recipient_id'),
+                "type": "interactive",
+                "interactive": {
+                    "type": "button",
+                    "body": {
+                        "text": record.get('caption') if record.get('response_type') in ["audio"] else messages.get(record.get('response_type'))
+                    },
+                    "action": {
+                        "buttons": [
+                            {
+                                "type": "reply",
+                                "reply": {
+                                    "id": "tutorial_prev",
+                                    "title": "🔙 Previous"
                                 }
-                            ]
-                        }
-                    }
-                }
-                if record.get('is_first_step'):
-                    response_data["interactive"]["action"]["buttons"].pop(0)
-                else:
-                    if record.get('is_last_step'):
-                        response_data["interactive"]["action"]["buttons"][1]['reply']['title'] = "🏁 Finish"
-                interactive = json.dumps(response_data.pop("interactive"))
-                response_data["interactive"] = interactive
-                send_response(response_data)
-                cache.delete(f"{payload.get('recipient_id')}_nav")
-            elif payload.get('status') == "read" and record.get('type') in ["quiz"]:
-                print("READ >>>> ", record)
-                response_data = {
-                    "messaging_product": "whatsapp",
-                    "recipient_type": "individual",
-                    "to": payload.get('recipient_id'),
-                    "type": "interactive",
-                    "interactive": json.dumps({
-                        "type": "list",
-                        "body": {
-                            "text": " Select most appropriate answer "
-                        },
-                        "action": {
-                            "button": "Select Choices",
-                            "sections": [
-                                {
-                                    "title": "Select Choice",
-                                    "rows": [
-                                        {
-                                            "id": item,
-                                            "title": item,
-                                        } for item in ["A", "B", "C", "D"]
-                                    ]
+                            },
+                            {
+                                "type": "reply",
+                                "reply": {
+                                    "id": "tutorial_next",
+                                    "title": "🔜 Forward "
                                 }
-                            ]
-                        }
-                    })
-                }
-                resp = send_response(response_data)
-                print("RESPONSE >>>> ", resp.json())
-                cache.delete(f"{payload.get('recipient_id')}_nav")
-
-            elif payload.get('status') == "read" and record.get('type') in ["document", "audio", "video", "image"]:
-                print("NOT READ >>>> ", record)
-                messages = {
-                    "document": "Use button for navigation",
-                    "audio": "Use button for navigation",
-                    "video": "Use the button below for navigation",
-                    "image": "Use the button below for navigation",
+                            }
+                        ]
+                    }
                 }
-                response_data = {
-                    "messaging_product": "whatsapp",
-                    "recipient_type": "individual",
-                    "to": payload.get('recipient_id'),
-                    "type": "interactive",
-                    "interactive": json.dumps({
-                        "type": "button",
-                        "body": {
-                            "text": messages.get(record.get('response_type'))
-                        },
-                        "action": {
-                            "buttons": [
-                                {
-                                    "type": "reply",
-                                    "reply": {
-                                        "id": "course_menu",
-                                        "title": "🏠 Menu"
-                                    }
+            }
+            if record.get('is_first_step'):
+                response_data["interactive"]["action"]["buttons"].pop(0)
+            else:
+                if record.get('is_last_step'):
+                    response_data["interactive"]["action"]["buttons"][1]['reply']['title'] = "🏁 Finish"
+            interactive = json.dumps(response_data.pop("interactive"))
+            response_data["interactive"] = interactive
+            send_response(response_data)
+            session_store.delete(payload.get('recipient_id'), NAV)
+        elif record.get('type') in ["quiz"]:
+            print("READ >>>> ", record)
+            response_data = {
+                "messaging_product": "whatsapp",
+                "recipient_type": "individual",
+                "to": payload.get('recipient_id'),
+                "type": "interactive",
+                "interactive": json.dumps({
+                    "type": "list",
+                    "body": {
+                        "text": " Select most appropriate answer "
+                    },
+                    "action": {
+                        "button": "Select Choices",
+                        "sections": [
+                            {
+                                "title": "Select Choice",
+                                "rows": [
+                                    {
+                                        "id": item,
+                                        "title": item,
+                                    } for item in ["A", "B", "C", "D"]
+                                ]
+                            }
+                        ]
+                    }
+                })
+            }
+            resp = send_response(response_data)
+            print("RESPONSE >>>> ", resp.json())
+            session_store.delete(payload.get('recipient_id'), NAV)
+
+        elif record.get('type') in ["document", "audio", "video", "image"]:
+            print("NOT READ >>>> ", record)
+            messages = {
+                "document": "Use button for navigation",
+                "audio": "Use button for navigation",
+                "video": "Use the button below for navigation",
+                "image": "Use the button below for navigation",
+            }
+            response_data = {
+                "messaging_product": "whatsapp",
+                "recipient_type": "individual",
+                "to": payload.get('recipient_id'),
+                "type": "interactive",
+                "interactive": json.dumps({
+                    "type": "button",
+                    "body": {
+                        "text": messages.get(record.get('response_type'))
+                    },
+                    "action": {
+                        "buttons": [
+                            {
+                                "type": "reply",
+                                "reply": {
+                                    "id": "course_menu",
+                                    "title": "🏠 Menu"
                                 }
-                            ]
-                        }
-                    })
-                }
-                resp = send_response(response_data)
-                print("RESPONSE >>>> ", resp.json())
-                cache.delete(f"{payload.get('recipient_id')}_nav")
+                            }
+                        ]
+                    }
+                })
+            }
+            resp = send_response(response_data)
+            print("RESPONSE >>>> ", resp.json())
+            session_store.delete(payload.get('recipient_id'), NAV)
+
 
+class Navigation(APIView):
+    """
+        Webhook
+    """
+
+    @staticmethod
+    def post(request):
+        """POST request handler for the webhook."""
+        payload = dict(request.data)
+        navigation_status(payload)
         return JsonResponse({"status": "success"}, status=status.HTTP_200_OK)
 
-                        
\ No newline at end of file
+
+class BotMetrics(APIView):
+    """
+        Chatbot pipeline metrics
+    """
+
+    permission_classes = (IsStaff,)
+
+    @staticmethod
+    def get(request):
+        """Return the counters recorded by the webhook pipeline."""
+        snapshot = metrics.snapshot()
+        snapshot["circuits"] = circuit_breaker.states()
+        return JsonResponse(snapshot, status=status.HTTP_200_OK)
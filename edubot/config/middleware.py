@@ -1,12 +1,40 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+# pylint: disable=import-error
+from services import metrics
+
+
 class CustomMiddleware(object):
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
         # One-time configuration and initialization.
+        # Run natively under ASGI instead of being adapted through a thread.
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
         # Code to be executed for each request before
         # the view (and later middleware) are called.
-        response = self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Write the request's metrics in one pipeline when it is answered.
+        with metrics.batch():
+            response = self.get_response(request)
+        self.log_exchange(request, response)
+
+        # Code to be executed for each request/response after
+        # the view is called.
+        return response
+
+    async def __acall__(self, request):
+        async with metrics.batch():
+            response = await self.get_response(request)
+        self.log_exchange(request, response)
+        return response
+
+    def log_exchange(self, request, response):
         try:
             print("\n+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
             if request.path not in ["/admin/jsi18n/"] and "Django" not in response.content.decode():
@@ -20,10 +48,6 @@ class CustomMiddleware(object):
             print("EXCEPTION IN MIDDLEWARE : ", e) if " This FileResponse instance has no `content` attribute. Use `streaming_content` instead" not in str(
                 e) else None
 
-        # Code to be executed for each request/response after
-        # the view is called.
-        return response
-
     def process_view(self, request, view_func, view_args, view_kwargs):
         # Code to be executed for each request before
         # the view (and later middleware) are called.
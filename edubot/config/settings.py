@@ -3,7 +3,7 @@
 import os
 from datetime import timedelta
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 
 
@@ -269,6 +269,83 @@ PAYPAL_CANCEL_URL = config('PAYPAL_CANCEL_URL')
 PAYPAL_RETURN_URL_ASSIGNMENT = config('PAYPAL_RETURN_URL_ASSIGNMENT')
 
 
+GRAPH_API_URL = config('GRAPH_API_URL', default='https://graph.facebook.com/v15.0')
+CLOUD_API_TOKEN = config('CLOUD_API_TOKEN')
+PHONE_NUMBER_ID = config('Phone_Number_ID')
+# Every number we send from (services/senders.py); add numbers to add send capacity
+PHONE_NUMBER_IDS = config('PHONE_NUMBER_IDS', default=PHONE_NUMBER_ID, cast=Csv())
+
+# Outbound HTTP (services/http_client.py), seconds and pool sizes per upstream
+HTTP_CONNECT_TIMEOUT = config('HTTP_CONNECT_TIMEOUT', default=5.0, cast=float)
+HTTP_READ_TIMEOUT = config('HTTP_READ_TIMEOUT', default=20.0, cast=float)
+HTTP_MAX_CONNECTIONS = config('HTTP_MAX_CONNECTIONS', default=100, cast=int)
+HTTP_MAX_KEEPALIVE = config('HTTP_MAX_KEEPALIVE', default=20, cast=int)
+# Circuit breakers (services/circuit_breaker.py), shared by all processes through Redis
+CIRCUIT_FAILURE_THRESHOLD = config('CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+CIRCUIT_FAILURE_WINDOW = config('CIRCUIT_FAILURE_WINDOW', default=30, cast=int)
+CIRCUIT_COOLDOWN = config('CIRCUIT_COOLDOWN', default=30, cast=int)
+# Concurrent calls each process may have in flight per upstream, and how long
+# a call waits for a free slot before it is shed.
+UPSTREAM_BULKHEADS = {
+    'graph_send': config('BULKHEAD_GRAPH_SEND', default=32, cast=int),
+    'graph_media': config('BULKHEAD_GRAPH_MEDIA', default=4, cast=int),
+    'paypal': config('BULKHEAD_PAYPAL', default=4, cast=int),
+    'paynow': config('BULKHEAD_PAYNOW', default=4, cast=int),
+}
+BULKHEAD_WAIT = config('BULKHEAD_WAIT', default=0.0, cast=float)
+# Cluster-wide send rate per WhatsApp number (services/rate_governor.py).
+# Background notifications leave GRAPH_SEND_INTERACTIVE_RESERVE tokens for replies.
+GRAPH_SEND_RATE = config('GRAPH_SEND_RATE', default=50.0, cast=float)
+GRAPH_SEND_BURST = config('GRAPH_SEND_BURST', default=50, cast=int)
+GRAPH_SEND_INTERACTIVE_RESERVE = config('GRAPH_SEND_INTERACTIVE_RESERVE', default=10, cast=int)
+GRAPH_SEND_MAX_WAIT = {
+    'interactive': config('GRAPH_SEND_MAX_WAIT_INTERACTIVE', default=10.0, cast=float),
+    'background': config('GRAPH_SEND_MAX_WAIT_BACKGROUND', default=120.0, cast=float),
+}
+# Pause, in seconds, when Graph throttles us without a retry-after header.
+GRAPH_THROTTLE_BACKOFF = config('GRAPH_THROTTLE_BACKOFF', default=5.0, cast=float)
+# Outbox retries (manage.py dispatch_outbox), backoff in seconds doubles per attempt.
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+OUTBOX_BASE_BACKOFF = config('OUTBOX_BASE_BACKOFF', default=5, cast=int)
+OUTBOX_MAX_BACKOFF = config('OUTBOX_MAX_BACKOFF', default=60*30, cast=int)
+# Seconds a dispatcher owns the messages it claimed. It starts no send after
+# half of it, so keep it over twice GRAPH_SEND_MAX_WAIT plus the Graph timeout.
+OUTBOX_LEASE = config('OUTBOX_LEASE', default=60*10, cast=int)
+# Graph media download URLs expire after about five minutes.
+MEDIA_URL_CACHE_TTL = config('MEDIA_URL_CACHE_TTL', default=60*4, cast=int)
+
+
+# Chatbot webhook ingress
+# "inline" runs the chatbot inside the webhook request, "queue" acknowledges
+# Meta immediately and leaves the work to `manage.py run_bot_workers`.
+WEBHOOK_INGRESS_MODE = config('WEBHOOK_INGRESS_MODE', default='inline')
+BOT_QUEUE_STREAM = config('BOT_QUEUE_STREAM', default='edubot:webhooks')
+BOT_QUEUE_GROUP = config('BOT_QUEUE_GROUP', default='bot_workers')
+BOT_QUEUE_MAXLEN = config('BOT_QUEUE_MAXLEN', default=100000, cast=int)
+# Seconds a WhatsApp message id is remembered to drop Meta's redeliveries.
+WEBHOOK_DEDUPE_TTL = config('WEBHOOK_DEDUPE_TTL', default=60*60*24, cast=int)
+# Each user's messages are processed one at a time by whoever holds their
+# mailbox lock; the lock expires after this many seconds without progress.
+MAILBOX_LOCK_TIMEOUT = config('MAILBOX_LOCK_TIMEOUT', default=60, cast=int)
+# Only render the last of several taps on the same message's buttons.
+MAILBOX_COALESCE_TAPS = config('MAILBOX_COALESCE_TAPS', default=False, cast=bool)
+# Seconds a user's session hash (services/session_store.py) outlives their last turn.
+SESSION_TTL = config('SESSION_TTL', default=60*60*24, cast=int)
+# Bump to start every conversation afresh after an incompatible change to the states.
+SESSION_VERSION = config('SESSION_VERSION', default=1, cast=int)
+# Screens a user can go "back" through.
+SESSION_HISTORY_LENGTH = config('SESSION_HISTORY_LENGTH', default=6, cast=int)
+# "msgpack" or "pickle"; both are always readable, see services/session_codec.py.
+SESSION_CODEC = config('SESSION_CODEC', default='msgpack')
+# msgpack values of at least this many bytes are zlib-compressed, 0 disables it.
+SESSION_COMPRESS_THRESHOLD = config('SESSION_COMPRESS_THRESHOLD', default=256, cast=int)
+SESSION_COMPRESS_LEVEL = config('SESSION_COMPRESS_LEVEL', default=6, cast=int)
+# Seconds a rendered tutorial step (services/step_cache.py) stays cached.
+TUTORIAL_STEP_CACHE_TTL = config('TUTORIAL_STEP_CACHE_TTL', default=60*60*24, cast=int)
+# Threads rendering the step after the one being served, 0 disables it.
+TUTORIAL_STEP_PREFETCH_WORKERS = config('TUTORIAL_STEP_PREFETCH_WORKERS', default=2, cast=int)
+
+
 
 
 
@@ -1,7 +1,7 @@
 """Views for payments app."""
 from datetime import timedelta, datetime
 import json
-from django.core.cache import cache
+from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from subscriptions.models import Subscription
@@ -9,11 +9,13 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 # pylint: disable=import-error
 # pylint: disable=no-name-in-module
-from utils.helper_functions import send_response
+from api.models import OutboundMessage
 from payments.models import Payment
 from payments.serializers import PaymentSerializer
 from users.permissions import IsStaff
 from services.paypal import PAYPALCLIENTAPI
+from services import session_store
+from services.session_store import STATE
 
 
 class PaymentsWebHook(APIView):
@@ -22,6 +24,7 @@ class PaymentsWebHook(APIView):
     permission_classes = []
 
     @csrf_exempt
+    @transaction.atomic
     def post(self, request):
         """Payments Webhook"""
         payment_confirmation = request.data
@@ -140,7 +143,7 @@ class PaymentsWebHook(APIView):
                             {
                                 "type": "reply",
                                 "reply": {
-                                    "id": cache.get(payment.user.phone_number).get("data").get("payee") if cache.get(payment.user.phone_number) else "retry",
+                                    "id": session_store.get(payment.user.phone_number, STATE).get("data").get("payee") if session_store.get(payment.user.phone_number, STATE) else "retry",
                                     "title": "🔄 Retry"
                                 }
                             },
@@ -158,7 +161,7 @@ class PaymentsWebHook(APIView):
         print("Declined :: ", Payment.objects.get(
             reference=reference).payment_status)
         if payment.payment_status and Payment.objects.get(reference=reference).payment_status != "Declined":
-            send_response(response=receipt)
+            OutboundMessage.enqueue(receipt)
         Payment.objects.filter(reference=reference).update(
             **{
                 "payment_status": status.capitalize(),
@@ -200,18 +203,28 @@ class PayPalWebhookView(APIView):
         """Handle webhook"""
         print("PAYPAL WEBHOOK :: ", request.data)
         payload = request.data
+        if payload.get("event_type") != "CHECKOUT.ORDER.APPROVED":
+            return JsonResponse({}, status=200)
+        reference = payload["resource"]["id"]
+        print("############################Reference :: ", reference)
+        # pylint: disable=no-member
+        payment = Payment.objects.filter(upstream_reference=reference).first()
+        if not payment or payment.is_paid:
+            return JsonResponse({}, status=200)
 
         try:
-            if payload["event_type"] == "CHECKOUT.ORDER.APPROVED":
-                reference = payload["resource"]["id"]
-                print("############################Reference :: ", reference)
-                # pylint: disable=no-member
-                payment = Payment.objects.filter(upstream_reference=reference).first()
-                paypal_client = PAYPALCLIENTAPI()
-                payment_payload = paypal_client.capture(reference)
-                if not payment:
-                    return JsonResponse({}, status=200)
+            # Capture outside any transaction so the PayPal round trip holds no
+            # connection or lock, and record its outcome on its own so a failed
+            # enrollment still leaves a trace of the money taken.
+            payment_payload = PAYPALCLIENTAPI().capture(reference)
+            Payment.objects.filter(pk=payment.pk).update(upstream_response=payment_payload)
 
+            # Roll back a half-applied enrollment, the failure notice below still commits.
+            with transaction.atomic():
+                payment = Payment.objects.select_for_update().get(pk=payment.pk)
+                if payment.is_paid:
+                    # A redelivery of this event got here first.
+                    return JsonResponse({}, status=200)
                 if not payment_payload.get('error'):
 
                     if payment_payload['status'] == 'COMPLETED':
@@ -248,7 +261,7 @@ Our team has worked hard to develop a comprehensive and interactive platform tha
 Best regards,
 
 The Ngena Team
-                                
+                            
 """
 
                         else:
@@ -279,7 +292,7 @@ The Ngena Team
                                         }
                             })
                         }
-                        send_response(response=receipt)
+                        OutboundMessage.enqueue(receipt)
                     else:
                         print('Payment not completed')
                         print(payment_payload)
@@ -313,5 +326,5 @@ The Ngena Team
                             }
                         })
             }
-            send_response(response=receipt)
+            OutboundMessage.enqueue(receipt)
         return JsonResponse({}, status=200)
@@ -3,15 +3,12 @@
 import time
 import json
 import logging
-import requests
-from django.core.cache import cache
-from decouple import config
+from functools import cached_property
+from django.conf import settings
 from users.models import User
-from services.action_table import ACTION_TABLE
-from services.action_validator import ActionValidator
-
-cache.clear()
-print("Cache cleared", cache)
+from services import http_client, identity, intent_router, session_store, state_machine, webhook_router
+from services.media import MediaHandle
+from services.session_store import FORM, HISTORY, NAV, QUIZ, STATE
 
 
 class ActionPickerService(object):
@@ -21,46 +18,30 @@ class ActionPickerService(object):
 
     def __init__(self, payload):
         """Initialize the action validator."""
-        self.action_table = ACTION_TABLE
-        self.validator = ActionValidator()
+        self.transitions = state_machine.TRANSITIONS
         self.logger = logging.getLogger(__name__)
         self.payload = self.parse_payload(payload)
-        self.session = cache.get(self.payload.get('phone_number'))
+        self.session = None
 
     def parse_payload(self, incoming_message):
         """Parse the action."""
-        oringinal_payload = dict(incoming_message)
-        print("PAYLOAD >>>> ", oringinal_payload)
-
-        payload = oringinal_payload['entry'][0]['changes'][0]['value']
-        if payload.get('messages'):
-            message = payload['messages'][0]
-            contact = payload['contacts'][0]
-            message_type = message['type']
-            username = contact['profile']['name']
-            phone_number = contact['wa_id']
-            if message_type == "text":
-                payload['body'] = message['text']['body']
-            elif message_type == "button":
-                payload['body'] = message['button']['payload']
-            elif message_type == "interactive":
-                if message['interactive']['type'] == "button_reply":
-                    payload['body'] = message['interactive']['button_reply']['id']
-                else:
-                    payload['body'] = message['interactive']['list_reply']['id']
-            elif message_type == "document":
-                headers = {
-                    'Authorization': 'Bearer ' + config('CLOUD_API_TOKEN')
-                }
-                file = requests.request(
-                    "GET", url=f"https://graph.facebook.com/v15.0/{message['document']['id']}", headers=headers, data={}).json()
-                payload['body'] = file.get('url')
-                payload['file_name'] = file.get('name')
+        payload = self.read_message(incoming_message)
+        if payload and payload.get('media_id'):
+            self.attach_media(payload)
+        return payload
 
-            payload['username'] = username
-            payload['phone_number'] = phone_number
-        else:
-            return None
+    def read_message(self, incoming_message):
+        """Extract the first message of the webhook, without any network calls."""
+        print("PAYLOAD >>>> ", incoming_message)
+        return next(webhook_router.iter_messages(dict(incoming_message)), None)
+
+    @staticmethod
+    def attach_media(payload):
+        """Expose the media as a lazy handle, the Graph API is only called if a handler needs the file."""
+        document = payload['messages'][0].get('document', {})
+        payload['body'] = MediaHandle(
+            payload['media_id'], document.get('filename'), document.get('mime_type'))
+        payload['file_name'] = document.get('filename')
         return payload
 
     def construct_response(self, response):
@@ -435,104 +416,163 @@ class ActionPickerService(object):
             state = "menu"
         return state
 
-    def dispatch_action(self):
-        """Dispatch the action."""
-
-        if "I have paid for the course and I want to join the class".lower() in self.payload.get('body').lower() or "I have paid for the assignment".lower() in self.payload.get('body').lower():
-            state = "join_class"
-            if self.session:
-                self.session['state'] = state
-            else:
-                self.session = {}
-                self.session['state'] = state
-            
-        if "Cancel payment".lower() in self.payload.get('body').lower():
-            state = "cancel_payment"
-            if self.session:
-                self.session['state'] = state
-            else:
-                self.session = {}
-                self.session['state'] = state
-
-
-        if self.payload.get('body').lower() == "handle_payment":
-            state = "handle_payment"
-            print("State is handle_payment", self.session)
+    def force_state(self, state):
+        """Move the session to a state regardless of where the user is."""
+        if self.session:
+            self.session['state'] = state
+        else:
+            self.session = {}
             self.session['state'] = state
+        return state
 
-        if self.payload.get('body').lower() == "back":
-            state = self.go_back()
+    @cached_property
+    def route(self):
+        """Global intents of the message, matched once per turn."""
+        return intent_router.route(self.payload.get('body'))
 
-        else:
-            state = "menu" if self.payload.get('body').lower(
-            ) in ["menu", "hi", "hello", "hie", "reset"] else self.get_action()
-        print("Current state : ", state)
+    @property
+    def text(self):
+        """The normalized message body."""
+        return self.route.text
 
-        if state == "menu" and not User.objects.filter(
-            phone_number=self.payload.get('phone_number')
-        ).exists():
-            cache.delete(self.payload.get('phone_number'))
-            cache.delete(f"{self.payload.get('phone_number')}_quiz_session")
-            cache.delete(f"{self.payload.get('phone_number')}_history")
-            cache.delete(f"bookmark_{self.payload.get('phone_number')}")
-            cache.delete(f"{self.payload.get('phone_number')}_session")
-            state = "greet"
+    def apply_global_intents(self):
+        """Handle phrases that jump to a state from anywhere in the conversation."""
+        if self.route.state:
+            self.force_state(self.route.state)
+
+    def is_back(self):
+        """Check if the user asked to go back."""
+        return self.route.back
+
+    def current_state(self):
+        """Resolve the state for a message that is not a back navigation."""
+        return "menu" if self.route.menu else self.get_action()
+
+    def user_keys(self):
+        """Session fields holding the user's conversation state."""
+        return [STATE, QUIZ, HISTORY, FORM]
 
+    def select_option(self, state):
+        """Pick the state the user chose when the current state offers several."""
         print("Current STATE : ", state)
-        if isinstance(state, list) and self.payload.get('body').lower() in state:
+        if isinstance(state, list) and self.text in state:
             print("State is a list")
-            state = self.payload.get('body').lower()
-
+            state = self.text
+        return state
 
+    def run_validator(self, state):
+        """Run the validator registered for the state, None if it cannot handle the message."""
+        transition = state_machine.transition(state)
+        if transition is None:
+            print("Invalid Response, no state", state)
+            return None
         try:
-            print("CALLING VALIDATOR :",
-            self.action_table[state]['action_validator'])
-            action = self.validator.registry[
-                self.action_table[state]['action_validator']
-            ](
-                phone_number=self.payload.get('phone_number'),
-                message=self.payload.get('body'),
-                session=self.session,
-                payload=self.payload
-            )
+            print("CALLING VALIDATOR :", transition.handler.name)
+            with identity.turn(self.payload.get('phone_number')):
+                return transition.handler(
+                    phone_number=self.payload.get('phone_number'),
+                    message=self.payload.get('body'),
+                    session=self.session,
+                    payload=self.payload
+                )
         except (TypeError, KeyError) as e:
             print("Invalid Response", e)
-            response = response = {
-                "phone_number": self.payload.get('phone_number'),
-                "body": {
-                    "text": "*😕 Invalid Response*\n\nSorry I didn't understand that. That could be an invalid option.\n\n_Please try again._",
-                    "response_type": "text",
+            return None
 
-                }
-            }
-            print("RESPONSE : >>>>>>>>>>>", response)
-            resp = self.send_response(self.construct_response(response))
-            print("RESPONSE : ", resp)
-            return
+    def invalid_response(self):
+        """Response sent when no validator could handle the message."""
+        response = {
+            "phone_number": self.payload.get('phone_number'),
+            "body": {
+                "text": "*😕 Invalid Response*\n\nSorry I didn't understand that. That could be an invalid option.\n\n_Please try again._",
+                "response_type": "text",
 
-        print("\n\nAction :")
+            }
+        }
+        print("RESPONSE : >>>>>>>>>>>", response)
+        return self.construct_response(response)
 
+    def next_step(self, state, action):
+        """Work out the next state and the message to send back."""
+        transition = self.transitions[state]
         if action.get("is_valid"):
-            next_action = self.action_table[state]['next_action_if_valid']
+            next_action = transition.next_if_valid
             bot_response = {
                 "phone_number": self.payload.get('phone_number'),
                 "body": action.get("message") if action.get("message") else
-                self.action_table[state]['valid_response'],
+                transition.valid_response,
                 "response_type": "text"
             }
         else:
-            next_action = self.action_table[state]['next_action_if_invalid']
+            next_action = transition.next_if_invalid
             bot_response = {
                 "phone_number": self.payload.get('phone_number'),
                 "body": action.get('message'),
                 "response_type": "text"
             }
+        # Choices live in the session as a list, see select_option.
+        if isinstance(next_action, tuple):
+            next_action = list(next_action)
+        return next_action, bot_response
+
+    @staticmethod
+    def history_entry(state, session):
+        """Build the ``[state, data]`` history record of a turn, what ``go_back`` restores."""
+        return [state, session.get('data', {})]
+
+    @staticmethod
+    def nav_record(action, receipt):
+        """Build the record the navigation webhook uses to send controls once a message is read."""
+        return {
+            "id": f"{receipt['messages'][0]['id']}",
+            "is_last_step": action.get('is_last_step'),
+            "is_first_step": action.get('is_first_step'),
+            "type": action.get('type') if action.get('type') else "nav",
+            "caption": action["message"].get('text'),
+            "response_type": action["message"].get('response_type'),
+            "data": action["message"].get('choices') if action.get('type') == "quiz" else None,
+
+        }
+
+    def dispatch_action(self):
+        """Dispatch the action, loading and saving the user's session once for the turn."""
+        with session_store.turn(self.payload.get('phone_number')):
+            self.session = session_store.get(self.payload.get('phone_number'), STATE)
+            self.run_turn()
+
+    def run_turn(self):
+        """Pick and run the action for the message, then reply."""
+        self.apply_global_intents()
 
+        if self.is_back():
+            state = self.go_back()
+
+        else:
+            state = self.current_state()
+        print("Current state : ", state)
+
+        if state == "menu" and not User.objects.filter(
+            phone_number=self.payload.get('phone_number')
+        ).exists():
+            session_store.delete(self.payload.get('phone_number'), *self.user_keys())
+            state = "greet"
+
+        state = self.select_option(state)
+
+        action = self.run_validator(state)
+        if action is None:
+            resp = self.send_response(self.invalid_response())
+            print("RESPONSE : ", resp)
+            return
+
+        print("\n\nAction :")
+
+        next_action, bot_response = self.next_step(state, action)
+
+        stored = session_store.get(self.payload.get('phone_number'), STATE)
         self.session = {
             "state": next_action,
-            "data": cache.get(
-                self.payload.get('phone_number')
-            ).get('data') if cache.get(self.payload.get('phone_number')) else {}
+            "data": stored.get('data') if stored else {}
         }
         print("Next state :", state)
         print("Next action :", next_action)
@@ -544,61 +584,36 @@ class ActionPickerService(object):
 
         print("MESSAGE SENT RECEIPT >>>>||  ", response.json())
 
-        history_payload = {
-            "state": state,
-            "response_type": action["message"].get('response_type'),
-            "prev_response": chatbot_response,
-            "data": self.session.get('data', {}),
-        }
-        self.history(history_payload)
+        if not self.is_back():
+            # The screen "back" returned to is already the newest history entry.
+            self.history(self.history_entry(state, self.session))
         print("===================================================================================\n\n")
         if action.get('requires_controls') and response.status_code == 200:
             print(
                 "##############################################################################")
             print(response.json())
-            cache.set(
-                f"{self.payload.get('phone_number')}_nav",
-                {
-                    "id": f"{response.json()['messages'][0]['id']}",
-                    "is_last_step": action.get('is_last_step'),
-                    "is_first_step": action.get('is_first_step'),
-                    "type": action.get('type') if action.get('type') else "nav",
-                    "caption": action["message"].get('text'),
-                    "response_type": action["message"].get('response_type'),
-                    "data": action["message"].get('choices') if action.get('type') == "quiz" else None,
-
-                },
-                timeout=60*60*24
+            session_store.put(
+                self.payload.get('phone_number'), NAV,
+                self.nav_record(action, response.json()),
+                timeout=settings.SESSION_TTL
             )
             
         return
 
-    def history(self, response):
+    def history(self, entry):
         """Maintain history of the session."""
-        phone_number = self.payload.get('phone_number')
-        history = cache.get(f"{phone_number}_history", [])
-        if history:
-            if len(history) > 5:
-                history.pop(0)
-            history.append(response)
-        else:
-            history.append(response)
-        cache.set(f"{phone_number}_history", history, 60*60*24)
+        session_store.push_history(self.payload.get('phone_number'), entry)
         return
 
     def go_back(self):
         """Go back to the previous state."""
-        phone_number = self.payload.get('phone_number')
-        history = cache.get(f"{phone_number}_history", [])
-        if history and len(history) > 1:
-            mark = cache.get(f"bookmark_{phone_number}", -2)
-            cache.delete(f"bookmark_{phone_number}")
-            print("SESSION : ", mark)
-            prev_state = history.pop(mark)
-            state = prev_state.get('state')
+        previous = session_store.pop_history(self.payload.get('phone_number'))
+        if previous is not None:
+            state, data = previous
+            print("SESSION : ", state)
             self.session = {
                 "state": state,
-                "data": prev_state.get('data')
+                "data": data
             }
             self.save_session(self.session)
         return self.session.get('state') if self.session else "menu"
@@ -606,16 +621,10 @@ class ActionPickerService(object):
     def send_response(self, response):
         """Send the response."""
         self.logger.info("Sending response : %s", response)
-        url = f"https://graph.facebook.com/v15.0/{config('Phone_Number_ID')}/messages"
-        response = requests.post(
-            url=url,
-            data=response,
-            headers={'Authorization': f'Bearer {config("CLOUD_API_TOKEN")}'}
-        )
-        return response
+        return http_client.send_message(response)
 
     def save_session(self, session):
         """Save the session."""
-        cache.set(self.payload.get('phone_number'),
-                  session, timeout=60*60*24)
+        session_store.put(self.payload.get('phone_number'), STATE,
+                          session, timeout=settings.SESSION_TTL)
         return session
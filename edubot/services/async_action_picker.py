@@ -0,0 +1,122 @@
+""" This module contains the asyncio variant of the ActionPickerService."""
+# pylint: disable=import-error
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from users.models import User
+from services.action_picker import ActionPickerService
+from services import http_client, session_store, state_machine
+from services.session_store import NAV, STATE
+
+class AsyncActionPickerService(ActionPickerService):
+    """
+        ActionPickerService for the ASGI webhook.
+
+        Graph calls go through the shared httpx.AsyncClient and the session is
+        loaded and flushed without blocking the loop, so a single event loop
+        can keep many conversations in flight.
+        Flow handlers are still synchronous and run in the thread pool.
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, payload):
+        """Initialize without touching the network, see ``create``."""
+        self.transitions = state_machine.TRANSITIONS
+        self.logger = logging.getLogger(__name__)
+        self.raw_payload = payload
+        self.payload = None
+        self.session = None
+
+    @classmethod
+    async def create(cls, payload):
+        """Build the service."""
+        service = cls(payload)
+        service.payload = service.parse_payload(payload)
+        return service
+
+    def run_validator(self, state):
+        """Run the validator, releasing the thread's database connection afterwards."""
+        try:
+            return super().run_validator(state)
+        finally:
+            close_old_connections()
+
+    async def adispatch_action(self):
+        """Dispatch the action, loading and saving the user's session once for the turn."""
+        if not self.payload:
+            return
+        async with session_store.turn(self.payload.get('phone_number')):
+            self.session = session_store.get(self.payload.get('phone_number'), STATE)
+            await self.arun_turn()
+
+    async def arun_turn(self):
+        """Pick and run the action for the message, then reply."""
+        phone_number = self.payload.get('phone_number')
+        self.apply_global_intents()
+
+        if self.is_back():
+            state = await self.ago_back()
+        else:
+            state = self.current_state()
+
+        if state == "menu" and not await User.objects.filter(
+            phone_number=phone_number
+        ).aexists():
+            session_store.delete(phone_number, *self.user_keys())
+            state = "greet"
+
+        state = self.select_option(state)
+
+        action = await sync_to_async(self.run_validator, thread_sensitive=False)(state)
+        if action is None:
+            await self.asend_response(self.invalid_response())
+            return
+
+        next_action, bot_response = self.next_step(state, action)
+
+        stored = session_store.get(phone_number, STATE)
+        self.session = {
+            "state": next_action,
+            "data": stored.get('data') if stored else {}
+        }
+        await self.asave_session(self.session)
+
+        chatbot_response = self.construct_response(bot_response)
+        response = await self.asend_response(chatbot_response)
+
+        if not self.is_back():
+            await self.ahistory(self.history_entry(state, self.session))
+        if action.get('requires_controls') and response.status_code == 200:
+            session_store.put(
+                phone_number, NAV,
+                self.nav_record(action, response.json()),
+                timeout=settings.SESSION_TTL
+            )
+
+    async def ahistory(self, entry):
+        """Maintain history of the session."""
+        session_store.push_history(self.payload.get('phone_number'), entry)
+
+    async def ago_back(self):
+        """Go back to the previous state."""
+        previous = await sync_to_async(session_store.pop_history)(
+            self.payload.get('phone_number'))
+        if previous is not None:
+            state, data = previous
+            self.session = {
+                "state": state,
+                "data": data
+            }
+            await self.asave_session(self.session)
+        return self.session.get('state') if self.session else "menu"
+
+    async def asend_response(self, response):
+        """Send the response."""
+        return await http_client.asend_message(response)
+
+    async def asave_session(self, session):
+        """Save the session."""
+        session_store.put(self.payload.get('phone_number'), STATE,
+                          session, timeout=settings.SESSION_TTL)
+        return session
@@ -0,0 +1,97 @@
+"""In-memory snapshot of the course catalog, shared by all the turns of a process."""
+# pylint: disable=import-error
+import threading
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_redis import get_redis_connection
+from courses.models import Course
+from packages.models import Package
+from services import metrics
+
+# Bumped whenever a course or package changes. Every process compares it
+# with the version of its snapshot and rebuilds the snapshot when they differ.
+VERSION_KEY = "edubot:catalog:version"
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class Catalog(object):
+    """
+        Every course and package as of ``version``.
+
+        The instances are shared between threads, handlers only read them or
+        pass them on as foreign keys.
+    """
+
+    def __init__(self, version, courses, packages):
+        """Initialize the snapshot."""
+        self.version = version
+        self.courses = tuple(courses)
+        self.packages = tuple(packages)
+        self.by_code = {course.code: course for course in self.courses}
+        self.by_id = {str(package.id): package for package in self.packages}
+
+    def course(self, code):
+        """The course with ``code``; raises Course.DoesNotExist like ``get``."""
+        try:
+            return self.by_code[code]
+        except KeyError:
+            # pylint: disable=no-member
+            raise Course.DoesNotExist(f"No course with code {code!r}") from None
+
+    def available(self, taken):
+        """Courses whose code is not in ``taken``, in catalog order."""
+        return [course for course in self.courses if course.code not in taken]
+
+    def package(self, package_id):
+        """The package with ``package_id``; raises Package.DoesNotExist like ``get``."""
+        try:
+            return self.by_id[str(package_id)]
+        except KeyError:
+            # pylint: disable=no-member
+            raise Package.DoesNotExist(f"No package with id {package_id!r}") from None
+
+    def packages_for(self, service_type):
+        """Packages sold for ``service_type``."""
+        return [package for package in self.packages if package.service_type == service_type]
+
+
+def version():
+    """The catalog version every process should be serving."""
+    return int(get_redis_connection("default").get(VERSION_KEY) or 0)
+
+
+def current():
+    """Return the snapshot of the current version, rebuilding it if it is stale."""
+    global _snapshot  # pylint: disable=global-statement
+    latest = version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == latest:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != latest:
+            # The version is read before the rows, so a change committed in
+            # between bumps it again and the next turn rebuilds.
+            # pylint: disable=no-member
+            _snapshot = Catalog(
+                latest,
+                Course.objects.order_by("id"),
+                Package.objects.order_by("id"),
+            )
+            metrics.incr("catalog.rebuilds")
+        return _snapshot
+
+
+def bump():
+    """Invalidate the snapshot of every process."""
+    get_redis_connection("default").incr(VERSION_KEY)
+
+
+# pylint: disable=unused-argument
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Package)
+def catalog_changed(sender, **kwargs):
+    """Bump the version once the change is committed, so no process rebuilds from old rows."""
+    transaction.on_commit(bump)
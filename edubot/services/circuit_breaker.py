@@ -0,0 +1,172 @@
+"""Circuit breakers and bulkheads that keep a sick upstream from taking the bot down."""
+# pylint: disable=import-error
+import os
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+from services import metrics
+
+_bulkheads = {}
+_bulkheads_lock = threading.Lock()
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream that is failing or saturated."""
+
+    def __init__(self, upstream, reason):
+        super().__init__(f"{upstream} unavailable: {reason}")
+        self.upstream = upstream
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """The upstream failed too often recently, calls are short-circuited."""
+
+    def __init__(self, upstream):
+        super().__init__(upstream, "circuit open")
+
+
+class BulkheadFull(UpstreamUnavailable):
+    """Every concurrent call this process allows to the upstream is in flight."""
+
+    def __init__(self, upstream):
+        super().__init__(upstream, "too many calls in flight")
+
+
+def bulkhead(upstream):
+    """Return the process-wide semaphore bounding concurrent calls to an upstream."""
+    key = (os.getpid(), upstream)
+    with _bulkheads_lock:
+        if key not in _bulkheads:
+            _bulkheads[key] = threading.BoundedSemaphore(settings.UPSTREAM_BULKHEADS[upstream])
+        return _bulkheads[key]
+
+
+class CircuitBreaker(object):
+    """
+        Closed, open and half-open breaker whose state lives in Redis.
+
+        Every gunicorn worker, uvicorn process and bot worker shares the same
+        view of an upstream: ``CIRCUIT_FAILURE_THRESHOLD`` failures within one
+        fixed ``CIRCUIT_FAILURE_WINDOW``-second window open the circuit for
+        ``CIRCUIT_COOLDOWN`` seconds. After that a single probe call is let
+        through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, upstream):
+        """Initialize the breaker."""
+        self.upstream = upstream
+        self.connection = get_redis_connection("default")
+        self.key = f"edubot:circuit:{upstream}"
+        self.probe_key = f"{self.key}:probe"
+        self.tripped = False
+
+    def window_key(self):
+        """
+        Counter of the failures in the current CIRCUIT_FAILURE_WINDOW. Windows
+        are fixed, so failures age out even while more keep arriving.
+        """
+        return f"{self.key}:failures:{int(time.time() // settings.CIRCUIT_FAILURE_WINDOW)}"
+
+    def state(self):
+        """Return ``(failures, opened_until)``."""
+        pipeline = self.connection.pipeline()
+        pipeline.get(self.window_key())
+        pipeline.hget(self.key, "opened_until")
+        failures, opened_until = pipeline.execute()
+        return int(failures or 0), float(opened_until or 0)
+
+    def before_call(self):
+        """Raise CircuitOpen unless the call may go ahead."""
+        failures, opened_until = self.state()
+        self.tripped = bool(failures or opened_until)
+        if not opened_until:
+            return
+        if time.time() < opened_until or not self.connection.set(
+                self.probe_key, 1, nx=True, ex=settings.CIRCUIT_COOLDOWN):
+            metrics.incr(f"circuit.{self.upstream}.rejected")
+            raise CircuitOpen(self.upstream)
+
+    def success(self):
+        """Close the circuit after a healthy call."""
+        if self.tripped:
+            self.connection.delete(self.key, self.probe_key, self.window_key())
+
+    def failure(self):
+        """Count a failed call, opening the circuit once the threshold is reached."""
+        window_key = self.window_key()
+        pipeline = self.connection.pipeline()
+        pipeline.incr(window_key)
+        pipeline.expire(window_key, settings.CIRCUIT_FAILURE_WINDOW)
+        pipeline.hget(self.key, "opened_until")
+        failures, _, opened_until = pipeline.execute()
+        # A failed probe re-opens the circuit straight away.
+        if failures >= settings.CIRCUIT_FAILURE_THRESHOLD or opened_until:
+            pipeline = self.connection.pipeline()
+            pipeline.hset(self.key, "opened_until", time.time() + settings.CIRCUIT_COOLDOWN)
+            pipeline.expire(self.key, settings.CIRCUIT_FAILURE_WINDOW + settings.CIRCUIT_COOLDOWN)
+            pipeline.delete(self.probe_key)
+            pipeline.execute()
+            metrics.incr(f"circuit.{self.upstream}.opened")
+
+
+class Guard(object):
+    """
+        Context manager around one upstream call.
+
+        Fails fast with UpstreamUnavailable when the circuit is open or the
+        upstream's bulkhead is full; otherwise runs the call and reports its
+        outcome. Transport errors count as failures automatically, a response
+        should be passed to ``check``.
+    """
+
+    def __init__(self, upstream):
+        """Initialize the guard."""
+        self.upstream = upstream
+        self.breaker = CircuitBreaker(upstream)
+        self.semaphore = bulkhead(upstream)
+        self.failed = False
+
+    def __enter__(self):
+        self.breaker.before_call()
+        if not self.semaphore.acquire(timeout=settings.BULKHEAD_WAIT):
+            metrics.incr(f"bulkhead.{self.upstream}.rejected")
+            raise BulkheadFull(self.upstream)
+        return self
+
+    def check(self, response):
+        """
+        Treat server errors as failures of the upstream. Throttling is not:
+        the rate governor already backs off on a 429.
+        """
+        if response.status_code >= 500:
+            self.failed = True
+        return response
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.semaphore.release()
+        if exc_type is not None or self.failed:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        return False
+
+    async def __aenter__(self):
+        return await sync_to_async(self.__enter__)()
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        return await sync_to_async(self.__exit__)(exc_type, exc, traceback)
+
+
+def states():
+    """Return the breaker state of every upstream."""
+    result = {}
+    for upstream in settings.UPSTREAM_BULKHEADS:
+        failures, opened_until = CircuitBreaker(upstream).state()
+        result[upstream] = {
+            "state": "closed" if not opened_until else (
+                "open" if time.time() < opened_until else "half-open"),
+            "failures": failures,
+        }
+    return result
@@ -0,0 +1,47 @@
+"""Drop webhook redeliveries before they reach the chatbot."""
+# pylint: disable=import-error
+from django.conf import settings
+from django_redis import get_redis_connection
+from services import metrics
+
+
+def message_id(payload):
+    """Return the WhatsApp message id (wamid) of a webhook, None for non-message events."""
+    try:
+        return payload['entry'][0]['changes'][0]['value']['messages'][0]['id']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def key(wamid):
+    """Redis key marking a message as seen."""
+    return f"wamid:{wamid}"
+
+
+def claim(wamid):
+    """Mark a message as seen, returning False if it had already been claimed."""
+    return bool(get_redis_connection("default").set(
+        key(wamid), 1, nx=True, ex=settings.WEBHOOK_DEDUPE_TTL))
+
+
+def is_replay(payload):
+    """Claim the payload's message, True if it is a redelivery that must be dropped."""
+    wamid = message_id(payload)
+    if wamid is None:
+        return False
+    if claim(wamid):
+        metrics.incr("webhook.messages_accepted")
+        return False
+    metrics.incr("webhook.duplicates_dropped")
+    return True
+
+
+def release(payloads):
+    """
+    Forget the claims of messages that were not queued or delivered, so
+    Meta's retry of the webhook is not dropped as a replay.
+    """
+    keys = [key(wamid) for wamid in map(message_id, payloads) if wamid is not None]
+    if keys:
+        get_redis_connection("default").delete(*keys)
+        metrics.incr("webhook.claims_released", len(keys))
@@ -0,0 +1,69 @@
+"""
+Conversation flows, one module per feature of the bot.
+
+A flow module is imported the first time one of its handlers runs, so a
+process only pays for the models, serializers and clients of the flows its
+users actually reach.
+"""
+import importlib
+import importlib.util
+
+# ACTION_TABLE ``action_validator`` names and the options of the course menu,
+# mapped to the flow module and the method handling them.
+HANDLERS = {
+    "greet": ("onboarding", "greet"),
+    "user_exists": ("onboarding", "user_exists"),
+    "register": ("onboarding", "registration"),
+    "menu": ("onboarding", "menu"),
+    "enroll": ("enroll", "enroll"),
+    "assignments": ("assignments", "assignments"),
+    "profile": ("account", "profile"),
+    "courses": ("courses", "my_courses"),
+    "payments": ("payments", "payments"),
+    "help": ("account", "help"),
+    "about": ("account", "about"),
+    "handle_payment": ("payments", "handle_payment"),
+    "join_class": ("payments", "join_class"),
+    "cancel_payment": ("payments", "cancel_payment"),
+    "course_call": ("calls", "handle"),
+    "course_tutorials": ("tutorials", "handle"),
+    "course_assessment": ("assessment", "handle"),
+    "course_conversation": ("conversation", "handle"),
+    "course_material": ("materials", "handle"),
+}
+
+_resolved = {}
+
+
+def module_path(name):
+    """Dotted path of the module handling ``name``."""
+    return f"{__name__}.{HANDLERS[name][0]}"
+
+
+def exists(name):
+    """True if ``name`` is registered and its module can be found, without importing it."""
+    return name in HANDLERS and importlib.util.find_spec(module_path(name)) is not None
+
+
+def resolve(name):
+    """Import the flow handling ``name`` on first use and return its bound handler."""
+    try:
+        return _resolved[name]
+    except KeyError:
+        flow = importlib.import_module(module_path(name)).FLOW
+        handler = _resolved[name] = getattr(flow, HANDLERS[name][1])
+        return handler
+
+
+class LazyHandler(object):
+    """A handler whose flow module is imported when it is first called."""
+
+    def __init__(self, name):
+        """Initialize the handler."""
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        return resolve(self.name)(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazyHandler {self.name}>"
@@ -0,0 +1,109 @@
+"""Profile, help and about pages."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from services import identity, session_store
+from services.session_store import STATE
+from services.flows.base import Flow
+
+
+class AccountFlow(Flow):
+    """The user's profile and the informational pages."""
+
+    def profile(self, phone_number, message, session, payload=dict):
+        """Profile menu"""
+        user = identity.current(phone_number).users
+
+        if message == "update":
+            session = {
+                "state": "update_profile",
+                "data": {
+                    "first_name": user.first().first_name,
+                    "last_name": user.first().last_name,
+                    "email": user.first().email,
+                    "phone_number": user.first().phone_number,
+                    "done": False
+                }
+            }
+            session_store.put(phone_number, STATE, session, 60*60*24)
+
+        if user.first().sex == "MALE":
+            imo = '🤵🏽‍♂'
+        elif user.first().sex == "FEMALE":
+            imo = '🤵🏽‍♀'
+        else:
+            imo = '🤵🏽'
+
+        return {
+            "is_valid": True,
+            "data": user.first(),
+            "message": {
+                "response_type": "interactive",
+                "text": f"*Your Profile*\n\n*Email:* {user.first().email}\n*Phone Number:* {user.first().phone_number}\n*Name: _{user.first().first_name} {user.first().last_name}_*\n*Sex: _{user.first().sex.title()}_*",
+                "username": f"{user.first().first_name} {user.first().last_name}",
+                "menu_name": f"{imo} Profile",
+                "menu_items": [
+                    {"id": "deactivate", "name": "Deactivate Profile",
+                        "description": "Suspend your profile"},
+                    {"id": "menu", "name": "Main Menu", "description": "Menu"},
+                ]
+            }
+        }
+
+    def help(self, phone_number, message, session, payload=dict):
+        """Help menu"""
+        user = identity.current(phone_number).users
+        print(message, session)
+        if message == "guide":
+            return {
+                "is_valid": True,
+                "data": user.first(),
+                "message": {
+                    "response_type": "button",
+                    "text": "Ngena is a chatbot that helps you to manage your courses and profile.\n\n1. Follow the instructions to register.\n2. Type *menu* to get started.\n3. Enroll in a course.\n4. Manage your profile.\n5. Enjoy Learning!\n\nAt any point, you can type *menu* to get back to your main menu.\n\n",
+                }
+            }
+        elif message == "contact":
+            return {
+                "is_valid": True,
+                "data": user.first(),
+                "message": {
+                    "response_type": "button",
+                    "text": "If you have any questions or feedback, please contact the developer at *+263771516726*\n\n Thank you for using Ngena!",
+                }
+            }
+        return {
+            "is_valid": True,
+            "data": user.first(),
+            "message": {
+                "response_type": "interactive",
+                "text": "*Help Menu*\n\n 📚 User guide\n\n 👨‍💻 Contact\n\n 🏠 Main Menu",
+                "username": f"{user.first().first_name} {user.first().last_name}",
+                "menu_name": "🆘 Help",
+                "menu_items": [
+                    {"id": "guide", "name": "📚 User guide",
+                        "description": "User guide"},
+                    {"id": "contact", "name": "👨‍💻 Contact",
+                        "description": "Contact the developer"},
+                    {"id": "menu", "name": "Main Menu",
+                        "description": "Back To Menu"},
+                ]
+            }
+        }
+
+    def about(self, phone_number, message, session, payload=dict):
+        """About menu"""
+        user = identity.current(phone_number).users
+        print(message, session)
+        return {
+            "is_valid": True,
+            "data": user.first(),
+            "message": {
+                "exclude_back": True,
+                "response_type": "button",
+                "text": "*About Us*\n\nNgena is a chatbot that helps \nyou to manage your courses \nand profile brought to you by \n*Empart*.\n\nFor more information, visit * https://www.ngena.com* nor contact us on *https://wa.me/263771516726*",
+            }
+        }
+
+
+FLOW = AccountFlow()
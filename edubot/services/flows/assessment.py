@@ -0,0 +1,109 @@
+"""Course assessment flow."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from services.quiz import QuizService
+from services import identity, manifest, pager, session_store
+from services.session_store import QUIZ, STATE
+from services.flows.base import Flow
+
+
+class AssessmentFlow(Flow):
+    """Quizzes of the selected course."""
+
+    # pylint: disable=unused-argument
+    def handle(self, phone_number, message, session, payload, user, courses):
+        """Assessment of the selected course."""
+        print("IN HEREEEEEEssss", session)
+        all_quizzes = manifest.for_course(
+            identity.current(phone_number).selected_course(session)).quizzes
+        if session_store.get(phone_number, QUIZ):
+            quiz_session = session_store.get(phone_number, QUIZ)
+            sess = {
+                "phone_number": phone_number,
+                "selected_answer": message,
+                "quiz_id": quiz_session["quiz_id"],
+            }
+
+        else:
+            sess = {
+                "phone_number": phone_number,
+                "selected_answer": message,
+            }
+
+        if message == "course_assessment" and sess.get("quiz_id") is None:
+            session['data']['stage'] = "course_assessment"
+            session['data']["action"] = "select_quiz"
+            session['data']["quizzes_cursor"] = None
+            return self.menu(phone_number, None, session, user, all_quizzes)
+        elif session['data'].get('stage') == "course_assessment" and session['data'].get("action") == "select_quiz" and message in pager.CONTROLS:
+            return self.menu(phone_number, message, session, user, all_quizzes)
+        elif session['data'].get('stage') == "course_assessment" and session['data'].get("action") == "select_quiz":
+            if message in [quiz["id"] for quiz in all_quizzes]:
+                session['data']["action"] = "quiz"
+                session['data']["quiz"] = message.split("_")[
+                    1]
+                quiz_session = {
+                    "quiz_id": message.split("_")[1],
+                    "phone_number": phone_number,
+                    "selected_answer": message
+
+                }
+                session_store.put(phone_number, QUIZ, quiz_session, 60*60*24)
+                session_store.put(phone_number, STATE, session, 60*60*24)
+                service = QuizService(quiz_session)
+                return service.deliver_quiz()
+        elif message in ['A', 'B', 'C', 'D'] and session['data'].get("action") == "quiz":
+            quiz_session = {
+                "quiz_id": session['data'].get("quiz"),
+                "phone_number": phone_number,
+                "selected_answer": message,
+
+            }
+            service = QuizService(quiz_session)
+            return service.deliver_quiz()
+
+        print("WILDCARD : ", message, session['data'])
+        return {
+            "is_valid": False,
+            "data": user.first(),
+            "message": {
+                "response_type": "button",
+                "text": "*Invalid selection*\n\nPlease select a valid option from the menu.",
+            }
+        }
+
+    def menu(self, phone_number, message, session, user, quizzes):
+        """Page of the course's quizzes, moved by the page controls in ``message``."""
+        if not quizzes:
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": "*Empty*\n\nNo quiz available for this course at the moment.Please try again later.",
+                }
+            }
+        page = pager.Pager(quizzes, size=self.pagination).page(
+            session["data"].get("quizzes_cursor"), message)
+        session["data"]["quizzes_cursor"] = page.cursor
+        session_store.put(phone_number, STATE, session, 60*60*24)
+
+        def generate_menu(quizzes_list): return [
+            f"{count}. *{quiz['name']}*" for count, quiz in enumerate(quizzes_list, 1)]
+        return {
+            "is_valid": False,
+            "data": user.first(),
+            "message": {
+                "response_type": "interactive",
+                "text": f"*Quiz Menu ({pager.label(page)}).*\n\n" + " \n\n ".join(generate_menu(page.items)) + "\n\nPlease select a quiz to take.",
+                "username": f"{user.first().first_name} {user.first().last_name}",
+                "menu_name": "📝 Quiz",
+                "menu_items": pager.rows(page, dict)
+            }
+        }
+
+
+FLOW = AssessmentFlow()
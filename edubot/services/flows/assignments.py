@@ -0,0 +1,484 @@
+"""Assignment submission flow."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from django.conf import settings
+from assignments.models import Assignment, PendingWork
+from payments.models import Payment
+from services.media import MediaHandle
+from services import catalog, identity, pager, session_store
+from services.session_store import FORM, PAYMENT, STATE
+from services.flows.base import Flow
+
+
+class AssignmentsFlow(Flow):
+    """Assignments the user has submitted or wants to submit."""
+
+    def assignments(self, phone_number, message, session, payload=dict):
+        """Assignment menu"""
+        user = identity.current(phone_number).user
+
+        # pylint: disable=maybe-no-member
+        pending_work = PendingWork.objects.filter(
+            course__students__in=[user]
+        ).exclude(
+            submitted_assignments__submitted_by=user
+        ).order_by("-created_at")
+
+        session = session_store.get(phone_number, FORM, {"data": {}})
+
+        if message in [str(work.id) for work in pending_work]:
+            session["data"]["assignment_id"] = message
+            session_store.put(phone_number, FORM, session, 60*60*24)
+            work = PendingWork.objects.get(id=message)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "download",
+                    "text": f"*{work.title} Details*\n\n*Course: _{work.course.name}_*\n*Deadline:* _{work.deadline.strftime('%d %b %Y %H:%M') if  work.deadline else 'No deadline'}_\n*Description:* _{work.description}_\n\n",
+                }
+            }
+
+        elif message == "download":
+            work = PendingWork.objects.get(id=session["data"]["assignment_id"])
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "document",
+                    "text": f"*📜 {work.title} Details*\n\n*Course: _{work.course.name}_*\n*Deadline:* _{work.deadline.strftime('%d %b %Y %H:%M') if  work.deadline else 'No deadline'}_\n*Description:* _{work.description}_\n\n",
+                    "document": settings.NGROK + work.file.url,
+                    "filename": work.file.name
+                }
+            }
+
+        elif message == "upload":
+            session["data"]["action"] = 'upload'
+            session_store.put(phone_number, FORM, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "text",
+                    "text": "*📎 Upload Document* \n\nPlease upload and send your assignment as a document here."
+                }
+            }
+
+        elif session["data"].get("action") == "upload":
+            print("uploading >>>>>>>>>>>>>>>>>>>>>> ", payload)
+            if isinstance(message, MediaHandle):
+                obj = message.open()
+                print("FILE: ", payload)
+                print("TYPE: ", obj.content_type)
+                print("NAME: ", obj.name)
+
+                # pylint: disable=no-member
+                work = PendingWork.objects.get(
+                    id=session["data"]["assignment_id"])
+                assignment = Assignment.objects.create(
+                    title=f"{work.title} - {user.first_name} {user.last_name}",
+                    file=obj,
+                    status="Completed",
+                    referenced_work=work,
+                    submitted_by=user
+                )
+                print(assignment, "<<============>>", obj)
+                work.submitted_assignments.add(assignment)
+                work.save()
+                session["data"]["action"] = None
+                session_store.put(phone_number, FORM, session, 60*60*24)
+                return {
+                    "is_valid": True,
+                    "data": user,
+                    "message": {
+                        "exclude_back": True,
+                        "response_type": "button",
+                        "text": "✅ *Upload Successful*\n\nYour assignment has been submitted successfully.",
+                    }
+                }
+            else:
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "text",
+                        "text": "*📎 Upload Document* \n\nPlease upload and send your assignment as a document here."
+                    }
+                }
+
+        elif message == "my_assignments":
+            session_store.put(phone_number, FORM, session, 60*60*24)
+            # filter pending work if user is enrolled in the course and user not in the list of submitted assignments
+
+            def generate_menu(pending_work): return [
+                f"*{count}.* {pending_work.title}" for count, pending_work in enumerate(pending_work[:8], 1)]
+            if pending_work:
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "interactive",
+                        "text": "*Pending Assignments*\n\n"+" \n\n".join(generate_menu(pending_work)),
+                        "username": f"{user.first_name} {user.last_name}",
+                        "menu_name": "📝 Pending",
+                        "menu_items": [
+                            {"id": f"{work.id}", "name": f"{work.course.name}", "description": f"Due {work.deadline.strftime('%d %b %Y %H:%M') if  work.deadline else 'No deadline'}"} for work in pending_work
+                        ]
+                    }
+                }
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "button",
+                    "text": "*⚠️Not Found*\n\nYou have not been assigned any assignments yet. Please check back later.",
+                }
+            }
+
+        elif message == "get_help":
+            session["data"]["action"] = message
+            session_store.put(phone_number, FORM, session, 60*60*24)
+            pending = Assignment.objects.filter(
+                submitted_by=user, status="Pending", assignment_type="Outsourced")
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "interactive",
+                    "text": f"*Help Menu*\n\n 📤 Upload Assignment\n\n 📂 View Pending ({pending.count()})\n\n 🔙 Back",
+                    "username": f"{user.first_name} {user.last_name}",
+                    "menu_name": "🆘 Get Help",
+                    "menu_items": [
+                        {"id": "outsource", "name": "📤 Upload Assignment",
+                            "description": "Upload your assignment"},
+                        {"id": "pending",
+                            "name": f"📂 View Pending ({pending.count()})", "description": "View pending assignments"},
+                        {"id": "back", "name": "🔙 Back",
+                            "description": "Back to assignments menu"},
+                    ]
+                }
+            }
+
+        elif session["data"].get("action") == "get_help" and message == "outsource":
+            session["data"]["action"] = "assignment_type"
+            session_store.put(phone_number, FORM, session, timeout=60*60*24)
+
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "interactive",
+                    "text": "*Assignment Type*\n\n 📐 Math Assignment\n\n 🔬 Science Assignment\n\n 📚 Language Assignment\n\n 📖 Social Studies\n\n 💻 ICT Assignment\n\n 📚 Other\n\nSelect type.",
+                    "menu_name": "View Types",
+                    "menu_items": [
+                        {"id": "math", "name": "📐 Math Assignment",
+                            "description": "Math"},
+                        {"id": "science", "name": "🔬 Science Assignment",
+                            "description": "Science"},
+                        {"id": "language", "name": "📚 Language Assignment",
+                            "description": "Language"},
+                        {"id": "social", "name": "📖 Social Studies",
+                            "description": "Social"},
+                        {"id": "ict", "name": "💻 ICT Assignment",
+                         "description": "ICT"},
+                        {"id": "other", "name": "📚 Other", "description": "Other"},
+                    ]
+
+                }
+            }
+        elif session["data"].get("action") == "assignment_type" and message in ["math", "science", "language", "social", "ict", "other"]:
+            session["data"]["action"] = "assignment_name"
+            session["data"]["field"] = message
+            session_store.put(phone_number, FORM, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "text",
+                    "text": "*📜 Assignment Identifier*\n\nPlease enter a reference name of the assignment you are submitting."
+                }
+            }
+
+        elif session["data"].get("action") == "assignment_name":
+            session["data"]["action"] = 'assignment_description'
+            session["data"]["assignment_name"] = message
+            session_store.put(phone_number, FORM, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "text",
+                    "text": "*📜 Assignment Description*\n\nPlease enter a description or instructions for the assignment."
+                }
+            }
+
+        elif session["data"].get("action") == "assignment_description":
+            session["data"]["action"] = 'receive_assignment'
+            session["data"]["assignment_description"] = message
+            session_store.put(phone_number, FORM, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "text",
+                    "text": "*📎 Upload Document* \n\nPlease upload and send your assignment document and we will get back to you."
+                }
+            }
+
+        elif session["data"].get("action") == "receive_assignment":
+            print("RECEIVING ASSIGNMENT", message)
+            session["data"]["field"] = message
+            # try:
+            if isinstance(message, MediaHandle):
+                obj = message.open()
+                assignment = Assignment.objects.create(
+                    title=session["data"]["assignment_name"],
+                    field_of_study=session["data"]["field"],
+                    description=session["data"]["assignment_description"],
+                    assignment_type="Outsourced",
+                    status="Pending",
+                    submitted_by=user,
+                    file=obj
+
+                )
+                payment = Payment.objects.create(
+                    user=user,
+                    amount=0,
+                    course=catalog.current().course("COUT"),
+                    payment_type="Outsource",
+                    payment_status="Awaiting Payment"
+                )
+                assignment.payment = payment
+                assignment.save()
+
+                session["data"]["action"] = "pending_payment"
+                session_store.put(phone_number, FORM, session, 60*60*24)
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "exclude_download": True,
+                        "response_type": "pay_download",
+                        "id": payment.id,
+                        "text": f"*📝 Assignment Received* \n\nWe have received your assignment referenced {assignment.title.title()}.\n\nPlease note that you will be charged a fee for this service. Complete the payment process so we can start working on it.\n\nThank you for using our service.",
+                    }
+                }
+            else:
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "text",
+                        "text": "*📎 Upload Document* \n\nPlease upload and send your assignment as a document here.*"
+                    }
+                }
+
+        elif session["data"].get("action") == "get_help" and message == "pending":
+            session["data"]["outsourced_cursor"] = None
+            return self.pending_menu(phone_number, None, session, user)
+        elif session["data"].get("action") == "view_pending" and message in pager.CONTROLS:
+            return self.pending_menu(phone_number, message, session, user)
+        elif session["data"].get("action") == "view_pending" and message.startswith("outsourced_"):
+            session["data"]["action"] = "download_outsourced"
+            session_store.put(phone_number, FORM, session, timeout=60*60*24)
+
+            assignment = Assignment.objects.get(id=message.split("_")[1])
+            if assignment.status == "Pending" and assignment.payment:
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "text",
+                        "text": f"*⏳ Pending*\n\n{assignment.title.title()} is still pending. Please complete the payment process to get started."
+                    }
+                }
+
+            elif assignment.status == "Completed":
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "download_outsourced",
+                        "text": f"*✅ Completed*\n\n{assignment.title.title()} has been completed. Please download the file below.",
+                        "download_solution": assignment.id
+                    }
+                }
+            elif assignment.status == "In Progress":
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "download_outsourced",
+                        "text": f"*⏳ Pending*\n\n{assignment.title.title()} is currently being worked on. Please wait for a response from our team."
+                    }
+                }
+            elif assignment.status == "Revision":
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "download_outsourced",
+                        "text": f"*⏳ Revision*\n\n {assignment.title.title()} is currently being revised. Please wait for a response from our team."
+                    }
+                }
+            else:
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "download_outsourced",
+                        "text": f"*⏳ Pending*\n\n{assignment.title.title()} is currently being worked on. Please wait for a response from our team."
+                    }
+                }
+
+        elif session["data"].get("action") == "download_outsourced" and message.startswith("download_outsourced_"):
+            assignment = Assignment.objects.filter(
+                id=message.split("_")[1]).first()
+            if assignment.status == "Completed":
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "document",
+                        "text": f"Assignment {assignment.title.title()} has been completed. Please click on the file to download your solution. \n\nThank you for using our service.",
+                        "document": assignment.solution.url
+                    }
+                }
+
+        elif session["data"].get("action") == "pending_payment" and message.startswith("payment_"):
+            if message.split("_")[1] in [str(payment.id) for payment in Payment.objects.filter(user=user, payment_status="Awaiting Payment")]:
+                session["data"]["action"] = "pending_payment"
+                session_store.put(phone_number, PAYMENT,
+                                  message.split("_")[1], timeout=60*60*24)
+                session_store.put(phone_number, STATE, session, timeout=60*60*24)
+                print("Saving session : ", session['data'])
+                def generate_menu(packages): return [
+                    f"{count}. {package.name.title()} Package(${package.price})" for count, package in enumerate(packages, 1)]
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "id": "paypal",
+                    "message": {
+                        "response_type": "interactive",
+                        "text": "*Packages Menu*\n\n"+" \n\n".join(generate_menu(catalog.current().packages_for("assignment_outsourcing"))),
+                        "username": f"{user.first_name} {user.last_name}",
+                        "menu_name": "📦 Packages",
+                        "include_description": True,
+                        "menu_items": [
+                                {
+                                    "id": f"package_{package.id}",
+                                    "name": f"{package.name.title()} Package(${package.price})",
+                                    "description": package.description
+                                } for package in catalog.current().packages_for("assignment_outsourcing")
+                        ]
+                    }
+                }
+
+        elif session["data"].get("action") == "pending_payment" and message.startswith("package_"):
+            print("Saving session : ", session['data'])
+            session["data"]["action"] = "assignment_payment"
+            session["data"]["selected_package"] = message.split("_")[1]
+            payment = Payment.objects.get(
+                id=session_store.get(phone_number, PAYMENT))
+            package = catalog.current().package(message.split("_")[1])
+            payment.amount = package.price
+            payment.package = package
+            payment.save()
+            session["data"]["payment_id"] = payment.id
+            session_store.put(phone_number, STATE, session, timeout=60*60*24*7)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "interactive",
+                    "text": "*Complete Payment*\n\n 🇺🇸 PayPal\n\n 🇿🇼 PayNow\n\nPay For Assignment with",
+                    "username": f"{user.first_name} {user.last_name}",
+                    "menu_name": "Payment Options",
+                    "menu_items": [
+                        {
+                            "id": "handle_payment",
+                            "name": "🇺🇸 PayPal",
+                            "description": "Complete purchase with PayPal",
+                        },
+                        {
+                            "id": "disabled",
+                            "name": "🇿🇼 PayNow (disabled)",
+                            "description": "Complete purchase with PayNow",
+                        },
+                    ]
+                }
+            }
+        if message == "disabled":
+            print("PAYNOW")
+            session["data"]["action"] = "pending_payment"
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "response_type": "button",
+                    "exclude_back": True,
+                    "text": "*🇿🇼 PayNow*\n\nThis feature is currently disabled. Please select another payment option.",
+                }
+            }
+
+        return {
+            "is_valid": False,
+            "data": user,
+            "message": {
+                "response_type": "interactive",
+                "text": "*Assignments*\n\n 📚 Course Assignments\n\n 📝 Outsource Assignment\n\n 🏠 Main Menu\n\nSelect an option below",
+                "username": f"{user.first_name} {user.last_name}",
+                "menu_name": "📝 Assignment Menu",
+                "menu_items": [
+                    {"id": "my_assignments", "name": "📚 Course Assignments",
+                        "description": "View your assignments"},
+                    {"id": "get_help", "name": "📝 Outsource Assignment",
+                        "description": "Get help with your assignments"},
+                    {"id": "menu", "name": "🏠 Main Menu",
+                        "description": "Back to main menu"},
+                ]
+            }
+        }
+
+    def pending_menu(self, phone_number, message, session, user):
+        """Page of the outsourced assignments, moved by the page controls in ``message``."""
+        session["data"]["action"] = "view_pending"
+        pending_work = Assignment.objects.filter(
+            assignment_type="Outsourced").exclude(status="Completed")
+        page = pager.Pager(pending_work, order=("-created_at", "-id")).page(
+            session["data"].get("outsourced_cursor"), message)
+        session["data"]["outsourced_cursor"] = page.cursor
+        session_store.put(phone_number, FORM, session, timeout=60*60*24)
+        if page.items:
+            def generate_menu(pending_work): return [
+                f"{count}. {pending_work.title}" for count, pending_work in enumerate(pending_work, 1)]
+            return {
+                "is_valid": False,
+                "data": user,
+
+                "message": {
+                    "response_type": "paginated_interactive",
+                    "text": f"*Pending Assignments ({pager.label(page)})* \n\n"+"\n\n".join(generate_menu(page.items)),
+                    "username": f"{user.first_name} {user.last_name}",
+                    "menu_name": "📝 Pending",
+                    "menu_items": pager.rows(page, lambda item: {
+                        "id": f"outsourced_{item.id}",
+                        "title": item.title if item.title else '',
+                        "description": f"{item.description[:69] if item.description else ''}...",
+                    }, title="title")
+
+                }
+            }
+        return {
+            "is_valid": False,
+            "data": user,
+            "message": {
+                "response_type": "button",
+                "text": "*⚠️ Not Found* \n\nYou have not uploaded any assignments yet. Please upload an assignment to get started.",
+            }
+        }
+
+
+FLOW = AssignmentsFlow()
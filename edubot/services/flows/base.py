@@ -0,0 +1,16 @@
+"""Base class of the conversation flows."""
+# pylint: disable=import-error
+from decouple import config
+
+HOST = config("HOST", default="http://localhost:8000")
+
+
+class Flow(object):
+    """
+        A group of handlers for one feature of the bot.
+
+        Flows keep no per-user state, everything a turn needs comes in through
+        the handler's arguments, so each module holds a single instance.
+    """
+
+    pagination = config("PAGINATION_COUNT", cast=int, default=5)
@@ -0,0 +1,166 @@
+"""Calls scheduled with a course tutor."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+import datetime
+from tutorials.models import CallRequest
+from tutorials.serializers import CallRequestSerializer
+from services.intent_router import DATE, DATE_TIME, TIME
+from services import identity, session_store
+from services.session_store import STATE
+from services.flows.base import Flow
+
+
+class CallsFlow(Flow):
+    """Schedules a call with the tutor of the selected course."""
+
+    # pylint: disable=unused-argument
+    def handle(self, phone_number, message, session, payload, user, courses):
+        """Schedule a call with a tutor."""
+        session['data']["action"] = "request_call"
+
+        if not user.first().has_active_permission_for_course(session["data"].get("selected_course")):
+            session["data"] = {
+                'selected_course': session['data']['selected_course'],
+                'page': 1
+            }
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "menu": "course_menu",
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": "*Request Call Unauthorised* \n\nYour subscription does not allow you to request a call. Please upgrade your subscription to request calls.",
+                }
+            }
+
+        if CallRequest.call_request_exists(user=user.first(), course=identity.current(phone_number).selected_course(session), date_of_call=datetime.datetime.today()):
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "menu": "course_menu",
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": "Request Call \n\nYou already have another pending call scheduled for today.",
+                }
+            }
+
+
+
+        payload = session['data'].get('payload')
+        print("\n\n\n\n#####################Request call",
+              session['data'].get("action"), payload, message)
+        print("Regex", DATE_TIME.match(message))
+
+        if session['data'].get("stage") == "date_of_call" and (DATE_TIME.match(message) or DATE.match(message) or TIME.match(message)):
+            if TIME.match(message):
+                message = f"{datetime.datetime.today().strftime('%Y-%m-%d')} {message}"
+            payload["date_of_call"] = message
+            session['data']["payload"] = payload
+            session['data']["stage"] = "call_type"
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "response_type": "text",
+                    "text": "Request Call\n\nWhat topic or concept would you like to discuss?",
+                }
+            }
+
+        if session['data'].get("stage") == "call_type":
+            payload["agenda"] = message
+            session['data']["payload"] = payload
+            session['data']["stage"] = "agenda"
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "response_type": "interactive",
+                    "text": "Call Type\n\nWhat is type of call?",
+                    "menu_name": "📅 Agenda",
+                    "menu_items": [
+                        {
+                            "id": item,
+                            "name": item,
+                            "description": item,
+                        } for item in user.first().call_permissions(session["data"].get("selected_course")) if item != "Curated Content"
+                    ] if user.first().call_permissions(session["data"].get("selected_course")) else [
+                        {
+                            "id": "course_menu",
+                            "name": "Menu",
+                            "description": "No call permissions",
+                        }
+                    ]
+                }
+            }
+
+
+        if session['data'].get("stage") == "agenda":
+            payload["call_type"] = message
+            session['data']["payload"] = payload
+            session_store.put(phone_number, STATE, session, 60*60*24)
+
+        serializer = CallRequestSerializer(
+            data=payload, context={"user": user.first()})
+        if serializer.is_valid():
+            serializer.save()
+            session['data']["action"] = "course_menu"
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "menu": "course_menu",
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": "Request Call\n\nYour request has been received. We will contact you shortly.",
+                }
+            }
+
+        else:
+            print("Invalid serializer",
+                  serializer.errors, payload)
+            if not payload:
+                session['data']["payload"] = {
+                    "requested_by": user.first().id,
+                    "course": identity.current(phone_number).selected_course(session).id
+                }
+                session['data']["action"] = "request_call"
+                session['data']["stage"] = "date_of_call"
+                session_store.put(phone_number, STATE, session, 60*60*24)
+                print("Session", session_store.get(phone_number, STATE))
+                return {
+                    "is_valid": False,
+                    "data": user.first(),
+                    "message": {
+                        "response_type": "text",
+                        "text": "Request Call\n\nWhen would you like to be contacted today ?\n\n_Please enter a valid time in the format e.g. *14:00*_",
+                    }
+                }
+            # REQUEST CALL FAILED
+            session['data']["action"] = "course_menu"
+            session['data']["payload"] = {}
+            session['data']["stage"] = ""
+
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            message = f"{list(serializer.errors.values())[0][0]}".replace("[ErrorDetail(string='", "").replace(
+                "', code='invalid')]", "").replace("YYYY-MM-DDThh:mm[:ss[.uuuuuu]][+HH:MM|-HH:MM|Z].", "YYYY-MM-DDThh:mm").lstrip()
+
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "menu": "course_menu",
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": f"Request Call Failed \n\n{message}",
+                }
+            }
+
+
+FLOW = CallsFlow()
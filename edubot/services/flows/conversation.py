@@ -0,0 +1,111 @@
+"""Course conversation flow."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from tutorials.models import Conversation
+from services import identity, session_store
+from services.session_store import STATE
+from services.flows.base import Flow
+
+
+class ConversationFlow(Flow):
+    """The chat between the students and tutors of a course."""
+
+    # pylint: disable=unused-argument
+    def handle(self, phone_number, message, session, payload, user, courses):
+        """Conversation of the selected course."""
+        user = identity.current(phone_number).user
+        print("CONVERSATION : ", message, session['data'])
+        if session["data"].get("action") is None:
+            session["data"]["action"] = "conversation"
+            session_store.put(user.phone_number, STATE,
+                              session, timeout=60*60*24)
+            conversation = Conversation.objects.filter(
+                course__students=user, course__code=session["data"]["selected_course"]).first()
+            if conversation:
+                def chat(conversation): return [
+                    f"*From :* {item.sender.first_name} {item.sender.last_name}\n*Date :* {item.date_sent.strftime('%d-%m-%Y %H:%M:%S')}\n*Message :* {item.content}" for item in conversation.messages.all()]
+                session["data"]["action"] = "conversation"
+                session_store.put(user.phone_number, STATE,
+                                  session, timeout=60*60*24)
+                conversation.has_unread = False
+                conversation.save()
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "conversation",
+                        "text": f"*{conversation.course.name}*\n\n*Chat*\n\n" + "\n\n".join(chat(conversation)),
+                    }
+                }
+            else:
+                course = identity.current(phone_number).selected_course(session)
+                session["data"]["action"] = "send_message"
+                session_store.put(user.phone_number, STATE,
+                                  session, timeout=60 * 60 * 24)
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "conversation",
+                        "text": f"*{course.name}*\n\n*Chat Empty*.\nSend a message to start a conversation.",
+                    }
+                }
+        elif session["data"].get("action") == "conversation":
+            if message == "send_message":
+                session["data"]["action"] = "send_message"
+                session_store.put(user.phone_number, STATE,
+                                  session, timeout=60 * 60 * 24)
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "text",
+                        "text": "Enter your message...",
+                    }
+                }
+        elif session["data"].get("action") == "send_message":
+            conversation = Conversation.objects.filter(
+                course__students=user, course__code=session["data"]["selected_course"]).first()
+            if conversation:
+                conversation.post_message(user, message)
+
+                def chat(conversation): return [
+                    f"*From :* {item.sender.first_name} {item.sender.last_name}\n*Date :* {item.date_sent.strftime('%d-%m-%Y %H:%M:%S')}\n*Message :* {item.content}" for item in conversation.messages.all()]
+                session["data"]["action"] = "conversation"
+                session_store.put(user.phone_number, STATE,
+                                  session, timeout=60*60*24)
+                conversation.has_unread = False
+                conversation.save()
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "conversation",
+                        "text": f"*{conversation.course.name}*\n\nChat\n\n" + "\n\n".join(chat(conversation)),
+                    }
+                }
+            else:
+                course = identity.current(phone_number).selected_course(session)
+                conversation = Conversation.objects.create(
+                    user=user, course=course)
+                conversation.post_message(user, message)
+
+                def chat(conversation): return [
+                    f"*From :* {item.sender.first_name} {item.sender.last_name}\n*Date :* {item.date_sent.strftime('%d-%m-%Y %H:%M:%S')}\n*Message :* {item.content}" for item in conversation.messages.all()]
+                session["data"]["action"] = "conversation"
+                session_store.put(user.phone_number, STATE,
+                                  session, timeout=60*60*24)
+                conversation.has_unread = False
+                conversation.save()
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "response_type": "conversation",
+                        "text": f"*{conversation.course.name}*\n\nChat\n\n" + "\n\n".join(chat(conversation)),
+                    }
+                }
+
+
+FLOW = ConversationFlow()
@@ -0,0 +1,282 @@
+"""Course menu flow."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from services import flows, identity, pager, session_store
+from services.session_store import STATE
+from services.flows.base import Flow
+
+
+class CoursesFlow(Flow):
+    """The user's courses and the menu of the selected course."""
+
+    def my_courses(self, phone_number, message, session, payload=dict):
+        """My courses menu"""
+        user = identity.current(phone_number).users
+        # pylint: disable=no-member
+        courses = identity.current(phone_number).courses
+        if not session.get("data"):
+            session["data"] = {"selected_course": None}
+        if message in pager.CONTROLS and not session["data"].get("selected_course"):
+            return self.course_list(phone_number, message, session, user, courses)
+        if not session["data"].get("selected_course") and message not in [i.code for i in courses]:
+            print("NO SELECTED COURSE AND MESSAGE NOT IN COURSES")
+            session = {
+                "state": "my_courses",
+                "data": {"selected_course": None}
+            }
+            return self.course_list(phone_number, None, session, user, courses)
+        else:
+            print("SELECTED COURSE OR MESSAGE IN COURSES",
+                  session["data"].get("selected_course"))
+            if message in [i.code for i in courses]:
+                session["data"]["selected_course"] = message
+                session["action"] = "course_menu"
+                session_store.put(phone_number, STATE, session, 60*60*24)
+                course = identity.current(phone_number).course(message)
+                return {
+                    "is_valid": False,
+                    "data": user.first(),
+                    "message": {
+                        "response_type": "interactive",
+                        "text": f"*Course Menu ({user.first().course_package(session['data']['selected_course']).name.title() if user.first().course_package(session['data']['selected_course']) else 'No Package Detected'})*\n\n 📜 Outline\n\n 📹 Tutorials\n\n 📚 Material\n\n 📊 Assessment\n\n 👨‍🏫📞 Schedule Call\n\n 🗣 Conversation\n\n 🔙 Back\n\nSelect an option to continue.",
+                        "username": f"{user.first().first_name} {user.first().last_name}",
+                        "menu_name": f"📚 {course.name}",
+                        "menu_items": [
+                            {
+                                "id": "course_outline",
+                                "name": "📜 Outline",
+                                "description": "Course Outline"
+                            },
+                            {
+                                "id": "tutorials",
+                                "name": "📹 Tutorials",
+                                "description": "Course Tutorial"
+                            },
+                            {
+                                "id": "course_material",
+                                "name": "📚 Material",
+                                "description": "Course Material"
+                            },
+                            {
+                                "id": "course_assessment",
+                                "name": "📊 Assessment",
+                                "description": "Course Assessment"
+                            },
+                            {
+                                "id": "request_call",
+                                "name": "👨‍🏫📞 Schedule Call",
+                                "description": "Request a call from a tutor"
+                            },
+                            {
+                                "id": "conversation",
+                                "name": "🗣 Conversation",
+                                "description": "Conversation"
+
+                            },
+                            {
+                                "id": "back_to_courses",
+                                "name": "🔙 Back",
+                                "description": "Back to courses"
+                            }
+                        ]
+                    }
+                }
+            elif message == "course_menu":
+                session["action"] = "course_menu"
+                session["data"] = {
+                    "selected_course": session["data"]["selected_course"],
+                    "page": 1,
+                }
+                session_store.put(phone_number, STATE, session, 60*60*24)
+                course = identity.current(phone_number).selected_course(session)
+                return {
+                    "is_valid": False,
+                    "data": user.first(),
+                    "message": {
+                        "response_type": "interactive",
+                        "text": f"*Course Menu({user.first().course_package(session['data']['selected_course']).name.title() if user.first().course_package(session['data']['selected_course']) else 'No Package Detected'})*\n\n 📜 Outline\n\n 📹 Tutorials\n\n 📚 Material\n\n 📊 Assessment\n\n 👨‍🏫📞 Schedule Call\n\n 🗣 Conversation\n\n 🔙 Back\n\nSelect an option to continue.",
+                        "username": f"{user.first().first_name} {user.first().last_name}",
+                        "menu_name": f"📚 {course.name}",
+                        "menu_items": [
+                            {
+                                "id": "course_outline",
+                                "name": "📜 Outline",
+                                "description": "Course Outline"
+                            },
+                            {
+                                "id": "tutorials",
+                                "name": "📹 Tutorials",
+                                "description": "Course Tutorial"
+                            },
+                            {
+                                "id": "course_material",
+                                "name": "📚 Material",
+                                "description": "Course Material"
+                            },
+                            {
+                                "id": "course_assessment",
+                                "name": "📊 Assessment",
+                                "description": "Course Assessment"
+                            },
+                            {
+                                "id": "request_call",
+                                "name": "👨‍🏫📞 Schedule Call",
+                                "description": "Request a call from a tutor"
+                            },
+                            {
+                                "id": "conversation",
+                                "name": "🗣 Conversation",
+                                "description": "Conversation"
+
+                            },
+                            {
+                                "id": "back_to_courses",
+                                "name": "🔙 Back",
+                                "description": "Back to courses"
+                            }
+                        ]
+                    }
+                }
+            else:
+                if session["data"].get("selected_course") and message in ["course_outline", "back", "Outline"]:
+                    session["back"] = -3
+                    session["data"] = {
+                        'selected_course': session['data']['selected_course'],
+                        'page': 1
+                    }
+                    course = identity.current(phone_number).selected_course(session)
+                    return {
+                        "is_valid": False,
+                        "data": user.first(),
+                        "message": {
+                            "menu": "course_menu",
+                            "exclude_back": True,
+                            "response_type": "button",
+                            "text": f"*📜 _Course Outline_*\n\n{course.description[:1024]}",
+                        }
+                    }
+
+                else:
+                    print("Message", message, session["data"].get(
+                        "selected_course"), session['data'].get("action"), session["data"].get("stage"))
+                    if message.lower() in ["back_to_courses", "courses"]:
+                        return self.course_list(phone_number, None, {
+                            "action": "my_courses",
+                            "data": {"selected_course": None}
+                        }, user, courses)
+
+                    elif message.lower() in  ["request_call", "schedule call", "schedule", "call"] or session['data'].get("action") == "request_call" or session['data'].get("stage") in ["date_of_call", "agenda", "call_type"]:
+                        response = flows.resolve("course_call")(
+                            phone_number, message, session, payload, user, courses)
+                        if response is not None:
+                            return response
+
+                    elif message.lower() == "tutorials" or session['data'].get("action") == "tutorials":
+                        response = flows.resolve("course_tutorials")(
+                            phone_number, message, session, payload, user, courses)
+                        if response is not None:
+                            return response
+
+                    elif message.lower() in ["course_assessment", "assessment", "course assessment"] or session["data"].get("action") == "select_quiz" or session["data"].get("stage") == "course_assessment":
+                        response = flows.resolve("course_assessment")(
+                            phone_number, message, session, payload, user, courses)
+                        if response is not None:
+                            return response
+
+                    elif message.lower() in ["conversation", "chat"] or session["data"].get('action') in ["conversation", "send_message"] or (session["data"].get('action') == "conversation" and message == "conversation"):
+                        response = flows.resolve("course_conversation")(
+                            phone_number, message, session, payload, user, courses)
+                        if response is not None:
+                            return response
+
+                    elif message.lower() in ["course_material", "materials", "course materials"]  or session["data"].get('action') in ["course_material"] or (session["data"].get('action') == "course_material" and message == "course_material"):
+                        response = flows.resolve("course_material")(
+                            phone_number, message, session, payload, user, courses)
+                        if response is not None:
+                            return response
+
+                course = identity.current(phone_number).selected_course(session)
+                return {
+                    "is_valid": False,
+                    "data": user.first(),
+                    "message": {
+                        "response_type": "interactive",
+                        "text": f"*Course Menu({user.first().course_package(session['data']['selected_course']).name.title() if user.first().course_package(session['data']['selected_course']) else 'No Package Detected'})*\n\n 📜 Outline\n\n 📹 Tutorials\n\n 📚 Material\n\n 📊 Assessment\n\n 👨‍🏫📞 Schedule Call\n\n 🗣 Conversation\n\n 🔙 Back\n\nSelect an option to continue.",
+                        "username": f"{user.first().first_name} {user.first().last_name}",
+                        "menu_name": f"📚 {course.name}",
+                        "menu_items": [
+                            {
+                                "id": "course_outline",
+                                "name": "📜 Outline",
+                                "description": "Course Outline"
+                            },
+                            {
+                                "id": "tutorials",
+                                "name": "📹 Tutorials",
+                                "description": "Course Tutorial"
+                            },
+                            {
+                                "id": "course_material",
+                                "name": "📚 Material",
+                                "description": "Course Material"
+                            },
+                            {
+                                "id": "course_assessment",
+                                "name": "📊 Assessment",
+                                "description": "Course Assessment"
+                            },
+                            {
+                                "id": "request_call",
+                                "name": "👨‍🏫📞 Schedule Call",
+                                "description": "Request a call from a tutor"
+                            },
+                            {
+                                "id": "conversation",
+                                "name": "🗣 Conversation",
+                                "description": "Conversation"
+
+                            },
+                            {
+                                "id": "back_to_courses",
+                                "name": "🔙 Back",
+                                "description": "Back to courses"
+                            }
+                        ]
+                    }
+                }
+
+    def course_list(self, phone_number, message, session, user, courses):
+        """Page of the user's courses, moved by the page controls in ``message``."""
+        page = pager.Pager(tuple(courses), size=self.pagination).page(
+            session["data"].get("courses_cursor"), message)
+        session["data"]["courses_cursor"] = page.cursor
+        session_store.put(phone_number, STATE, session, 60*60*24)
+
+        def generate_menu(courses_list): return [
+            f"*{count}.* {course.name}" for count, course in enumerate(courses_list, 1)]
+        return {
+            "is_valid": False,
+            "data": user.first(),
+            "message": {
+                "response_type": "interactive",
+                "text": f"*Your Courses ({pager.label(page)})*\n\n" + " \n\n ".join(generate_menu(page.items)),
+                "username": f"{user.first().first_name} {user.first().last_name}",
+                "menu_name": "📚 My Courses",
+                "menu_items": pager.rows(page, lambda course: {
+                    "id": course.code,
+                    "name": f"📚 {course.name}",
+                    "description": f"{course.description[:45]}...",
+                })
+            }
+        } if courses else {
+            "is_valid": False,
+            "data": user.first(),
+            "message": {
+                "response_type": "button",
+                "text": "*Oops!*\n\n You are not enrolled in any course at the moment.  Please try again later.",
+            }
+        }
+
+
+FLOW = CoursesFlow()
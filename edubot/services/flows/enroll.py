@@ -0,0 +1,228 @@
+"""Course enrolment flow."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from payments.models import Payment
+from packages.models import Package
+from utils.helper_functions import is_phone_number, payment_method
+from services import catalog, identity, pager, session_store
+from services.session_store import STATE
+from services.flows.base import Flow
+
+
+class EnrollFlow(Flow):
+    """Enrols users in courses."""
+
+    def enroll(self, phone_number, message=None, session=dict, payload=dict):
+        """Validate the enroll action."""
+        user = identity.current(phone_number).users
+
+        # pylint: disable=no-member
+        user_courses = {*identity.current(phone_number).enrolled_codes, "COUT"}
+        snapshot = catalog.current()
+        courses = snapshot.available(user_courses)
+        if session_store.get(phone_number, STATE):
+            session = session_store.get(phone_number, STATE)
+
+            if session.get("state") == "enroll":
+                if session["data"].get("selected_course"):
+                    print("Selected course >>>>>>>>>> ",
+                          session["data"]["selected_course"])
+                    if session["data"]["action"] == "select_package":
+                        session["data"]["selected_package"] = message
+                        package = snapshot.package(session["data"]["selected_package"])
+                        course = identity.current(phone_number).selected_course(session)
+                        session_store.put(phone_number, STATE, session, 60*60*24)
+                        return {
+                            "is_valid": False,
+                            "data": user.first(),
+                            "message": {
+                                "response_type": "interactive",
+                                "text": f"*Payment Options*\n\n 🇺🇸 PayPal\n\n 🇿🇼 PayNow \n\nSelect payment option to purchase {course.name.capitalize()}\n\nYou will be enrolled in {course.name.capitalize()} {package.name.capitalize()} package with access to {package.get_permissions()}.\n\nYou will be charged *${package.price}* for this package.",
+                                "username": f"{user.first().first_name} {user.first().last_name}",
+                                "menu_name": "Purchase",
+                                "menu_items": [
+                                    {
+                                        "id": "handle_payment",
+                                        "name": "🇺🇸 PayPal",
+                                        "description": "Complete purchase with PayPal",
+                                    },
+                                    {
+                                        "id": "disabled",
+                                        "name": "🇿🇼 PayNow (Disabled)",
+                                        "description": "Complete purchase with PayNow",
+                                    },
+                                ]
+                            }
+                        }
+
+                    elif message == "disabled":
+                        print("PAYNOW")
+                        session["data"]["payment_method"] = "select_package"
+                        session_store.put(phone_number, STATE, session, 60*60*24)
+                        return {
+                            "is_valid": False,
+                            "data": user.first(),
+                            "message": {
+                                "response_type": "text",
+                                "text": "*🇿🇼 PayNow*\n\nThis feature is currently disabled. Please select another payment option.",
+                            }
+                        }
+                    elif message == "paynow":
+                        print("PAYNOW")
+                        session["data"]["payment_method"] = "paynow"
+                        session_store.put(phone_number, STATE, session, 60*60*24)
+                        return {
+                            "is_valid": False,
+                            "data": user.first(),
+                            "message": {
+                                "response_type": "text",
+                                "text": "*🇿🇼 PayNow*\n\nPlease enter the phone number you want to pay with\n\ne.g. 0771111111\n\n*NB:* _The number should be registered with Ecocash or OneMoney._",
+                            }
+                        }
+                    elif session["data"].get("payment_method") == "paynow" and session["data"].get("paying_phone_number") is None:
+                        if not is_phone_number(message):
+                            return {
+                                "is_valid": False,
+                                "data": user.first(),
+                                "message": {
+                                    "response_type": "text",
+                                    "text": f"*🇿🇼 PayNow*\n\n{message} is not a valid number, please enter a valid phone number ",
+                                }
+                            }
+
+                        if payment_method(message) in ["ecocash", "onemoney"] and message != "retry":
+                            if message == "retry":
+                                message = session["data"]["payee"]
+                            session["data"]["payee"] = message
+                            session_store.put(phone_number, STATE, session, 60*60*24)
+                            course = identity.current(phone_number).selected_course(session)
+                            package = Package.objects.get(
+                                name=session["data"]["selected_package"])
+                            method = payment_method(message)
+                            print(course, package, method)
+                            # pylint: disable=no-value-for-parameter
+                            payment = Payment.create_payment(
+                                course=course,
+                                package=package,
+                                method=method,
+                                user=user.first(),
+                                payment_type=session["data"]["payment_method"],
+                            )
+                            print(payment)
+                            response = Payment.send_payment_request(
+                                payment, message)
+                            if response.get("status") == "Error":
+                                print("ERROR==============>>>>", phone_number)
+                                Payment.objects.filter(id=payment.id).update(
+                                    payment_status="Declined")
+
+                                return {
+                                    "is_valid": False,
+                                    "data": user.first(),
+                                    "message": {
+                                        "response_type": "text",
+                                        "text": f"*🇿🇼 PayNow*\n\nFailed to process payment with error *{response.get('error')}*\n\nPlease try entering your phone number again.",
+                                    }
+                                }
+                            # Initiate payment here
+                            return {
+                                "is_valid": False,
+                                "data": user.first(),
+                                "message": {
+                                    "response_type": "text",
+                                    "text": f"*🇿🇼 PayNow*\n\nYour ${payment.amount} {payment_method(message).lower()} payment has been initiated. Please complete the payment on your handset on prompt.",
+                                }
+                            }
+                        else:
+                            return {
+                                "is_valid": False,
+                                "data": user.first(),
+                                "message": {
+                                    "response_type": "text",
+                                    "text": f"*🇿🇼 PayNow*\n\n{payment_method(message).title()} is not supported. Please enter a valid Ecocash or OneMoney phone number.",
+                                }
+                            }
+
+                    else:
+                        return {
+                            "is_valid": False,
+                            "data": "Invalid selection",
+                            "message": {
+                                "exclude_back": True,
+                                "response_type": "button",
+                                "text": "*Invalid selection*\n\nPlease select a valid option from the menu.",
+                            }
+                        }
+                elif message in snapshot.by_code and message not in user_courses:
+                    print("COURSE: ", message)
+                    packages = snapshot.packages_for("course_registration")
+                    print("PACKAGE: ", packages)
+                    course = snapshot.course(message)
+                    session["data"]["selected_course"] = message
+                    session['data']['action'] = 'select_package'
+                    session_store.put(phone_number, STATE, session, 60*60*24)
+                    return {
+                        "is_valid": False,
+                        "data": user.first(),
+                        "message": {
+                            "response_type": "interactive",
+                            "text": f"*Subscription Packages*\n\n*Course:* {course.name}\n*Duration:* {course.duration} week(s)\n\n*Description*\n\n{course.description}\n\n",
+                            "username": f"{user.first().first_name} {user.first().last_name}",
+                            "menu_name": "📦 Available Packages",
+                            "menu_items": [
+                                {
+                                    "id": package.id,
+                                    "name": f"{package.name.title()} (${package.price})",
+                                    "description": f"{package.description}",
+                                } for package in packages
+                            ]
+                        }
+                    }
+                return self.course_list(phone_number, message, session, user, courses)
+
+        session = {
+            "state": "enroll",
+            "data": {
+                "selected_course": None
+            }
+        }
+        return self.course_list(phone_number, None, session, user, courses)
+
+    def course_list(self, phone_number, message, session, user, courses):
+        """Page of the courses open for enrolment, moved by the page controls in ``message``."""
+        page = pager.Pager(courses, size=self.pagination).page(
+            session["data"].get("enroll_cursor"), message)
+        session["data"]["enroll_cursor"] = page.cursor
+        session_store.put(phone_number, STATE, session, 60*60*24)
+
+        def generate_menu(courses_list): return [
+            f"{count}. {course.name}" for count, course in enumerate(courses_list, 1)]
+        return {
+            "is_valid": False,
+            "data": user.first(),
+            "message": {
+                "response_type": "interactive",
+                "text": "*Available Courses* \n\n" + "\n\n".join(generate_menu(page.items)) + f"\n\n{pager.label(page)}",
+                "username": f"{user.first().first_name} {user.first().last_name}",
+                "menu_name": "📚 Available Courses",
+                "menu_items": pager.rows(page, lambda course: {
+                    "id": course.code,
+                    "name": f"📚 {course.name}",
+                    "description": f"{course.description[:45]}...",
+                })
+            }
+        } if courses else {
+            "is_valid": False,
+            "data": user.first(),
+
+            "message": {
+                "exclude_back": True,
+                "menu": "course_menu",
+                "response_type": "button",
+                "text": "*No Courses Available!!*\n\nNo courses available at the moment.\nPlease contact tutor to upload courses.",
+            }
+        }
+
+
+FLOW = EnrollFlow()
@@ -0,0 +1,92 @@
+"""Course material flow."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from material.models import CourseMaterial
+from services import identity, manifest, pager, session_store
+from services.session_store import STATE
+from services.flows.base import HOST, Flow
+
+
+class MaterialsFlow(Flow):
+    """Material published for a course."""
+
+    # pylint: disable=unused-argument
+    def handle(self, phone_number, message, session, payload, user, courses):
+        """Material of the selected course."""
+        user = identity.current(phone_number).user
+        if session["data"].get("action") is None:
+            session["data"]["action"] = "course_material"
+            session["data"]["materials_cursor"] = None
+            return self.menu(phone_number, None, session, user)
+        elif session["data"].get("action") == "course_material" and message in pager.CONTROLS:
+            return self.menu(phone_number, message, session, user)
+        elif session["data"].get("action") == "course_material":
+            # if message starts with course_material_ then it is a course material
+            if message.startswith("course_material_"):
+                course_material_id = message.split("_")[2]
+                course_material = CourseMaterial.objects.get(
+                    id=course_material_id, )
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "requires_controls": True,
+                    "is_first_step": False,
+                    "is_last_step": False,
+                    "type": "document",
+                    "message": {
+                        "response_type": "document",
+                        "text": f"*{course_material.title}*\n\n{course_material.description}",
+                        "document": f"{HOST}{course_material.file.url}",
+                    }
+                }
+            else:
+                return {
+                    "is_valid": False,
+                    "data": user,
+                    "message": {
+                        "exclude_back": True,
+                        "response_type": "button",
+                        "text": "*Invalid selection*\n\nPlease select a valid option from the menu.",
+                    }
+                }
+
+    def menu(self, phone_number, message, session, user):
+        """Page of the course's material, moved by the page controls in ``message``."""
+        context = identity.current(phone_number)
+        course = context.selected_course(session)
+        # Only the course's students see its material.
+        course_materials = manifest.for_course(course).materials if course in context.courses else ()
+        if not course_materials:
+            session_store.put(user.phone_number, STATE,
+                              session, timeout=60*60*24)
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "exclude_back": True,
+                    "menu": "course_menu",
+                    "response_type": "button",
+                    "text": "*Empty*\n\nNo course material available for this course at the moment.Please try again later.",
+                }
+            }
+        page = pager.Pager(course_materials).page(session["data"].get("materials_cursor"), message)
+        session["data"]["materials_cursor"] = page.cursor
+        session_store.put(user.phone_number, STATE,
+                          session, timeout=60*60*24)
+
+        def generate_menu(course_materials_list): return [
+            f"*{count}.* {item['title']}" for count, item in enumerate(course_materials_list, 1)]
+        return {
+            "is_valid": False,
+            "data": user,
+            "message": {
+                "response_type": "paginated_interactive",
+                "menu_name": "*Course Materials*",
+                "text": f"*Course Materials ({pager.label(page)})*\n\n" + " \n\n ".join(generate_menu(page.items)) + "\n\nPlease select a course material to view",
+                "menu_items": pager.rows(page, dict, title="title"),
+            }
+        }
+
+
+FLOW = MaterialsFlow()
@@ -0,0 +1,248 @@
+"""Sign up and the main menu."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from users.serializers import UserSerializer
+from services.intent_router import EMAIL_ADDRESS, LEGAL_NAME
+from services import identity, session_store
+from services.session_store import STATE
+from services.flows.base import Flow
+
+
+class OnboardingFlow(Flow):
+    """Greets, registers and welcomes users."""
+
+    # pylint: disable=unused-argument
+    def greet(self, phone_number, message=None, session=dict):
+        """Greet the user."""
+        user = identity.current(phone_number).users
+        if user.exists():
+            session_store.put(phone_number, STATE, {
+                "state": "menu",
+                "data": None
+            }, 60*60*24)
+            return {
+                "is_valid": True,
+                "data": None,
+                "message": {
+                    "response_type": "interactive",
+                    "username": "Welcome to Ngena. \n\n 📂 Enroll \n\n 📚 Courses \n\n 📝 Assignments \n\n 💳 Payments \n\n 👤 Profile\n\n 🆘 Help\n\n ℹ️ About Us\n\nWhat would you like to do?",
+                    "menu_name": "Select Action",
+                    "menu_items": [
+                        {"id": "enroll", "name": "📂 Enroll",
+                            "description": "Enroll in a course"},
+                        {"id": "courses", "name": "📚 Courses",
+                            "description": "View your courses"},
+                        {"id": "assignments", "name": "📝 Assignments",
+                            "description": "Go to assignments"},
+                        {"id": "payments", "name": "💳 Payments",
+                            "description": "View your payments"},
+                        {"id": "profile", "name": "👤 Profile",
+                            "description": "View your profile"},
+                        {"id": "help", "name": "🆘 Help",
+                            "description": "User guide"},
+                        {"id": "about", "name": "ℹ️ About Us",
+                            "description": "Contact Us"},
+                    ]
+                }
+            }
+        session_store.put(phone_number, STATE, {
+            "state": "greet",
+            "data": None
+        }, 60*60*24)
+        return {
+            "is_valid": False,
+            "data": None,
+            "message": {
+                "response_type": "text",
+                "text": "Welcome to *Ngena*. Let's sign you up to get started.\n\nWhat is your first name?"
+            }
+        }
+
+    def user_exists(self, phone_number, message=None, session=dict, payload=dict):
+        """Check if the user exists."""
+        user = identity.current(phone_number).users
+        print("Session : ", session, "\n", phone_number, "->", message)
+        if user.exists():
+            session_store.put(phone_number, STATE, {
+                "state": "menu",
+                "data": None
+            }, 60*60*24)
+            return {
+                "is_valid": True,
+                "data": None,
+                "message": {
+                    "response_type": "interactive",
+                    "text": "*Main Menu*\n\n 📂 Enroll \n\n 📚 Courses \n\n 📝 Assignments \n\n 💳 Payments \n\n 👤 Profile\n\n 🆘 Help\n\n ℹ️ About Us\n\nWhat would you like to do?",
+                    "username": f"{user.first().first_name} {user.first().last_name}",
+                    "menu_name": "🏠 Select Action",
+                    "menu_items": [
+                        {"id": "enroll", "name": "📂 Enroll",
+                            "description": "Enroll in a course"},
+                        {"id": "courses", "name": "📚 Courses",
+                            "description": "View your courses"},
+                        {"id": "assignments", "name": "📝 Assignments",
+                            "description": "Go to assignments"},
+                        {"id": "payments", "name": "💳 Payments",
+                            "description": "View your payments"},
+                        {"id": "profile", "name": "👤 Profile",
+                            "description": "View your profile"},
+                        {"id": "help", "name": "🆘 Help",
+                            "description": "User guide"},
+                        {"id": "about", "name": "ℹ️ About Us",
+                            "description": "Contact Us"},
+
+                    ]
+                }
+            }
+        message = "Welcome to *Ngena*. Sign up to get started.\n\nWhat is your first name?" if not user.exists() else ""
+        return {
+            "is_valid": user.exists(),
+            "data": user.first() if user.exists() else None,
+            "message": {
+                "response_type": "text",
+                "text": message
+            }
+        }
+
+    def registration(self, phone_number, message=None, session=dict, payload=dict):
+        """Validate the registration action."""
+        user = identity.current(phone_number).users
+        print("Session : ", session, "\n", phone_number, "->", message)
+        if not user.exists():
+            if session:
+                if not session.get("data").get("password"):
+                    session["data"]["password"] = phone_number
+                if not session.get("data").get("phone_number"):
+                    session["data"]["phone_number"] = phone_number
+                if not session.get("data").get("username"):
+                    session["data"]["username"] = phone_number
+
+                if not session.get("data").get("role"):
+                    session["data"]["role"] = "STUDENT"
+
+                if not session["data"].get("first_name") and message:
+                    if not LEGAL_NAME.match(message):
+                        return {
+                            "is_valid": False,
+                            "data": "Invalid first name",
+                            "message": {
+                                "response_type": "text",
+                                "text": f"{message} is not a valid first name.\n\nPlease enter a valid first name",
+                            }
+                        }
+                    session["data"]["first_name"] = message
+                    message = None
+
+                if not session["data"].get("last_name") and message:
+                    if not LEGAL_NAME.match(message):
+                        return {
+                            "is_valid": False,
+                            "data": "Invalid last name",
+                            "message": {
+                                "response_type": "text",
+                                "text": f"{message} is not a valid last name.\n\nPlease enter a valid last name"
+                            }
+                        }
+                    session["data"]["last_name"] = message
+                    message = None
+
+                if not session["data"].get("email") and message:
+                    print("Validating email address", EMAIL_ADDRESS.match(message))
+                    if not EMAIL_ADDRESS.match(message):
+                        return {
+                            "is_valid": False,
+                            "data": "Invalid email",
+                            "message": {
+                                "response_type": "text",
+                                "text": f"{message} is not a valid email.\n\nPlease enter a valid email address"
+                            }
+                        }
+                    else:
+                        session["data"]["email"] = message
+                    message = None
+                session_store.put(phone_number, STATE, session, 60*60*24)
+
+                if not session["data"].get("sex") and message:
+                    if message.title() not in ["Male", "Female", "Other"]:
+                        return {
+                            "is_valid": False,
+                            "data": "Invalid sex",
+                            "message": {
+                                "response_type": "text",
+                                "text": f"{message} should be Male or Female or Other.\n\nPlease enter your sex"
+                            }
+                        }
+                    else:
+                        session["data"]["sex"] = message.upper()
+                    message = None
+                session_store.put(phone_number, STATE, session, 60*60*24)
+        serializer = UserSerializer(data=session["data"])
+        is_valid = serializer.is_valid()
+        if not is_valid:
+            message = serializer.errors[
+                "non_field_errors"
+            ][0].replace("ErrorDetail(string='", "").replace("', code='invalid')", "")
+            print(message)
+        else:
+            serializer.save()
+            message = f"Welcome *{serializer.data.get('first_name')} {serializer.data.get('last_name')}* to *Ngena*.\n\nYou have successfully registered.You can now access the *Ngena* menu to get started."
+        return {
+            "is_valid": is_valid,
+            "data": serializer.data if is_valid else serializer.errors,
+            "message": {
+                "exclude_back": True,
+                "response_type": "button" if is_valid else "text",
+                "text": message,
+            }
+        }
+
+    def menu(self, phone_number, message=None, session=dict, payload=dict):
+        """Validate the menu action."""
+        user = identity.current(phone_number).users
+        print("MENU SESSION : ", session, "\n", user, "->", message)
+        if not user.exists():
+            session_store.put(phone_number, STATE, {
+                "state": "register",
+                "data": None
+            }, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": "User does not exist",
+                "message": {
+                    "response_type": "text",
+                    "text": "You are not registered with Ngena.  Sign up to get started.\n\nWhat is your first name?"
+                }
+            }
+        session_store.put(phone_number, STATE, {
+            "state": "menu",
+            "data": None
+        }, 60*60*24)
+        return {
+            "is_valid": True,
+            "data": user.first(),
+            "message": {
+                "response_type": "interactive",
+                "text": "*Main Menu*\n\n 📂 Enroll \n\n 📚 Courses \n\n 📝 Assignments \n\n 💳 Payments \n\n 👤 Profile\n\n 🆘 Help\n\n ℹ️ About Us\n\nWhat would you like to do?",
+                "username": f"{user.first().first_name} {user.first().last_name}",
+                "menu_name": "🏠 Select Action",
+                "menu_items": [
+                    {"id": "enroll", "name": "📂 Enroll",
+                        "description": "Enroll in a course"},
+                    {"id": "courses", "name": "📚 Courses",
+                        "description": "View your courses"},
+                    {"id": "assignments", "name": "📝 Assignments",
+                        "description": "Go to assignments"},
+                    {"id": "payments", "name": "💳 Payments",
+                        "description": "View your payments"},
+                    {"id": "profile", "name": "👤 Profile",
+                        "description": "View your profile"},
+                    {"id": "help", "name": "🆘 Help", "description": "User guide"},
+                    {"id": "about", "name": "ℹ️ About Us",
+                        "description": "Contact Us"},
+                ]
+            }
+        }
+
+
+FLOW = OnboardingFlow()
@@ -0,0 +1,199 @@
+"""Payment flows."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from django.conf import settings
+from assignments.models import Assignment
+from payments.models import Payment
+from services import catalog, identity
+from services.paypal import PAYPALCLIENTAPI
+from services.flows.base import Flow
+
+
+class PaymentsFlow(Flow):
+    """Payments, and joining a class once paid."""
+
+    def payments(self, phone_number, message, session, payload=dict):
+        """Payment menu"""
+        user = identity.current(phone_number).users
+        # pylint: disable=maybe-no-member
+        payments = Payment.objects.filter(
+            user=user.first()).order_by("-created_at")[:7]
+        if not session["data"]:
+            session["data"] = {}
+
+        if message in [str(payment.id) for payment in payments]:
+            payment = Payment.objects.get(id=message)
+            return {
+                "is_valid": True,
+                "data": user.first(),
+                "message": {
+                    "response_type": "button",
+                    "text": f"*📜Payment Details*\n\n*Course: _{payment.course.name}_*\n*Amount:* ${payment.amount}\n*Date:* _{payment.created_at.strftime('%d %b %Y')}_\n*Status:* _{payment.payment_status} {'✅' if payment.payment_status == 'Paid' else '🚫'}_\n\n",
+                }
+            }
+        if payments:
+            statuses = {
+                "paid": "✅",
+                "pending": "⏳",
+                "failed": "🚫",
+                "created": "📝",
+                "awaitingdelivery": "⏳",
+                "cancelled": "🚫",
+                "unknown": "❓"
+
+            }
+            def generate_menu(payment): return [
+                f"*{count}.* {payment.course.name} {statuses.get(payment.payment_status.strip().lower()) if statuses.get(payment.payment_status.strip().lower()) else statuses.get('unknown')}" for count, payment in enumerate(payments[:8], 1)]
+            return {
+                "is_valid": True,
+                "data": user.first(),
+                "message": {
+                    "response_type": "interactive",
+                    "text": "*Recent Payments* \n\n"+" \n\n ".join(generate_menu(payments)),
+                    "username": f"{user.first().first_name} {user.first().last_name}",
+                    "menu_name": "💰 Payments",
+                    "menu_items": [
+                        {"id": f"{payment.id}", "name": f"{payment.course.name}", "description": f"{payment.created_at.strftime('%d %b %Y %H:%M')}"} for payment in payments
+                    ]
+
+                }
+            }
+
+        else:
+            return {
+                "is_valid": True,
+                "data": user.first(),
+                "message": {
+                    "response_type": "button",
+                    "text": "*💳 No Payments Available*\n\nYou have not made any payments yet.",
+                }
+            }
+
+    def handle_payment(self, phone_number, message, session, payload=dict):
+        """Handle payment related actions"""
+        paypal_payload = {
+            "currency": "USD",
+            "brandName": "Ngena"
+        }
+
+        user = identity.current(phone_number).user
+        print("PAYMENT PAYLOAD", session, message)
+        if session["data"].get("action") == "select_package" and message == "handle_payment":
+            # pylint: disable=no-member
+            package = catalog.current().package(session["data"].get("selected_package"))
+            course = identity.current(phone_number).selected_course(session)
+            paypal_payload['name'] = f"{course.name.capitalize()} {package.name}"
+            paypal_payload['description'] = f"{course.description} {package.get_permissions()}"
+            paypal_payload['amount'] = float(package.price)
+
+            payment = Payment.objects.create(
+                course=course,
+                user=user,
+                amount=package.price,
+                package=package
+            )
+
+            paypal_payload["returnUrl"] = f"{settings.PAYPAL_RETURN_URL}"
+            paypal_payload["cancelUrl"] = f"{settings.PAYPAL_CANCEL_URL}"
+
+            payment_client = PAYPALCLIENTAPI(paypal_payload)
+            payment_response = payment_client.online_payment()
+            print("PAYMENT RESPONSE", payment_response)
+            # returns status, payment_url, payment_id
+            if payment_response.get("successful"):
+                payment.upstream_reference = payment_response.get("paypal_id")
+                payment.payment_status = payment_response.get("status").title(
+                ) if payment_response.get("status") else "Failed"
+                payment.upstream_response = payment_response.get("response")
+                payment.save()
+                message = f"*📜 Payment Order Created*\n\nPlease follow the link below to complete your payment\n\n{payment_response.get('url')}"
+            else:
+                payment.upstream_response = payment_response.get("response")
+                payment.save()
+                message = "*Payment Order Failed*\n\nPlease try again later"
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": message,
+                }
+            }
+        elif session["data"].get("action") == "assignment_payment" and message == "handle_payment":
+            # pylint: disable=no-member
+            payment_id = session["data"].get("payment_id")
+            package = catalog.current().package(session["data"].get("selected_package"))
+            payment = Payment.objects.get(id=payment_id)
+            payment.package = package
+            assignment = Assignment.objects.get(payment=payment)
+            paypal_payload['name'] = f"Assignment {assignment.id}"
+            paypal_payload['description'] = f"Assignment {assignment.id}"
+            paypal_payload['amount'] = float(payment.amount)
+
+            paypal_payload["returnUrl"] = f"{settings.PAYPAL_RETURN_URL_ASSIGNMENT}"
+            paypal_payload["cancelUrl"] = f"{settings.PAYPAL_CANCEL_URL}"
+
+            payment_client = PAYPALCLIENTAPI(paypal_payload)
+            payment_response = payment_client.online_payment()
+            print("PAYMENT RESPONSE", payment_response)
+            # returns status, payment_url, payment_id
+            if payment_response.get("successful"):
+                payment.upstream_reference = payment_response.get("paypal_id")
+                payment.payment_status = payment_response.get("status").title(
+                ) if payment_response.get("status") else "Failed"
+                payment.upstream_response = payment_response.get("response")
+                payment.save()
+                message = f"*📜 Payment Order Created*\n\nPlease follow the link below to complete your payment\n\n{payment_response.get('url')}"
+            else:
+                payment.upstream_response = payment_response.get("response")
+                payment.save()
+                message = "*Payment Order Failed*\n\nPlease try again later"
+            return {
+                "is_valid": False,
+                "data": user,
+                "message": {
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": message,
+                }
+            }
+        return {
+            "is_valid": False,
+            "data": user,
+            "message": {
+                "exclude_back": True,
+                "response_type": "button",
+                "text": "*Payment Failed*\n\nPlease try again later",
+            }
+        }
+
+    def join_class(self, phone_number, message, session, payload=dict):
+        """Join a class"""
+        user = identity.current(phone_number).user
+        return {
+            "is_valid": True,
+            "data": user,
+            "message": {
+                "exclude_back": True,
+                "response_type": "text",
+                "text": f"*🙏 Thank you {user.first_name}*\n\nPlease wait while we process your payment, you will be notified once we receive confirmation for your payment. _Confirmation usually takes about 30 seconds_\n\nThank you",
+            }
+        }
+
+    def cancel_payment(self, phone_number, message, session, payload=dict):
+        """Cancel payment"""
+        user = identity.current(phone_number).user
+        return {
+            "is_valid": True,
+            "data": user,
+            "message": {
+                "exclude_back": True,
+                "response_type": "button",
+                "text": f"Hi {user.first_name},\n\nYour payment has been cancelled.\n\n",
+            }
+        }
+
+
+FLOW = PaymentsFlow()
@@ -0,0 +1,220 @@
+"""Course tutorials flow."""
+# pylint: disable=line-too-long
+# pylint: disable=import-error
+# pylint: disable=no-name-in-module
+from tutorials.models import Tutorial
+from services.intent_router import UUID4
+from services import identity, manifest, pager, session_store, step_cache
+from services.session_store import STATE
+from services.flows.base import Flow
+
+
+class TutorialsFlow(Flow):
+    """Walks users through the steps of a course's tutorials."""
+
+    # pylint: disable=unused-argument
+    def handle(self, phone_number, message, session, payload, user, courses):
+        """Tutorials of the selected course."""
+        print("Tutorials", session['data'].get(
+            "action"), message, session['data'].get("tutorial_stage"))
+        if session['data'].get("tutorial_stage") is None:
+            print("Tutorials is Nonne", session['data'].get(
+                "action"), message, session['data'].get("tutorial_stage"))
+            session['data']["tutorial_stage"] = "select_tutorial"
+            session['data']["action"] = "tutorials"
+            session['data']["tutorials_cursor"] = None
+            return self.menu(phone_number, None, session, user)
+
+        elif session['data'].get("tutorial_stage") == "select_tutorial" and message in pager.CONTROLS:
+            return self.menu(phone_number, message, session, user)
+
+        elif session['data'].get("tutorial_stage") == "select_tutorial":
+            print("Tutorials is select_tutorial", session['data'].get(
+                "action"), message, session['data'].get("tutorial_stage"))
+            session['data']["tutorial_identifier"] = message if UUID4.match(
+                message) else session['data'].get("tutorial_identifier")
+            print("Tutorials is select_tutorial >>>>>>>>>> ",
+                  session['data'].get("tutorial_identifier"))
+            try:
+                step = step_cache.step(session['data']["tutorial_identifier"], 1)
+                tutorial_exists = step is not None or Tutorial.objects.filter(
+                    id=session['data']["tutorial_identifier"], published=True).exists()
+                print("Tutorials is select_tutorial", tutorial_exists)
+                if tutorial_exists:
+                    session['data']["tutorial_stage"] = "ongoing_tutorial"
+                    session['data']["selected_tutorial"] = session['data']["tutorial_identifier"]
+                    if step:
+                        return self.play(phone_number, session, user, step, 1)
+                    session['data']["tutorial_stage"] = "select_tutorial"
+                    session['data']["step_position"] = None
+                    session_store.put(phone_number, STATE,
+                                      session, 60*60*24)
+                    return {
+                        "is_valid": False,
+                        "data": user.first(),
+                        "message": {
+                            "response_type": "text",
+                            "text": "🏁 The End\n\nCongratulations! You have reached the end of the tutorial.\n\nYou can select another tutorial to continue learning or go to *Assessment* to test your knowledge.",
+                        }
+                    }
+
+                else:
+                    session['data']["tutorial_stage"] = "select_tutorial"
+                    session_store.put(phone_number, STATE,
+                                      session, 60*60*24)
+                    return {
+                        "is_valid": False,
+                        "data": user.first(),
+                        "message": {
+                            "exclude_back": True,
+                            "response_type": "button",
+                            "text": "*Invalid selection*\n\nPlease select a valid option from the menu.",
+                        }
+                    }
+            except Exception as e:
+                print("Error in select_tutorial", e)
+                session['data']["tutorial_stage"] = "select_tutorial"
+                session_store.put(phone_number, STATE, session, 60*60*24)
+                return {
+                    "is_valid": False,
+                    "data": user.first(),
+                    "message": {
+                        "response_type": "text",
+                        "text": f"Error in select_tutorial: {e}",
+                    }
+                }
+        elif session['data'].get("tutorial_stage") == "ongoing_tutorial":
+            if message == "tutorial_next":
+                position = session["data"]["step_position"] + 1
+                step = step_cache.step(session['data'].get("selected_tutorial"), position)
+                if step:
+                    return self.play(phone_number, session, user, step, position)
+                if Tutorial.objects.filter(id=session['data'].get("selected_tutorial")).exists():
+                    session['data'].pop(
+                        "tutorial_stage")
+                    session['data'].pop(
+                        "step_position")
+                    session['data'].pop(
+                        "selected_tutorial")
+                    session_store.put(
+                        phone_number, STATE, session, 60*60*24)
+                    return {
+                        "is_valid": False,
+                        "data": user.first(),
+                        "is_first_step": False,
+                        "is_last_step": False,
+                        "message": {
+                            "exclude_back": True,
+                            "menu": "course_menu",
+                            "response_type": "button",
+                            "text": "🏁 The End\n\nCongratulations! You have reached the end of the tutorial.\n\nYou can select another tutorial to continue learning or go to *Assessment* to test your knowledge.",
+                        }
+                    }
+                session['data']["tutorial_stage"] = "select_tutorial"
+                session['data']["step_position"] = None
+                session_store.put(phone_number, STATE,
+                                  session, 60*60*24)
+                return {
+                    "is_valid": False,
+                    "data": user.first(),
+                    "is_first_step": False,
+                    "is_last_step": False,
+                    "message": {
+                        "exclude_back": True,
+                        "menu": "course_menu",
+                        "response_type": "button",
+                        "text": "*Invalid selection*\n\nPlease select a valid option from the menu.",
+                    }
+                }
+            elif message == "tutorial_prev":
+                position = session["data"]["step_position"] - 1
+                if position >= 1:
+                    step = step_cache.step(session['data'].get("selected_tutorial"), position)
+                    if step:
+                        return self.play(phone_number, session, user, step, position)
+                else:
+                    session['data'].pop(
+                        "tutorial_stage")
+                    session['data'].pop(
+                        "step_position")
+                    session['data'].pop(
+                        "selected_tutorial")
+                    session_store.put(
+                        phone_number, STATE, session, 60*60*24)
+                    return {
+                        "is_valid": False,
+                        "data": user.first(),
+                        "is_first_step": False,
+                        "is_last_step": False,
+                        "message": {
+                            "exclude_back": True,
+                            "menu": "course_menu",
+                            "response_type": "button",
+                            "text": "🏁 The End\n\\nYou have reached the start of the tutorial. You cannot go back any further.",
+                        }
+                    }
+
+    def play(self, phone_number, session, user, step, position):
+        """Send ``step``, the rendered step at ``position`` of the selected tutorial."""
+        if step["message"] is None:
+            session['data']["tutorial_stage"] = "select_tutorial"
+            session['data']["step_position"] = None
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "is_first_step": position == 1,
+                "is_last_step": position >= step["step_count"],
+                "message": {
+                    "response_type": "text",
+                    "text": "Oops! Something went wrong.",
+                }
+            }
+        session["data"]["step_position"] = position
+        session_store.put(phone_number, STATE, session, 60*60*24)
+        return {
+            "is_valid": False,
+            "data": user.first(),
+            "requires_controls": True,
+            "is_first_step": position == 1,
+            "is_last_step": position >= step["step_count"],
+            "message": dict(step["message"]),
+        }
+
+    def menu(self, phone_number, message, session, user):
+        """Page of the course's tutorials, moved by the page controls in ``message``."""
+        tutorials = manifest.for_course(
+            identity.current(phone_number).selected_course(session)).tutorials
+        if not tutorials:
+            session_store.put(phone_number, STATE, session, 60*60*24)
+            return {
+                "is_valid": False,
+                "data": user.first(),
+                "message": {
+                    "menu": "course_menu",
+                    "exclude_back": True,
+                    "response_type": "button",
+                    "text": "*No tutorials yet!!*\n\nNo tutorials have been added to this course yet.\n\nPlease select another course or contact your tutor for more information.",
+                }
+            }
+        page = pager.Pager(tutorials, size=self.pagination).page(
+            session['data'].get("tutorials_cursor"), message)
+        session['data']["tutorials_cursor"] = page.cursor
+        session_store.put(phone_number, STATE, session, 60*60*24)
+
+        def generate_menu(tutorials_list): return [
+            f"{count}. *{tutorial['name']}*" for count, tutorial in enumerate(tutorials_list, 1)]
+        return {
+            "is_valid": False,
+            "data": user.first(),
+            "message": {
+                "response_type": "interactive",
+                "text": f"*Tutorials ({pager.label(page)}).* \n\n" + " \n\n ".join(generate_menu(page.items)) + "\n\nSelect a tutorial to start tutorial.",
+                "username": f"{user.first().first_name} {user.first().last_name}",
+                "menu_name": "📹 Tutorials",
+                "menu_items": pager.rows(page, dict)
+            }
+        }
+
+
+FLOW = TutorialsFlow()
@@ -0,0 +1,176 @@
+"""Pooled HTTP clients for every upstream the platform talks to."""
+# pylint: disable=import-error
+import asyncio
+import logging
+import os
+import time
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from services import metrics, senders
+from services.circuit_breaker import Guard
+from services.rate_governor import INTERACTIVE, RateGovernor, throttle_delay
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SEND = "graph_send"
+GRAPH_MEDIA = "graph_media"
+PAYPAL = "paypal"
+PAYNOW = "paynow"
+
+_clients = {}
+_async_clients = {}
+
+
+def timeout():
+    """Connect and read timeouts shared by every upstream."""
+    return httpx.Timeout(
+        settings.HTTP_READ_TIMEOUT,
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+    )
+
+
+def limits():
+    """Connection pool size of each upstream client."""
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+    )
+
+
+def client(upstream):
+    """
+    Return the keep-alive client of an upstream, one per process.
+
+    Clients are keyed by pid as well because gunicorn and run_bot_workers fork
+    after settings are loaded and a pool must never be shared across a fork.
+    """
+    key = (os.getpid(), upstream)
+    if key not in _clients:
+        _clients[key] = httpx.Client(http2=True, timeout=timeout(), limits=limits())
+    return _clients[key]
+
+
+async def aclose_stale(instance):
+    """Close a client whose event loop is gone, as far as a dead loop allows."""
+    try:
+        await instance.aclose()
+    # pylint: disable=broad-except
+    except Exception:
+        # Its connections belong to the closed loop and cannot be shut down
+        # from this one; the client is still marked closed and dropped.
+        logger.debug("Closed a client of a stopped event loop", exc_info=True)
+
+
+def async_client():
+    """Return the AsyncClient shared by every coroutine on the running event loop."""
+    loop = asyncio.get_running_loop()
+    instance = _async_clients.get(loop)
+    if instance is None or instance.is_closed:
+        # Drop clients bound to loops that no longer run (one loop per request under WSGI).
+        for stale in [item for item in _async_clients if item.is_closed()]:
+            loop.create_task(aclose_stale(_async_clients.pop(stale)))
+        instance = httpx.AsyncClient(http2=True, timeout=timeout(), limits=limits())
+        _async_clients[loop] = instance
+    return instance
+
+
+def request(upstream, method, url, **kwargs):
+    """
+    Send a request through the upstream's pool and record its latency.
+    Raises UpstreamUnavailable without calling out if the upstream's circuit is
+    open or its bulkhead is full.
+    """
+    started = time.perf_counter()
+    try:
+        with Guard(upstream) as call:
+            return call.check(client(upstream).request(method, url, **kwargs))
+    except httpx.HTTPError:
+        metrics.incr(f"http.{upstream}.errors")
+        raise
+    finally:
+        metrics.observe(f"http.{upstream}", time.perf_counter() - started)
+
+
+def stream(upstream, method, url, **kwargs):
+    """
+    Send a request whose body is read later with ``iter_bytes``; close the
+    response when done. Failed responses come back already closed, so their
+    connection returns to the pool even if nobody reads them.
+    """
+    started = time.perf_counter()
+    http = client(upstream)
+    guard = Guard(upstream)
+    response = None
+    try:
+        with guard:
+            response = http.send(http.build_request(method, url, **kwargs), stream=True)
+            guard.check(response)
+    except BaseException as error:
+        if response is not None:
+            response.close()
+        if isinstance(error, httpx.HTTPError):
+            metrics.incr(f"http.{upstream}.errors")
+        raise
+    finally:
+        metrics.observe(f"http.{upstream}", time.perf_counter() - started)
+    if guard.failed:
+        response.close()
+    return response
+
+
+async def arequest(upstream, method, url, **kwargs):
+    """``request`` for coroutines."""
+    started = time.perf_counter()
+    try:
+        async with Guard(upstream) as call:
+            return call.check(await async_client().request(method, url, **kwargs))
+    except httpx.HTTPError:
+        await sync_to_async(metrics.incr)(f"http.{upstream}.errors")
+        raise
+    finally:
+        await sync_to_async(metrics.observe)(
+            f"http.{upstream}", time.perf_counter() - started)
+
+
+def graph_headers():
+    """Authorization headers for the Graph API."""
+    return {'Authorization': f'Bearer {settings.CLOUD_API_TOKEN}'}
+
+
+def messages_url(phone_number_id):
+    """Graph endpoint that sends WhatsApp messages from one of our numbers."""
+    return f"{settings.GRAPH_API_URL}/{phone_number_id}/messages"
+
+
+def send_message(data, lane=INTERACTIVE):
+    """
+    Send a WhatsApp message through the Graph API, waiting for the rate
+    governor first. ``lane`` is INTERACTIVE for replies to a user and
+    BACKGROUND for notifications nobody is waiting on.
+
+    The message goes out from the number the recipient is assigned to, and
+    each number has its own token bucket.
+    """
+    phone_number_id = senders.sender_for(data.get('to'))
+    governor = RateGovernor(phone_number_id)
+    governor.acquire(lane)
+    response = request(
+        GRAPH_SEND, "POST", messages_url(phone_number_id), data=data, headers=graph_headers())
+    delay = throttle_delay(response)
+    if delay is not None:
+        governor.backoff(delay)
+    return response
+
+
+async def asend_message(data, lane=INTERACTIVE):
+    """Send a WhatsApp message through the Graph API from a coroutine."""
+    phone_number_id = await sync_to_async(senders.sender_for)(data.get('to'))
+    governor = await sync_to_async(RateGovernor)(phone_number_id)
+    await governor.aacquire(lane)
+    response = await arequest(
+        GRAPH_SEND, "POST", messages_url(phone_number_id), data=data, headers=graph_headers())
+    delay = throttle_delay(response)
+    if delay is not None:
+        await sync_to_async(governor.backoff)(delay)
+    return response
@@ -0,0 +1,99 @@
+"""Per-turn identity map of the user and the courses the handlers look up."""
+# pylint: disable=import-error
+from contextvars import ContextVar
+from courses.models import Course
+from users.models import User
+from services import catalog
+
+_current = ContextVar("identity", default=None)
+
+
+class Identity(object):
+    """
+        The user behind a phone number and the courses a turn works on, each
+        queried once and then shared by every handler of the turn.
+
+        ``users`` is an evaluated queryset ordered by pk, so ``first()``,
+        ``exists()``, ``count()`` and slices of it are answered from its
+        result cache and always hand back the same User instance.
+    """
+
+    def __init__(self, phone_number):
+        """Initialize the identity map."""
+        self.phone_number = phone_number
+        self._users = None
+        self._courses = None
+        self._enrolled_codes = None
+        self._by_code = {}
+
+    @property
+    def users(self):
+        """The users with this phone number, as the handlers' ``filter`` returned them."""
+        if self._users is None:
+            users = User.objects.filter(phone_number=self.phone_number).order_by("pk")
+            len(users)
+            self._users = users
+        return self._users
+
+    @property
+    def user(self):
+        """The user, None if the number is not registered."""
+        return self.users.first()
+
+    @property
+    def courses(self):
+        """Courses the user is a student of, except the outsourcing course."""
+        if self._courses is None:
+            # pylint: disable=no-member
+            courses = Course.objects.filter(
+                students__in=list(self.users)).exclude(code="COUT")
+            len(courses)
+            self._courses = courses
+        return self._courses
+
+    @property
+    def enrolled_codes(self):
+        """Codes of the courses the user has enrolled in."""
+        if self._enrolled_codes is None:
+            user = self.user
+            self._enrolled_codes = frozenset(
+                user.enrolled_courses.values_list("code", flat=True)) if user else frozenset()
+        return self._enrolled_codes
+
+    def course(self, code):
+        """The course with ``code`` from the catalog; raises Course.DoesNotExist like ``get``."""
+        if code not in self._by_code:
+            self._by_code[code] = catalog.current().course(code)
+        return self._by_code[code]
+
+    def selected_course(self, session):
+        """The course selected in ``session``."""
+        return self.course(session["data"].get("selected_course"))
+
+
+class turn(object):  # pylint: disable=invalid-name
+    """
+        Context manager making one Identity the map that ``current`` returns
+        for ``phone_number`` until the turn ends.
+    """
+
+    def __init__(self, phone_number):
+        """Initialize the turn."""
+        self.identity = Identity(phone_number)
+        self.token = None
+
+    def __enter__(self):
+        self.token = _current.set(self.identity)
+        return self.identity
+
+    def __exit__(self, exc_type, exc, traceback):
+        _current.reset(self.token)
+        return False
+
+
+def current(phone_number):
+    """Return the identity map of the running turn, or a new one outside of a turn."""
+    identity = _current.get()
+    if identity is not None and identity.phone_number == phone_number:
+        return identity
+    return Identity(phone_number)
@@ -0,0 +1,160 @@
+"""Match free-text messages against every global keyword in one pass."""
+import re
+from collections import deque, namedtuple
+
+MENU = "menu"
+BACK = "back"
+
+# (phrase, intent, whole): a whole phrase must be the entire message, the
+# others may appear anywhere in it. Intents other than MENU and BACK are
+# ACTION_TABLE states the user is moved to from anywhere in the conversation;
+# when several match, the one registered last wins.
+KEYWORDS = (
+    ("menu", MENU, True),
+    ("hi", MENU, True),
+    ("hello", MENU, True),
+    ("hie", MENU, True),
+    ("reset", MENU, True),
+    ("back", BACK, True),
+    ("i have paid for the course and i want to join the class", "join_class", False),
+    ("i have paid for the assignment", "join_class", False),
+    ("cancel payment", "cancel_payment", False),
+    ("handle_payment", "handle_payment", True),
+)
+
+# Validators for free-text answers, compiled once.
+LEGAL_NAME = re.compile(r"^[a-zA-Z]+(([',. -][a-zA-Z ])?[a-zA-Z]*)*$")
+# Emails may start with digits and contain hyphens, underscores and capitals.
+EMAIL_ADDRESS = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+# Call dates: 2020-12-12 12:00, 2020-12-12 or 12:00.
+DATE_TIME = re.compile(r"^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})\s(?P<hour>\d{2}):(?P<minute>\d{2})$")
+DATE = re.compile(r"^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})$")
+TIME = re.compile(r"^(?P<hour>\d{2}):(?P<minute>\d{2})$")
+UUID4 = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$', re.I)
+PHONE_NUMBER = re.compile(r'263\d{9}$|0\d{9}$')
+ONEMONEY_NUMBER = re.compile(r'26371\d{7}$|071\d{7}$')
+TELECASH_NUMBER = re.compile(r'26373\d{7}$|073\d{7}$')
+
+Route = namedtuple("Route", ["text", "state", "back", "menu"])
+
+
+class KeywordAutomaton(object):
+    """
+        Aho-Corasick automaton over a set of phrases.
+
+        ``scan`` reports every occurrence of every phrase in a single pass over
+        the text, so its cost depends on the length of the message and not on
+        how many phrases are registered.
+    """
+
+    def __init__(self):
+        """Initialize an empty automaton."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.delta = []
+
+    def add(self, phrase, value):
+        """Add a phrase; call ``build`` once every phrase is added."""
+        node = 0
+        for char in phrase:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        self.output[node].append((len(phrase), value))
+
+    def build(self):
+        """
+        Compute the failure links, then fold them into a transition dict per
+        node so ``scan`` does a single lookup per character.
+        """
+        self.delta = [dict(node) for node in self.goto]
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+            if node:
+                # Parents come first in BFS order, so the fallback is complete.
+                self.delta[node] = {**self.delta[self.fail[node]], **self.goto[node]}
+        return self
+
+    def scan(self, text):
+        """Yield ``(start, end, value)`` for every phrase occurring in ``text``."""
+        delta, output = self.delta, self.output
+        node = 0
+        for index, char in enumerate(text):
+            node = delta[node].get(char, 0)
+            if output[node]:
+                for length, value in output[node]:
+                    yield index + 1 - length, index + 1, value
+
+
+class IntentRouter(object):
+    """Resolve a message to the global intents it triggers."""
+
+    def __init__(self, keywords=KEYWORDS):
+        """Initialize the router with ``(phrase, intent, whole)`` keywords."""
+        self.keywords = []
+        self.automaton = None
+        self.exact = {}
+        for phrase, intent, whole in keywords:
+            self.register(phrase, intent, whole)
+
+    def register(self, phrase, intent, whole=False):
+        """Recognise another phrase; later registrations win over earlier ones."""
+        self.keywords.append((phrase.lower(), intent, whole))
+        self.automaton = None
+
+    def compile(self):
+        """
+        Build the matchers: whole-message phrases are a dict lookup, the
+        others go into the automaton.
+        """
+        automaton = KeywordAutomaton()
+        exact = {}
+        for priority, (phrase, intent, whole) in enumerate(self.keywords):
+            if whole:
+                exact.setdefault(phrase, []).append((priority, intent))
+            else:
+                automaton.add(phrase, (priority, intent))
+        self.exact = exact
+        self.automaton = automaton.build()
+        return self.automaton
+
+    def states(self):
+        """The ACTION_TABLE states intents can move a user to."""
+        return {intent for _, intent, _ in self.keywords if intent not in (MENU, BACK)}
+
+    def route(self, body):
+        """Normalize ``body`` once and return its Route."""
+        text = str(body).lower() if body is not None else ""
+        automaton = self.automaton or self.compile()
+        matches = list(self.exact.get(text, ()))
+        matches.extend(value for _, _, value in automaton.scan(text))
+        state, back, menu, best = None, False, False, -1
+        for priority, intent in matches:
+            if intent == BACK:
+                back = True
+            elif intent == MENU:
+                menu = True
+            elif priority > best:
+                state, best = intent, priority
+        return Route(text=text, state=state, back=back, menu=menu)
+
+
+ROUTER = IntentRouter()
+ROUTER.compile()
+
+
+def route(body):
+    """Route a message with the default keywords."""
+    return ROUTER.route(body)
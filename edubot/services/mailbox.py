@@ -0,0 +1,245 @@
+"""Per phone number mailboxes that serialize the chatbot for each user."""
+# pylint: disable=import-error
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import LockError
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def sender(message):
+    """Return the phone number that sent a single-message webhook."""
+    return message['entry'][0]['changes'][0]['value']['messages'][0]['from']
+
+
+def tap_context(message):
+    """Return the id of the message whose button or list row was tapped, if any."""
+    inbound = message['entry'][0]['changes'][0]['value']['messages'][0]
+    if inbound.get('type') not in ("interactive", "button"):
+        return None
+    return (inbound.get('context') or {}).get('id')
+
+
+def stale(messages):
+    """
+    Indexes of the taps that a later tap on the same message's controls
+    replaces.
+
+    Several taps on the buttons of one message (e.g. hammering "Forward" on a
+    page that has not been replaced yet) can only ever mean the last of them,
+    so rendering the earlier ones would produce pages nobody sees.
+    """
+    latest = {}
+    for index, message in enumerate(messages):
+        context = tap_context(message)
+        if context:
+            latest[context] = index
+    replaced = {
+        index for index, message in enumerate(messages)
+        if tap_context(message) is not None and latest[tap_context(message)] != index
+    }
+    if replaced:
+        metrics.incr("mailbox.coalesced", len(replaced))
+    return replaced
+
+
+class MailboxBusy(Exception):
+    """Raised when a mailbox stays owned by another process for too long."""
+
+
+class Mailbox(object):
+    """
+        FIFO of pending messages for one phone number.
+
+        Whoever holds the mailbox lock drains it, so a user's messages are
+        processed one at a time, in order, by a single web or worker process,
+        while different users are processed fully in parallel. Senders that
+        find the lock taken just leave their message for the current owner.
+
+        The owner moves the messages it takes to a processing list and drops
+        each one only after dispatching it, so the messages of an owner that
+        dies mid-turn are dispatched by the next one.
+    """
+
+    def __init__(self, phone_number):
+        """Initialize the mailbox."""
+        self.connection = get_redis_connection("default")
+        self.key = f"mailbox:{phone_number}"
+        self.processing = f"{self.key}:processing"
+        self.lock = self.connection.lock(
+            f"{self.key}:lock",
+            timeout=settings.MAILBOX_LOCK_TIMEOUT,
+            blocking=False,
+            # adeliver may touch the lock from different threads.
+            thread_local=False,
+        )
+        self.lock_lost = False
+
+    def push(self, message):
+        """Append a message to the mailbox."""
+        pipeline = self.connection.pipeline()
+        pipeline.rpush(self.key, json.dumps(message))
+        pipeline.expire(self.key, settings.MAILBOX_LOCK_TIMEOUT * 10)
+        pipeline.execute()
+
+    def acquire(self):
+        """Try to become the mailbox owner without waiting."""
+        self.lock_lost = False
+        return self.lock.acquire()
+
+    def wait(self):
+        """Become the mailbox owner, waiting up to MAILBOX_LOCK_TIMEOUT for the current one."""
+        self.lock_lost = False
+        return self.lock.acquire(blocking=True, blocking_timeout=settings.MAILBOX_LOCK_TIMEOUT)
+
+    def lost(self):
+        """Record that the lock expired under a turn and another process may own the mailbox."""
+        self.lock_lost = True
+        metrics.incr("mailbox.lock_lost")
+        logger.warning("Lost the lock of %s after a turn longer than MAILBOX_LOCK_TIMEOUT", self.key)
+
+    def release(self):
+        """Give up ownership of the mailbox, returning False if it was already lost."""
+        if self.lock_lost:
+            return False
+        try:
+            self.lock.release()
+        except LockError:
+            self.lost()
+            return False
+        return True
+
+    def keep_alive(self):
+        """
+        Push back the lock expiry while a long conversation turn is running,
+        returning False if the lock expired meanwhile.
+        """
+        try:
+            self.lock.reacquire()
+        except LockError:
+            self.lost()
+            return False
+        return True
+
+    def take(self):
+        """
+        Move every pending message to the processing list and return all it
+        holds, oldest first, starting with any a previous owner left there.
+        """
+        pipeline = self.connection.pipeline()
+        for _ in range(self.connection.llen(self.key)):
+            pipeline.lmove(self.key, self.processing, "LEFT", "RIGHT")
+        pipeline.lrange(self.processing, 0, -1)
+        pipeline.expire(self.processing, settings.MAILBOX_LOCK_TIMEOUT * 10)
+        raw = pipeline.execute()[-2]
+        return [json.loads(item) for item in raw]
+
+    def done(self):
+        """Drop the oldest taken message once it has been dispatched."""
+        self.connection.lpop(self.processing)
+
+    def pending(self):
+        """Check whether messages arrived after the last ``take``."""
+        return bool(self.connection.llen(self.key))
+
+
+def skipped(messages):
+    """Indexes of the taken messages that are not dispatched."""
+    return stale(messages) if settings.MAILBOX_COALESCE_TAPS else set()
+
+
+def drain(mailbox, dispatch):
+    """
+    Dispatch everything in ``mailbox``, which the caller owns, logging
+    failures. Returns False, leaving the rest to the new owner, if the
+    ownership was lost part way.
+    """
+    messages = mailbox.take()
+    while messages:
+        replaced = skipped(messages)
+        for index, item in enumerate(messages):
+            if index not in replaced:
+                try:
+                    dispatch(item)
+                # pylint: disable=broad-except
+                except Exception:
+                    metrics.incr("mailbox.failed")
+                    logger.exception("Failed to dispatch %s", item)
+            mailbox.done()
+            if not mailbox.keep_alive():
+                return False
+        messages = mailbox.take()
+    return True
+
+
+def deliver(message, dispatch):
+    """
+    Queue ``message`` in its sender's mailbox and drain the mailbox with
+    ``dispatch`` if no other process is already doing so.
+    """
+    mailbox = Mailbox(sender(message))
+    mailbox.push(message)
+    # Re-check after releasing: a message pushed between the last take and the
+    # release would otherwise wait for the user's next message.
+    while mailbox.acquire():
+        try:
+            drained = drain(mailbox, dispatch)
+        finally:
+            mailbox.release()
+        # Whoever took the lock over drains what is left.
+        if not drained or not mailbox.pending():
+            break
+
+
+def deliver_now(message, dispatch):
+    """
+    Dispatch ``message`` as its sender's mailbox owner, after whatever the
+    mailbox still holds. Used by the queue consumers, which acknowledge a
+    stream entry only once this returns, so ``dispatch`` errors propagate.
+    """
+    mailbox = Mailbox(sender(message))
+    if not mailbox.wait():
+        raise MailboxBusy(f"Mailbox {mailbox.key} is still owned")
+    try:
+        if not drain(mailbox, dispatch):
+            raise MailboxBusy(f"Lost the lock of {mailbox.key}")
+        dispatch(message)
+    finally:
+        mailbox.release()
+
+
+async def adrain(mailbox, dispatch):
+    """``drain`` with ``dispatch`` being a coroutine function."""
+    messages = await sync_to_async(mailbox.take)()
+    while messages:
+        replaced = await sync_to_async(skipped)(messages)
+        for index, item in enumerate(messages):
+            if index not in replaced:
+                try:
+                    await dispatch(item)
+                # pylint: disable=broad-except
+                except Exception:
+                    await sync_to_async(metrics.incr)("mailbox.failed")
+                    logger.exception("Failed to dispatch %s", item)
+            await sync_to_async(mailbox.done)()
+            if not await sync_to_async(mailbox.keep_alive)():
+                return False
+        messages = await sync_to_async(mailbox.take)()
+    return True
+
+
+async def adeliver(message, dispatch):
+    """``deliver`` for the ASGI webhook, ``dispatch`` being a coroutine function."""
+    mailbox = await sync_to_async(Mailbox)(sender(message))
+    await sync_to_async(mailbox.push)(message)
+    while await sync_to_async(mailbox.acquire)():
+        try:
+            drained = await adrain(mailbox, dispatch)
+        finally:
+            await sync_to_async(mailbox.release)()
+        if not drained or not await sync_to_async(mailbox.pending)():
+            break
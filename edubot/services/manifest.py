@@ -0,0 +1,97 @@
+"""Per-course manifest of the published tutorials, materials and quizzes."""
+# pylint: disable=import-error
+from collections import namedtuple
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_redis import get_redis_connection
+from material.models import CourseMaterial
+from quiz.models import Quiz
+from tutorials.models import Tutorial
+from services import metrics
+
+# Hash of course id -> content version, bumped when a tutorial, material or
+# quiz of the course is published, edited or removed.
+VERSION_KEY = "edubot:manifest:versions"
+
+# Menu rows of a course's content, in the shape the WhatsApp list rows of
+# each menu are sent in, so paging through them is slicing a tuple.
+Manifest = namedtuple("Manifest", ["course_id", "version", "tutorials", "materials", "quizzes"])
+
+_manifests = {}
+
+
+def tutorial_row(tutorial):
+    """List row of a tutorial."""
+    description = tutorial.description
+    return {
+        "id": f"{tutorial.id}",
+        "name": tutorial.title,
+        "description": description[:69] + "..." if len(description) > 69 else description,
+    }
+
+
+def material_row(material):
+    """List row of a course material, sent in a ``paginated_interactive`` menu."""
+    return {
+        "id": f"course_material_{material.id}",
+        "title": material.title if material.title else '',
+        "description": f"{material.description[:69] if material.description else ''}...",
+    }
+
+
+def quiz_row(quiz):
+    """List row of a quiz."""
+    return {
+        "id": f"quiz_{quiz.id}",
+        "name": f"{quiz.title}",
+        "description": f"{quiz.description[:45]}...",
+    }
+
+
+def build(course_id, version):
+    """Query the published content of a course into a Manifest."""
+    # pylint: disable=no-member
+    fields = ("id", "title", "description")
+    return Manifest(
+        course_id=course_id,
+        version=version,
+        tutorials=tuple(tutorial_row(tutorial) for tutorial in Tutorial.objects.filter(
+            course_id=course_id, published=True).only(*fields).order_by("date_published", "id")),
+        materials=tuple(material_row(material) for material in CourseMaterial.objects.filter(
+            course_id=course_id).only(*fields).order_by("created_at", "id")),
+        quizzes=tuple(quiz_row(quiz) for quiz in Quiz.objects.filter(
+            course_id=course_id, is_published=True).only(*fields).order_by("date_created", "id")),
+    )
+
+
+def version(course_id):
+    """The content version of a course every process should be serving."""
+    return int(get_redis_connection("default").hget(VERSION_KEY, course_id) or 0)
+
+
+def for_course(course):
+    """Return the manifest of ``course``, rebuilding it when its content changed."""
+    latest = version(course.id)
+    manifest = _manifests.get(course.id)
+    if manifest is None or manifest.version != latest:
+        # The version is read before the rows, so content committed in
+        # between bumps it again and the next turn rebuilds.
+        manifest = _manifests[course.id] = build(course.id, latest)
+        metrics.incr("manifest.builds")
+    return manifest
+
+
+def bump(course_id):
+    """Invalidate the manifest of a course in every process."""
+    get_redis_connection("default").hincrby(VERSION_KEY, course_id, 1)
+
+
+# pylint: disable=unused-argument
+@receiver([post_save, post_delete], sender=Tutorial)
+@receiver([post_save, post_delete], sender=CourseMaterial)
+@receiver([post_save, post_delete], sender=Quiz)
+def content_changed(sender, instance, **kwargs):
+    """Bump the course's version once the change is committed."""
+    course_id = instance.course_id
+    transaction.on_commit(lambda: bump(course_id))
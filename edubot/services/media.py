@@ -0,0 +1,95 @@
+"""Lazy handles for media that users send to the chatbot."""
+# pylint: disable=import-error
+from django.core.cache import cache
+from django.core.files.base import File
+from django.conf import settings
+from services import http_client
+
+CHUNK_SIZE = 64 * 1024
+
+
+class MediaStream(File):
+    """
+        File whose content is read from a Graph media download as it is saved.
+
+        Storage backends only ever iterate ``chunks()``, so the document goes
+        from the HTTP response to storage without being held in memory. The
+        size is known once the last chunk has been written.
+    """
+
+    def __init__(self, response, name):
+        """Wrap a streamed ``httpx`` response."""
+        super().__init__(response, name)
+        self.response = response
+        self.content_type = response.headers.get('content-type')
+        self.downloaded = 0
+
+    def chunks(self, chunk_size=None):
+        """Yield the download chunk by chunk."""
+        for chunk in self.response.iter_bytes(chunk_size or CHUNK_SIZE):
+            self.downloaded += len(chunk)
+            yield chunk
+        self.response.close()
+
+    @property
+    def size(self):
+        """Bytes written so far, the whole file once it has been saved."""
+        return self.downloaded
+
+    def multiple_chunks(self, chunk_size=None):
+        """The download is always read in chunks."""
+        return True
+
+    def close(self):
+        """Close the HTTP response."""
+        self.response.close()
+
+
+class MediaHandle(str):
+    """
+        Message body of a media message.
+
+        It compares and prints as the media id, so handlers that do string work
+        on every message keep working. The Graph API is only asked for the
+        download URL when a handler reads ``url`` or ``open``, and the answer is
+        cached for a few minutes because Meta expires the URLs soon after.
+    """
+
+    def __new__(cls, media_id, filename=None, mime_type=None):
+        """Create the handle without touching the network."""
+        handle = super().__new__(cls, media_id)
+        handle.media_id = media_id
+        handle.filename = filename
+        handle.mime_type = mime_type
+        return handle
+
+    def __reduce__(self):
+        """Pickle as the constructor arguments, for the session cache."""
+        return (self.__class__, (self.media_id, self.filename, self.mime_type))
+
+    @property
+    def url(self):
+        """Resolve the media id to its download URL."""
+        key = f"media_url:{self.media_id}"
+        url = cache.get(key)
+        if url is None:
+            response = http_client.request(
+                http_client.GRAPH_MEDIA, "GET",
+                f"{settings.GRAPH_API_URL}/{self.media_id}",
+                headers=http_client.graph_headers(),
+            )
+            response.raise_for_status()
+            url = response.json().get('url')
+            cache.set(key, url, settings.MEDIA_URL_CACHE_TTL)
+        return url
+
+    def open(self):
+        """Start the download, returning a File that streams it into storage."""
+        response = http_client.stream(
+            http_client.GRAPH_MEDIA, "GET", self.url, headers=http_client.graph_headers())
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return MediaStream(response, self.filename or self.media_id)
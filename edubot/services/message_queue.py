@@ -0,0 +1,198 @@
+"""Redis Streams work queue for inbound WhatsApp webhooks."""
+# pylint: disable=import-error
+import json
+import logging
+import os
+import socket
+from django.conf import settings
+from django.db import close_old_connections
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidPayload(ValueError):
+    """Raised when a webhook body is not a WhatsApp Business Account event."""
+
+
+def validate_payload(payload):
+    """Check that the payload looks like a Cloud API webhook before queueing it."""
+    if not isinstance(payload, dict):
+        raise InvalidPayload("Payload must be a JSON object")
+    if payload.get("object") != "whatsapp_business_account":
+        raise InvalidPayload(f"Unsupported webhook object {payload.get('object')!r}")
+    entries = payload.get("entry")
+    if not isinstance(entries, list) or not entries:
+        raise InvalidPayload("Payload has no entries")
+    return payload
+
+
+def enqueue_messages(messages):
+    """
+    Append the single-message webhooks of one batch to the stream as a
+    single entry, so one consumer dispatches them in the order given.
+    """
+    if not messages:
+        return None
+    connection = get_redis_connection("default")
+    return connection.xadd(
+        settings.BOT_QUEUE_STREAM,
+        {"messages": json.dumps(messages)},
+        maxlen=settings.BOT_QUEUE_MAXLEN,
+        approximate=True,
+    )
+
+
+class WebhookQueueConsumer(object):
+    """
+        Consumer group member that drains the webhook stream.
+
+        Every consumer in the group receives a disjoint share of the stream, so
+        any number of processes on any number of nodes can run side by side.
+        Entries are acknowledged only after each of their messages has been
+        dispatched, moved to the dead-letter stream or queued again behind a
+        busy mailbox; entries left pending by
+        a crashed consumer are reclaimed once they have been idle for
+        ``claim_idle_ms``.
+    """
+
+    def __init__(self, name=None, batch_size=10, block_ms=5000, claim_idle_ms=60000):
+        """Initialize the consumer."""
+        self.connection = get_redis_connection("default")
+        self.stream = settings.BOT_QUEUE_STREAM
+        self.group = settings.BOT_QUEUE_GROUP
+        self.dead_letter_stream = f"{self.stream}:dead"
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.running = False
+
+    def ensure_group(self):
+        """Create the consumer group (and the stream) if it does not exist yet."""
+        try:
+            self.connection.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as error:
+            if "BUSYGROUP" not in str(error):
+                raise
+
+    def reclaim(self):
+        """Take over entries that another consumer fetched but never acknowledged."""
+        response = self.connection.xautoclaim(
+            self.stream,
+            self.group,
+            self.name,
+            min_idle_time=self.claim_idle_ms,
+            start_id="0-0",
+            count=self.batch_size,
+        )
+        return response[1]
+
+    def read(self):
+        """Fetch the next batch, giving priority to reclaimed entries."""
+        entries = self.reclaim()
+        if entries:
+            return entries
+        response = self.connection.xreadgroup(
+            self.group,
+            self.name,
+            {self.stream: ">"},
+            count=self.batch_size,
+            block=self.block_ms,
+        )
+        return response[0][1] if response else []
+
+    @staticmethod
+    def messages(fields):
+        """The single-message webhooks of a stream entry, in dispatch order."""
+        # pylint: disable=import-outside-toplevel
+        from services.webhook_router import split_messages
+        raw = fields.get(b"messages") or fields.get("messages")
+        if raw:
+            return json.loads(raw)
+        # Entries queued before batches were kept together hold one webhook.
+        return list(split_messages(json.loads(fields.get(b"payload") or fields.get("payload"))))
+
+    @staticmethod
+    def handle(message):
+        """Run the chatbot pipeline for one message, raising whatever it raises."""
+        # pylint: disable=import-outside-toplevel
+        from services.action_picker import ActionPickerService
+        from services.mailbox import deliver_now
+        deliver_now(message, lambda item: ActionPickerService(payload=item).dispatch_action())
+
+    def dead_letter(self, entry_id, fields, error):
+        """Move what failed of an entry to the dead-letter stream."""
+        self.connection.xadd(
+            self.dead_letter_stream,
+            dict(fields, error=repr(error), source_id=entry_id),
+            maxlen=settings.BOT_QUEUE_MAXLEN,
+            approximate=True,
+        )
+
+    def requeue(self, entry_id, messages):
+        """
+        Queue the messages of an entry that were not dispatched as a new
+        entry and acknowledge the original, in one transaction.
+        """
+        pipeline = self.connection.pipeline()
+        pipeline.xadd(
+            self.stream,
+            {"messages": json.dumps(messages)},
+            maxlen=settings.BOT_QUEUE_MAXLEN,
+            approximate=True,
+        )
+        pipeline.xack(self.stream, self.group, entry_id)
+        pipeline.execute()
+        metrics.incr("queue.requeued", len(messages))
+
+    def process(self, entry_id, fields):
+        """
+        Dispatch one stream entry and acknowledge it. If a sender's mailbox
+        stays busy, the messages from that one on are queued again, so the
+        ones already dispatched are not run twice.
+        """
+        # pylint: disable=import-outside-toplevel
+        from services.mailbox import MailboxBusy
+        close_old_connections()
+        try:
+            try:
+                messages = self.messages(fields)
+            except (ValueError, TypeError) as error:
+                logger.exception("Webhook %s is unreadable, moving it to %s",
+                                 entry_id, self.dead_letter_stream)
+                self.dead_letter(entry_id, fields, error)
+                messages = []
+            for index, message in enumerate(messages):
+                try:
+                    with metrics.batch():
+                        self.handle(message)
+                except MailboxBusy:
+                    logger.warning("Webhook %s waits for a busy mailbox, queueing it again", entry_id)
+                    self.requeue(entry_id, messages[index:])
+                    return
+                # pylint: disable=broad-except
+                except Exception as error:
+                    logger.exception("Message of webhook %s failed, moving it to %s",
+                                     entry_id, self.dead_letter_stream)
+                    self.dead_letter(entry_id, {"messages": json.dumps([message])}, error)
+        finally:
+            close_old_connections()
+        self.connection.xack(self.stream, self.group, entry_id)
+
+    def run(self):
+        """Consume the stream until ``stop`` is called."""
+        self.ensure_group()
+        self.running = True
+        logger.info("Bot worker %s consuming %s as %s",
+                    self.name, self.stream, self.group)
+        while self.running:
+            for entry_id, fields in self.read():
+                self.process(entry_id, fields)
+
+    def stop(self, *args):
+        """Finish the current batch and exit the loop."""
+        self.running = False
@@ -0,0 +1,147 @@
+"""Counters shared by every web and worker process through Redis."""
+# pylint: disable=import-error
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import sync_to_async
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = "edubot:metrics:counters"
+HISTOGRAMS_KEY = "edubot:metrics:histograms"
+# Upper bounds, in milliseconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Metrics recorded inside a ``batch``, written when the outermost one ends.
+_pending = ContextVar("pending_metrics", default=None)
+
+
+class Pending(object):
+    """Counter increments and latency samples not written to Redis yet."""
+
+    def __init__(self):
+        """Initialize the buffer."""
+        self.counters = Counter()
+        self.samples = []
+
+    def __bool__(self):
+        return bool(self.counters or self.samples)
+
+
+def incr(name, amount=1):
+    """Increment a counter, never failing the caller."""
+    pending = _pending.get()
+    if pending is not None:
+        pending.counters[name] += amount
+        return
+    try:
+        get_redis_connection("default").hincrby(COUNTERS_KEY, name, amount)
+    except RedisError:
+        logger.warning("Could not record metric %s", name)
+
+
+def bucket(milliseconds):
+    """Return the histogram bucket a latency falls into."""
+    for bound in LATENCY_BUCKETS:
+        if milliseconds <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+
+def sample(pipeline, name, milliseconds):
+    """Queue the commands that add a latency sample to the histogram ``name``."""
+    pipeline.sadd(HISTOGRAMS_KEY, name)
+    pipeline.hincrby(f"{HISTOGRAMS_KEY}:{name}", bucket(milliseconds), 1)
+    pipeline.hincrby(f"{HISTOGRAMS_KEY}:{name}", "count", 1)
+    pipeline.hincrbyfloat(f"{HISTOGRAMS_KEY}:{name}", "sum_ms", milliseconds)
+
+
+def observe(name, seconds):
+    """Record a latency sample in the histogram ``name``, never failing the caller."""
+    milliseconds = seconds * 1000
+    pending = _pending.get()
+    if pending is not None:
+        pending.samples.append((name, milliseconds))
+        return
+    try:
+        pipeline = get_redis_connection("default").pipeline(transaction=False)
+        sample(pipeline, name, milliseconds)
+        pipeline.execute()
+    except RedisError:
+        logger.warning("Could not record metric %s", name)
+
+
+def write(pending):
+    """Write buffered metrics in a single pipeline, never failing the caller."""
+    if not pending:
+        return
+    try:
+        pipeline = get_redis_connection("default").pipeline(transaction=False)
+        for name, amount in pending.counters.items():
+            pipeline.hincrby(COUNTERS_KEY, name, amount)
+        for name, milliseconds in pending.samples:
+            sample(pipeline, name, milliseconds)
+        pipeline.execute()
+    except RedisError:
+        logger.warning("Could not record %d metrics", len(pending.counters) + len(pending.samples))
+
+
+class batch(object):  # pylint: disable=invalid-name
+    """
+        Context manager that holds back the metrics recorded inside it, in
+        the same context, and writes them in one pipeline when it ends.
+
+        A request or chat turn records a couple of dozen metrics; written one
+        by one they would cost as many Redis round trips. Nested batches
+        leave the writing to the outermost one.
+    """
+
+    def __init__(self):
+        """Initialize the batch."""
+        self.pending = None
+        self.token = None
+
+    def __enter__(self):
+        if _pending.get() is None:
+            self.pending = Pending()
+            self.token = _pending.set(self.pending)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.token is not None:
+            _pending.reset(self.token)
+            write(self.pending)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if self.token is not None:
+            _pending.reset(self.token)
+            await sync_to_async(write)(self.pending)
+        return False
+
+
+def histograms():
+    """Return every histogram as ``{name: {bucket: count, "count": n, "sum_ms": total}}``."""
+    connection = get_redis_connection("default")
+    result = {}
+    for name in sorted(item.decode() for item in connection.smembers(HISTOGRAMS_KEY)):
+        raw = connection.hgetall(f"{HISTOGRAMS_KEY}:{name}")
+        result[name] = {key.decode(): float(value) if key == b"sum_ms" else int(value)
+                        for key, value in raw.items()}
+    return result
+
+
+def counters():
+    """Return every counter as a dict of ints."""
+    raw = get_redis_connection("default").hgetall(COUNTERS_KEY)
+    return {key.decode(): int(value) for key, value in raw.items()}
+
+
+def snapshot():
+    """Return all recorded metrics."""
+    return {"counters": counters(), "histograms": histograms()}
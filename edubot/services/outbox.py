@@ -0,0 +1,103 @@
+"""Deliver the WhatsApp messages written to the outbox."""
+# pylint: disable=import-error
+import logging
+import time
+from datetime import timedelta
+import httpx
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from api.models import OutboundMessage
+from services import http_client, metrics
+from services.circuit_breaker import UpstreamUnavailable
+from services.rate_governor import throttle_delay
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    """Exponential backoff before the next attempt, capped at OUTBOX_MAX_BACKOFF."""
+    return min(settings.OUTBOX_BASE_BACKOFF * 2 ** (attempts - 1), settings.OUTBOX_MAX_BACKOFF)
+
+
+def fail(message, error, permanent=False):
+    """Schedule a retry, or move the message to Dead once it is out of attempts."""
+    message.attempts += 1
+    message.last_error = error
+    if permanent or message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.status = "Dead"
+        metrics.incr("outbox.dead")
+        logger.error("Outbox message %s to %s is dead: %s", message.id, message.recipient, error)
+    else:
+        message.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(message.attempts))
+        metrics.incr("outbox.retried")
+    message.save(update_fields=["attempts", "last_error", "status", "next_attempt_at", "updated_at"])
+
+
+def deliver(message):
+    """Send one outbox message and record the outcome on it."""
+    try:
+        response = http_client.send_message(message.payload, lane=message.lane)
+    except (UpstreamUnavailable, httpx.HTTPError) as error:
+        fail(message, repr(error))
+        return False
+    if response.status_code >= 400:
+        # Graph rejects bad recipients and payloads with a 4xx that will never
+        # succeed; throttling and server errors are worth another attempt.
+        permanent = response.status_code < 500 and throttle_delay(response) is None
+        fail(message, response.text[:2000], permanent=permanent)
+        return False
+    message.status = "Sent"
+    message.sent_at = timezone.now()
+    message.attempts += 1
+    message.upstream_reference = (response.json().get('messages') or [{}])[0].get('id', '')
+    message.save(update_fields=["status", "sent_at", "attempts", "upstream_reference", "updated_at"])
+    metrics.incr("outbox.sent")
+    metrics.observe("outbox.delivery", (message.sent_at - message.created_at).total_seconds())
+    return True
+
+
+def claim(batch_size):
+    """
+    Lease up to ``batch_size`` due messages to this dispatcher for
+    OUTBOX_LEASE seconds and return them.
+
+    Rows are locked with SKIP LOCKED only for the short transaction that
+    pushes their next attempt past the lease, so several dispatchers can drain
+    the outbox side by side without sending a message twice, and no lock is
+    held while the messages are sent. A dispatcher that dies leaves its
+    messages to be picked up again once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # pylint: disable=no-member
+        messages = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True).filter(
+                status="Pending", next_attempt_at__lte=now,
+            ).order_by("next_attempt_at")[:batch_size]
+        )
+        OutboundMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+            next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE))
+    return messages
+
+
+def dispatch_batch(batch_size):
+    """
+    Deliver up to ``batch_size`` due messages, returning how many were
+    claimed. Each outcome is saved on its own as soon as it is known.
+    """
+    messages = claim(batch_size)
+    started = time.perf_counter()
+    for index, message in enumerate(messages):
+        if time.perf_counter() - started > settings.OUTBOX_LEASE / 2:
+            # Too little of the lease is left to be sure of the send; hand
+            # the rest back rather than risk another dispatcher sending them too.
+            # pylint: disable=no-member
+            OutboundMessage.objects.filter(
+                pk__in=[pending.pk for pending in messages[index:]],
+            ).update(next_attempt_at=timezone.now())
+            break
+        deliver(message)
+    if messages:
+        metrics.observe("outbox.batch", time.perf_counter() - started)
+    return len(messages)
@@ -0,0 +1,183 @@
+"""Keyset pagination for WhatsApp list menus."""
+import base64
+import json
+from collections import namedtuple
+from django.db.models import Q, QuerySet
+
+# WhatsApp list messages hold at most 10 rows, row titles at most 24
+# characters and descriptions at most 72.
+MAX_ROWS = 10
+MAX_TITLE = 24
+MAX_DESCRIPTION = 72
+
+# Ids of the page control rows. Both are kept out of every menu's own ids.
+NEXT = "next_page"
+PREVIOUS = "prev_page"
+CONTROLS = (NEXT, PREVIOUS)
+
+Page = namedtuple("Page", [
+    "items",
+    "number",
+    "total_pages",
+    "has_previous",
+    "has_next",
+    "cursor",
+])
+
+
+def encode(state):
+    """Pack the cursor state into the opaque string kept in the session."""
+    return base64.urlsafe_b64encode(json.dumps(state, default=str).encode()).decode()
+
+
+def decode(cursor):
+    """Unpack a cursor, None for a missing or unreadable one."""
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def clip(text, limit):
+    """Shorten ``text`` to ``limit`` characters, marking the cut."""
+    text = f"{text or ''}"
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class Pager(object):
+    """
+        Pages through an ordered source, keeping only an opaque cursor in the
+        session.
+
+        A queryset is paged with keyset filters on ``order``, which must end
+        in a unique field, so every page is one indexed query for ``size`` + 1
+        rows however far into the list it is. A tuple, such as the rows of a
+        course manifest, is already in memory and is sliced.
+    """
+
+    def __init__(self, source, size=MAX_ROWS - len(CONTROLS), order=("pk",)):
+        """Initialize the pager."""
+        self.source = source
+        self.size = min(size, MAX_ROWS - len(CONTROLS))
+        self.order = tuple(order)
+
+    def page(self, cursor=None, message=None):
+        """
+        The page after ``cursor`` when ``message`` is NEXT, the one before it
+        for PREVIOUS, otherwise the page ``cursor`` points at; the first page
+        without a cursor.
+        """
+        state = decode(cursor)
+        if isinstance(self.source, QuerySet):
+            return self.keyset_page(state, message)
+        return self.slice_page(state, message)
+
+    def slice_page(self, state, message):
+        """Page of an in-memory sequence."""
+        number = state["number"] if state else 1
+        if state and message == NEXT and state.get("has_next"):
+            number += 1
+        elif state and message == PREVIOUS and number > 1:
+            number -= 1
+        total = len(self.source)
+        total_pages = max(1, -(-total // self.size))
+        number = min(number, total_pages)
+        start = (number - 1) * self.size
+        has_next = start + self.size < total
+        return Page(
+            items=list(self.source[start:start + self.size]),
+            number=number,
+            total_pages=total_pages,
+            has_previous=number > 1,
+            has_next=has_next,
+            cursor=encode({"number": number, "has_next": has_next}),
+        )
+
+    def keyset_page(self, state, message):
+        """Page of a queryset, found from the keys of the current page."""
+        if state is None:
+            number, condition, backwards = 1, None, False
+        elif message == NEXT and state["has_next"]:
+            number, condition, backwards = state["number"] + 1, self.after(state["last"]), False
+        elif message == PREVIOUS and state["number"] > 1:
+            number, condition, backwards = (
+                state["number"] - 1, self.after(state["first"], reverse=True), True)
+        else:
+            number, condition, backwards = (
+                state["number"], self.after(state["first"], inclusive=True), False)
+        items = self.fetch(condition, backwards)
+        more = len(items) > self.size
+        items = items[:self.size]
+        if backwards:
+            items.reverse()
+            number = number if more else 1
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = number > 1, more
+        if not items and state is not None:
+            # The rows under the cursor are gone, start over.
+            return self.keyset_page(None, None)
+        return Page(
+            items=items,
+            number=number,
+            total_pages=None,
+            has_previous=has_previous,
+            has_next=has_next,
+            cursor=encode({
+                "number": number,
+                "has_next": has_next,
+                "first": self.key(items[0]) if items else None,
+                "last": self.key(items[-1]) if items else None,
+            }),
+        )
+
+    def fetch(self, condition, reverse):
+        """``size`` + 1 rows matching ``condition``, walking the order backwards if ``reverse``."""
+        order = [self.flip(field) for field in self.order] if reverse else list(self.order)
+        queryset = self.source if condition is None else self.source.filter(condition)
+        return list(queryset.order_by(*order)[:self.size + 1])
+
+    def key(self, item):
+        """Values of the order fields of ``item``."""
+        return [getattr(item, field.lstrip("-")) for field in self.order]
+
+    def after(self, key, reverse=False, inclusive=False):
+        """Filter for the rows after ``key`` in the order, before it if ``reverse``."""
+        names = [field.lstrip("-") for field in self.order]
+        condition = Q(**dict(zip(names, key))) if inclusive else Q(pk__in=[])
+        for index, field in enumerate(self.order):
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            condition |= Q(**dict(zip(names[:index], key)), **{f"{names[index]}__{lookup}": key[index]})
+        return condition
+
+    @staticmethod
+    def flip(field):
+        """The opposite direction of an order field."""
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def rows(page, row, title="name"):
+    """
+    List rows of ``page``, made by ``row`` from each item, followed by its
+    page controls, within WhatsApp's limits. ``title`` is the key the menu
+    sends row titles under.
+    """
+    items = [dict(row(item)) for item in page.items]
+    if page.has_previous:
+        items.append({"id": PREVIOUS, title: "Previous Page", "description": "Previous page"})
+    if page.has_next:
+        items.append({"id": NEXT, title: "Next Page", "description": "Next page"})
+    for item in items:
+        item[title] = clip(item.get(title), MAX_TITLE)
+        if "description" in item:
+            item["description"] = clip(item["description"], MAX_DESCRIPTION)
+    return items[:MAX_ROWS]
+
+
+def label(page):
+    """``Page 2 of 3``, or ``Page 2`` when the total is not known."""
+    if page.total_pages:
+        return f"Page {page.number} of {page.total_pages}"
+    return f"Page {page.number}"
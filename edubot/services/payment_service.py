@@ -1,7 +1,8 @@
 """Imports"""
 import hashlib
-import requests
 from django.conf import settings
+from services import http_client
+from services.circuit_breaker import UpstreamUnavailable
 
 
 class ProcessPayment(object):
@@ -52,9 +53,13 @@ class ProcessPayment(object):
         data["hash"] = (
             hashlib.sha512("".join(hash_data).encode("utf-8")).hexdigest().upper()
         )
-        response_data = requests.post(
-            url="https://www.paynow.co.zw/interface/remotetransaction", data=data
-        )
+        try:
+            response_data = http_client.request(
+                http_client.PAYNOW, "POST",
+                "https://www.paynow.co.zw/interface/remotetransaction", data=data
+            )
+        except UpstreamUnavailable:
+            return {"status": "Error", "message": "Failed to process payment!"}
         if response_data.status_code == 200:
             response_ = self.clean_response(response_data.content)
             print('SECONDARY : ',response_)
@@ -80,7 +85,10 @@ class ProcessPayment(object):
     def poll(self, url=None):
         """Poll for status"""
         if url:
-            results = requests.get(url=url)
+            try:
+                results = http_client.request(http_client.PAYNOW, "GET", url)
+            except UpstreamUnavailable:
+                return None
             if results.status_code == 200:
                 return self.clean_response(results.content)
         return None
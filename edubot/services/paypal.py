@@ -2,10 +2,11 @@
 import base64
 import json
 
-import requests
 # Create your views here.
 from django.core.cache import cache
 from decouple import config
+from services import http_client
+from services.circuit_breaker import UpstreamUnavailable
 
 
 def get_jwt_tokens(platform):
@@ -79,7 +80,12 @@ class PAYPALCLIENTAPI:
         data = {
             "grant_type": "client_credentials"
         }
-        response = requests.post(auth_url, data, headers=headers)
+        try:
+            response = http_client.request(
+                http_client.PAYPAL, "POST", auth_url, data=data, headers=headers)
+        except UpstreamUnavailable as error:
+            print("PayPal unavailable : ", error)
+            return ''
         if response.status_code == 200:
             data = response.json()
             access_token = data['access_token']
@@ -97,7 +103,13 @@ class PAYPALCLIENTAPI:
         
         post_url = f"https://api.sandbox.paypal.com/v2/checkout/orders/{payment_id}/capture"
         self.headers = (PAYPALCLIENTAPI.access_token, False)
-        response = requests.post(post_url, headers=self.headers)
+        try:
+            response = http_client.request(
+                http_client.PAYPAL, "POST", post_url, headers=self.headers)
+        except UpstreamUnavailable as error:
+            return {
+                'error': str(error)
+            }
         
         if response.status_code in [200, 201]:
             return response.json()
@@ -133,7 +145,14 @@ class PAYPALCLIENTAPI:
         print('payload', payload)
 
         self.headers = (PAYPALCLIENTAPI.access_token, False)
-        response = requests.post(post_url, data=payload, headers=self.headers)
+        try:
+            response = http_client.request(
+                http_client.PAYPAL, "POST", post_url, content=payload, headers=self.headers)
+        except UpstreamUnavailable as error:
+            return {
+                'successful': False,
+                'response': {'error': str(error)}
+            }
         print("PayPal Response : ", response.json())
 
         if response.status_code == 201:
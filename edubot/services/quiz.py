@@ -1,10 +1,11 @@
 """Quiz service."""
-from django.core.cache import cache
 # pylint: disable = no-name-in-module
 # pylint: disable = import-error
 # pylint: disable = import-self
 from quiz.models import Quiz, Result
 from users.models import User
+from services import session_store
+from services.session_store import QUIZ, STATE
 
 
 class QuizService:
@@ -18,7 +19,7 @@ class QuizService:
         self.quiz = Quiz.objects.get(id=session['quiz_id'])
         self.quiz_session = None
 
-        if not cache.get(self.phone_number):
+        if not session_store.get(self.phone_number, STATE):
             #pylint: disable = no-member
             self.quiz = Quiz.objects.get(id=session['quiz_id'])
             self.quiz_session = {
@@ -31,7 +32,7 @@ class QuizService:
 
     def get_quiz_session(self):
         """Get quiz session from cache."""
-        sess = cache.get(f"{self.phone_number}_quiz_session")
+        sess = session_store.get(self.phone_number, QUIZ)
         if sess:
             #pylint: disable = no-member
             self.quiz = Quiz.objects.get(id=sess['quiz_id'])
@@ -44,7 +45,7 @@ class QuizService:
 
     def save_quiz_session(self):
         """Save quiz session to cache."""
-        cache.set(f"{self.phone_number}_quiz_session", self.quiz_session, 60 * 60 * 24)
+        session_store.put(self.phone_number, QUIZ, self.quiz_session, 60 * 60 * 24)
         return
 
     def deliver_quiz(self):
@@ -100,7 +101,7 @@ class QuizService:
             user = User.objects.get(phone_number=self.phone_number)
             result = Result.objects.get(user=user, quiz=self.quiz)
             
-            cache.delete(f"{self.phone_number}_quiz_session")
+            session_store.delete(self.phone_number, QUIZ)
             return {
                 "is_valid": True,
                 "data": [],
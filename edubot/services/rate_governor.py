@@ -0,0 +1,126 @@
+"""Cluster-wide token bucket for WhatsApp Cloud API sends."""
+# pylint: disable=import-error
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+from services import metrics
+from services.circuit_breaker import UpstreamUnavailable
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Graph error codes that mean the sending number or app is being throttled.
+THROTTLE_ERROR_CODES = (4, 80007, 130429)
+
+# Returns 0 when a token was taken, otherwise the milliseconds to wait.
+# The background lane only takes a token while more than ``reserve`` are left,
+# so notifications can never starve replies to users who are waiting.
+TAKE_TOKEN = """
+local now = tonumber(ARGV[4])
+local pause = tonumber(redis.call('GET', KEYS[2]) or '0')
+if pause > now then
+    return math.ceil((pause - now) * 1000)
+end
+local rate, burst, reserve = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local wait = 0
+if tokens >= 1 + reserve then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 + reserve - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return wait
+"""
+
+
+class RateLimited(UpstreamUnavailable):
+    """No send slot became available within the lane's patience."""
+
+    def __init__(self, lane):
+        super().__init__("graph_send", f"rate limited ({lane} lane)")
+
+
+class RateGovernor(object):
+    """
+        Token bucket shared by every process that sends from one phone number.
+
+        ``GRAPH_SEND_RATE`` tokens per second are added up to ``GRAPH_SEND_BURST``.
+        When Graph answers that we are being throttled, ``backoff`` pauses the
+        bucket for every process until the ``retry-after`` period is over.
+    """
+
+    def __init__(self, phone_number_id):
+        """Initialize the governor."""
+        self.connection = get_redis_connection("default")
+        self.key = f"edubot:ratelimit:{phone_number_id}"
+        self.pause_key = f"{self.key}:pause"
+        self.script = self.connection.register_script(TAKE_TOKEN)
+
+    def try_take(self, lane):
+        """Take a token, returning 0 on success or the seconds to wait before retrying."""
+        reserve = settings.GRAPH_SEND_INTERACTIVE_RESERVE if lane == BACKGROUND else 0
+        wait_ms = self.script(
+            keys=[self.key, self.pause_key],
+            args=[settings.GRAPH_SEND_RATE, settings.GRAPH_SEND_BURST, reserve, time.time()],
+        )
+        return wait_ms / 1000
+
+    def patience(self, lane):
+        """Seconds a send in ``lane`` may wait for a token."""
+        return settings.GRAPH_SEND_MAX_WAIT[lane]
+
+    def acquire(self, lane=INTERACTIVE):
+        """Block until a token is available, raising RateLimited after the lane's patience."""
+        deadline = time.monotonic() + self.patience(lane)
+        wait = self.try_take(lane)
+        while wait:
+            if time.monotonic() + wait > deadline:
+                metrics.incr(f"ratelimit.{lane}.rejected")
+                raise RateLimited(lane)
+            metrics.incr(f"ratelimit.{lane}.delayed")
+            time.sleep(wait)
+            wait = self.try_take(lane)
+
+    async def aacquire(self, lane=INTERACTIVE):
+        """``acquire`` for coroutines, waiting without blocking the event loop."""
+        deadline = time.monotonic() + self.patience(lane)
+        wait = await sync_to_async(self.try_take)(lane)
+        while wait:
+            if time.monotonic() + wait > deadline:
+                await sync_to_async(metrics.incr)(f"ratelimit.{lane}.rejected")
+                raise RateLimited(lane)
+            await sync_to_async(metrics.incr)(f"ratelimit.{lane}.delayed")
+            await asyncio.sleep(wait)
+            wait = await sync_to_async(self.try_take)(lane)
+
+    def backoff(self, seconds):
+        """Pause every sender for ``seconds``, never shortening a longer pause."""
+        until = time.time() + seconds
+        current = float(self.connection.get(self.pause_key) or 0)
+        if until > current:
+            self.connection.set(self.pause_key, until, ex=max(1, int(seconds) + 1))
+        metrics.incr("ratelimit.throttled")
+
+
+def throttle_delay(response):
+    """Return how long Graph asked us to back off, or None if the send was not throttled."""
+    if response.status_code < 400:
+        return None
+    if response.status_code != 429:
+        try:
+            code = response.json().get('error', {}).get('code')
+        except (AttributeError, ValueError):
+            return None
+        if code not in THROTTLE_ERROR_CODES:
+            return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return settings.GRAPH_THROTTLE_BACKOFF
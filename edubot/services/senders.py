@@ -0,0 +1,60 @@
+"""Registry of the WhatsApp numbers we send from and which student uses which."""
+# pylint: disable=import-error
+import zlib
+from django.conf import settings
+from django_redis import get_redis_connection
+from services import metrics
+
+ASSIGNMENTS_KEY = "edubot:senders"
+
+
+def registry():
+    """Phone number IDs outbound messages may be sent from."""
+    return settings.PHONE_NUMBER_IDS
+
+
+def default_sender(phone_number):
+    """Spread students evenly over the registry; crc32 is stable across processes."""
+    numbers = registry()
+    return numbers[zlib.crc32(str(phone_number).encode()) % len(numbers)]
+
+
+def sender_for(phone_number):
+    """
+    Return the phone number ID a student is served from.
+
+    The assignment is stored the first time a student is messaged, so adding
+    numbers to the registry only spreads new students and never moves a
+    conversation to a different number. Students whose number was retired
+    are reassigned.
+    """
+    if not phone_number:
+        return registry()[0]
+    connection = get_redis_connection("default")
+    assigned = connection.hget(ASSIGNMENTS_KEY, phone_number)
+    if assigned is not None and assigned.decode() in registry():
+        return assigned.decode()
+    sender = default_sender(phone_number)
+    connection.hset(ASSIGNMENTS_KEY, phone_number, sender)
+    metrics.incr("senders.assigned")
+    return sender
+
+
+def route_inbound(envelopes):
+    """
+    Pin the sender of each single-message webhook to the number it arrived on,
+    so replies come from the number the student wrote to.
+    """
+    pinned = {}
+    for envelope in envelopes:
+        value = envelope['entry'][0]['changes'][0]['value']
+        phone_number_id = (value.get('metadata') or {}).get('phone_number_id')
+        if phone_number_id not in registry():
+            metrics.incr("senders.unknown_inbound")
+            continue
+        for contact in value.get('contacts') or []:
+            if contact.get('wa_id'):
+                pinned[contact['wa_id']] = phone_number_id
+    if pinned:
+        get_redis_connection("default").hset(ASSIGNMENTS_KEY, mapping=pinned)
+
@@ -0,0 +1,97 @@
+"""Serializers for the values kept in a user's session hash."""
+# pylint: disable=import-error
+import pickle
+import zlib
+import msgpack
+from django.conf import settings
+
+# First byte of every encoded value. Pickles written before the codec existed
+# start with the protocol opcode, so they are still read back.
+PICKLE = b"\x80"
+MSGPACK = b"M"
+MSGPACK_ZLIB = b"Z"
+
+# msgpack extension holding a pickle of anything msgpack has no type for
+# (MediaHandle, datetimes, model instances).
+PICKLED_EXT = 1
+
+
+def pack_default(value):
+    """Pickle values msgpack cannot represent into an extension type."""
+    return msgpack.ExtType(PICKLED_EXT, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def unpack_ext(code, data):
+    """Unpickle the extension types written by ``pack_default``."""
+    if code == PICKLED_EXT:
+        return pickle.loads(data)
+    return msgpack.ExtType(code, data)
+
+
+class PickleCodec(object):
+    """The format django_redis uses, kept so a deployment can roll back."""
+
+    name = "pickle"
+
+    def encode(self, value):
+        """Serialize a value."""
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+class MsgpackCodec(object):
+    """
+        msgpack, zlib-compressed once a value is ``compress_threshold`` bytes.
+
+        Strings such as state names and the JSON of interactive messages pack
+        without pickle's per-object opcodes, and the repeated keys of history
+        entries compress well. A threshold of 0 turns compression off.
+    """
+
+    name = "msgpack"
+
+    def __init__(self, compress_threshold):
+        """Initialize the codec."""
+        self.compress_threshold = compress_threshold
+
+    def encode(self, value):
+        """Serialize a value."""
+        packed = msgpack.packb(value, default=pack_default, strict_types=True)
+        if self.compress_threshold and len(packed) >= self.compress_threshold:
+            compressed = zlib.compress(packed, settings.SESSION_COMPRESS_LEVEL)
+            if len(compressed) < len(packed):
+                return MSGPACK_ZLIB + compressed
+        return MSGPACK + packed
+
+
+def decode(raw):
+    """Deserialize a value written by any codec."""
+    tag, body = raw[:1], raw[1:]
+    if tag == MSGPACK:
+        return msgpack.unpackb(body, ext_hook=unpack_ext, strict_map_key=False)
+    if tag == MSGPACK_ZLIB:
+        return msgpack.unpackb(zlib.decompress(body), ext_hook=unpack_ext, strict_map_key=False)
+    return pickle.loads(raw)
+
+
+def is_current(raw):
+    """True if ``raw`` is already in the configured codec's format."""
+    if settings.SESSION_CODEC == PickleCodec.name:
+        return raw[:1] == PICKLE
+    return raw[:1] in (MSGPACK, MSGPACK_ZLIB)
+
+
+def codec(name=None, compress_threshold=None):
+    """Return the codec named by SESSION_CODEC, or by ``name``."""
+    name = name or settings.SESSION_CODEC
+    if name == PickleCodec.name:
+        return PickleCodec()
+    if name == MsgpackCodec.name:
+        if compress_threshold is None:
+            compress_threshold = settings.SESSION_COMPRESS_THRESHOLD
+        return MsgpackCodec(compress_threshold)
+    raise ValueError(f"Unknown session codec {name!r}")
+
+
+def encode(value):
+    """Serialize a value with the configured codec."""
+    return codec().encode(value)
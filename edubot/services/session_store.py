@@ -0,0 +1,362 @@
+"""Every piece of a user's conversation state in one Redis hash."""
+# pylint: disable=import-error
+import base64
+import time
+from contextvars import ContextVar
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+from services import metrics
+from services.session_codec import decode, encode
+from users.models import User
+
+# Hash fields, and the cache key each one replaced.
+STATE = "state"            # {phone}
+HISTORY = "history"        # {phone}_history, kept in a list of its own (history_key)
+QUIZ = "quiz"              # {phone}_quiz_session
+FORM = "form"              # {phone}_session
+NAV = "nav"                # {phone}_nav
+PAYMENT = "payment"        # {phone}_payment
+
+# Drop the entry of the current screen and return the one before it, leaving
+# the oldest entry in place so "back" never runs past the start.
+POP_HISTORY = """
+if redis.call('LLEN', KEYS[1]) < 2 then
+    return false
+end
+redis.call('LPOP', KEYS[1])
+return redis.call('LINDEX', KEYS[1], 0)
+"""
+
+_current = ContextVar("session_store", default=None)
+
+
+def namespace():
+    """
+    Prefix of every session key. Bumping SESSION_VERSION in a release whose
+    states are incompatible starts everyone afresh; the old hashes expire.
+    """
+    return f"edubot:session:v{settings.SESSION_VERSION}"
+
+
+def session_key(phone_number):
+    """Redis key of a user's session hash."""
+    return f"{namespace()}:{phone_number}"
+
+
+def session_pattern():
+    """SCAN pattern matching every session hash of the current version."""
+    return f"{namespace()}:*"
+
+
+def history_key(phone_number):
+    """Redis list of a user's navigation history, newest entry first."""
+    return f"{namespace()}-history:{phone_number}"
+
+
+def dirty_key():
+    """Set of the phone numbers whose session changed since it was last persisted."""
+    return f"{namespace()}-dirty"
+
+
+def snapshot(fields, history, expires_at):
+    """
+    JSON document of a session for User.ongoing_session: its encoded fields,
+    its history list (newest entry first) and when the hash was due to expire.
+    """
+    return {
+        "version": settings.SESSION_VERSION,
+        "saved_at": time.time(),
+        "expires_at": expires_at,
+        "fields": {field: base64.b64encode(raw).decode() for field, raw in fields.items()},
+        "history": [base64.b64encode(raw).decode() for raw in history],
+    }
+
+
+def restore(document):
+    """
+    ``(fields, history)`` of a snapshot, encoded as they were in Redis, or
+    None if the session has expired since or is from another version.
+    """
+    if not document or document.get("version") != settings.SESSION_VERSION:
+        return None
+    # Snapshots taken before the expiry was recorded last SESSION_TTL.
+    expires_at = document.get("expires_at") or document.get("saved_at", 0) + settings.SESSION_TTL
+    if time.time() >= expires_at:
+        # The session expired in Redis rather than being lost; let it go.
+        return None
+    fields = {field: base64.b64decode(raw) for field, raw in document.get("fields", {}).items()}
+    history = [base64.b64decode(raw) for raw in document.get("history", ())]
+    return fields, history
+
+
+class SessionStore(object):
+    """
+        One user's session for the length of a chat turn.
+
+        ``load`` reads every field with a single HGETALL; reads and writes
+        during the turn only touch memory (values are kept encoded, so a
+        handler mutating what it read does not change the session until it
+        writes it back, as with the cache), and ``flush`` writes the fields
+        that changed with one HSET/HDEL + EXPIRE transaction. The hash
+        expires ``SESSION_TTL`` seconds after the last turn that changed it,
+        or later if a longer timeout was asked for.
+
+        Every flush also marks the user dirty, and ``persist_batch`` copies
+        their session and history into User.ongoing_session later on. A
+        session that is missing from Redis is rehydrated from that copy on
+        load, unless it would have expired by then.
+
+        Navigation history is a capped list next to the hash: entries pushed
+        during the turn are written by the same flush, and ``pop_history``
+        takes the previous screen atomically.
+    """
+
+    def __init__(self, phone_number):
+        """Initialize the store."""
+        self.phone_number = phone_number
+        self.key = session_key(phone_number)
+        self.connection = get_redis_connection("default")
+        self.fields = {}
+        self.dirty = set()
+        self.deleted = set()
+        self.timeout = settings.SESSION_TTL
+        self.round_trips = 0
+        self.history_key = history_key(phone_number)
+        self.pushed = []
+        self.history_cleared = False
+
+    def load(self):
+        """Read every field of the session."""
+        raw = self.connection.hgetall(self.key)
+        self.round_trips += 1
+        self.fields = {field.decode(): value for field, value in raw.items()}
+        if not self.fields:
+            self.rehydrate()
+        return self
+
+    def rehydrate(self):
+        """Restore the session from the user's last snapshot, if they have a recent one."""
+        # pylint: disable=no-member
+        document = User.objects.filter(phone_number=self.phone_number).values_list(
+            "ongoing_session", flat=True).first()
+        fields, history = restore(document) or ({}, [])
+        if not fields:
+            return
+        self.fields = fields
+        self.dirty.update(fields)
+        if history:
+            # Written now rather than on flush, so "back" works in this turn.
+            pipeline = self.connection.pipeline()
+            pipeline.delete(self.history_key)
+            pipeline.rpush(self.history_key, *history)
+            pipeline.expire(self.history_key, self.timeout)
+            pipeline.execute()
+            self.round_trips += 1
+        metrics.incr("session.rehydrated")
+
+    def get(self, field, default=None):
+        """Return a field, or ``default`` if it is not set."""
+        raw = self.fields.get(field)
+        return default if raw is None else decode(raw)
+
+    def set(self, field, value, timeout=None):
+        """Stage a field for the next flush."""
+        self.fields[field] = encode(value)
+        self.dirty.add(field)
+        self.deleted.discard(field)
+        if timeout:
+            self.timeout = max(self.timeout, timeout)
+
+    def delete(self, *fields):
+        """Stage fields for removal."""
+        for field in fields:
+            if field == HISTORY:
+                self.pushed = []
+                self.history_cleared = True
+                continue
+            self.fields.pop(field, None)
+            self.dirty.discard(field)
+            self.deleted.add(field)
+
+    def push_history(self, entry):
+        """Stage a history entry for the next flush."""
+        self.pushed.append(encode(entry))
+
+    def pop_history(self):
+        """Drop the current screen from the history and return the previous entry, or None."""
+        raw = self.connection.register_script(POP_HISTORY)(keys=[self.history_key])
+        self.round_trips += 1
+        return None if raw is None else decode(raw)
+
+    def flush(self):
+        """Write the staged changes, returning False if there were none."""
+        if not (self.dirty or self.deleted or self.pushed or self.history_cleared):
+            return False
+        pipeline = self.connection.pipeline()
+        if self.history_cleared:
+            pipeline.delete(self.history_key)
+        if self.pushed:
+            pipeline.lpush(self.history_key, *self.pushed)
+            pipeline.ltrim(self.history_key, 0, settings.SESSION_HISTORY_LENGTH - 1)
+            pipeline.expire(self.history_key, self.timeout)
+        if self.deleted:
+            pipeline.hdel(self.key, *self.deleted)
+        if self.dirty:
+            pipeline.hset(self.key, mapping={field: self.fields[field] for field in self.dirty})
+        pipeline.expire(self.key, self.timeout)
+        pipeline.sadd(dirty_key(), self.phone_number)
+        pipeline.execute()
+        self.round_trips += 1
+        self.dirty.clear()
+        self.deleted.clear()
+        self.pushed = []
+        self.history_cleared = False
+        return True
+
+
+class turn(object):  # pylint: disable=invalid-name
+    """
+        Context manager around one chat turn for ``phone_number``.
+
+        Loads the session on entry and makes it the store that ``get``,
+        ``put`` and ``delete`` use for that number until the turn ends, when
+        the changes are flushed even if the turn failed part way, as the
+        per-key writes it replaces would have been.
+    """
+
+    def __init__(self, phone_number):
+        """Initialize the turn."""
+        self.store = SessionStore(phone_number)
+        self.token = None
+        # The turn's metrics are written together when it ends.
+        self.metrics = metrics.batch()
+
+    def __enter__(self):
+        self.metrics.__enter__()
+        try:
+            self.store.load()
+        except Exception as error:
+            self.metrics.__exit__(type(error), error, error.__traceback__)
+            raise
+        self.token = _current.set(self.store)
+        return self.store
+
+    def __exit__(self, exc_type, exc, traceback):
+        _current.reset(self.token)
+        try:
+            self.store.flush()
+            metrics.incr("session.turns")
+            metrics.incr("session.round_trips", self.store.round_trips)
+        finally:
+            self.metrics.__exit__(exc_type, exc, traceback)
+        return False
+
+    async def __aenter__(self):
+        await self.metrics.__aenter__()
+        try:
+            await sync_to_async(self.store.load)()
+        except Exception as error:
+            await self.metrics.__aexit__(type(error), error, error.__traceback__)
+            raise
+        self.token = _current.set(self.store)
+        return self.store
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        _current.reset(self.token)
+        try:
+            await sync_to_async(self.store.flush)()
+            metrics.incr("session.turns")
+            metrics.incr("session.round_trips", self.store.round_trips)
+        finally:
+            await self.metrics.__aexit__(exc_type, exc, traceback)
+        return False
+
+
+def current(phone_number):
+    """Return the store of the turn being handled for ``phone_number``, if any."""
+    store = _current.get()
+    if store is not None and store.phone_number == phone_number:
+        return store
+    return None
+
+
+def get(phone_number, field, default=None):
+    """Read a session field, from the running turn or straight from Redis."""
+    store = current(phone_number)
+    if store is not None:
+        return store.get(field, default)
+    raw = get_redis_connection("default").hget(session_key(phone_number), field)
+    return default if raw is None else decode(raw)
+
+
+def put(phone_number, field, value, timeout=None):
+    """Write a session field, staged on the running turn or straight to Redis."""
+    store = current(phone_number)
+    if store is None:
+        store = SessionStore(phone_number)
+        store.set(field, value, timeout)
+        store.flush()
+    else:
+        store.set(field, value, timeout)
+
+
+def delete(phone_number, *fields):
+    """Remove session fields, staged on the running turn or straight from Redis."""
+    store = current(phone_number)
+    if store is None:
+        store = SessionStore(phone_number)
+        store.delete(*fields)
+        store.flush()
+    else:
+        store.delete(*fields)
+
+
+def push_history(phone_number, entry):
+    """Add an entry to the user's history, staged on the running turn or written now."""
+    store = current(phone_number)
+    if store is None:
+        store = SessionStore(phone_number)
+        store.push_history(entry)
+        store.flush()
+    else:
+        store.push_history(entry)
+
+
+def pop_history(phone_number):
+    """Go back one entry in the user's history, returning the entry to restore or None."""
+    return (current(phone_number) or SessionStore(phone_number)).pop_history()
+
+
+def persist_batch(batch_size):
+    """
+    Copy up to ``batch_size`` changed sessions into User.ongoing_session,
+    returning how many were taken off the dirty set.
+    """
+    connection = get_redis_connection("default")
+    phone_numbers = [phone.decode() for phone in connection.spop(dirty_key(), batch_size) or []]
+    if not phone_numbers:
+        return 0
+    pipeline = connection.pipeline()
+    for phone_number in phone_numbers:
+        pipeline.hgetall(session_key(phone_number))
+        pipeline.pttl(session_key(phone_number))
+        pipeline.lrange(history_key(phone_number), 0, -1)
+    replies = pipeline.execute()
+    sessions = {
+        phone_number: replies[index * 3:index * 3 + 3]
+        for index, phone_number in enumerate(phone_numbers)
+    }
+    now = time.time()
+    # pylint: disable=no-member
+    users = list(User.objects.filter(phone_number__in=phone_numbers))
+    for user in users:
+        fields, ttl, history = sessions[user.phone_number]
+        user.ongoing_session = snapshot(
+            {field.decode(): raw for field, raw in fields.items()},
+            history,
+            now + ttl / 1000 if ttl > 0 else now + settings.SESSION_TTL,
+        ) if fields else {}
+    User.objects.bulk_update(users, ["ongoing_session"])
+    metrics.incr("session.persisted", len(users))
+    return len(phone_numbers)
@@ -0,0 +1,72 @@
+"""ACTION_TABLE compiled once into an immutable transition table."""
+# pylint: disable=import-error
+from collections import namedtuple
+from types import MappingProxyType
+from django.core.exceptions import ImproperlyConfigured
+from services.action_table import ACTION_TABLE
+from services import flows
+from services.intent_router import ROUTER
+
+Transition = namedtuple("Transition", [
+    "state",
+    "handler",
+    "next_if_valid",
+    "next_if_invalid",
+    "valid_response",
+    "invalid_response",
+    "response_type",
+])
+
+
+def targets(next_action):
+    """The states a ``next_action_*`` value can lead to."""
+    return [next_action] if isinstance(next_action, str) else list(next_action)
+
+
+def freeze(next_action):
+    """Store a list of choices as a tuple so the table cannot be changed."""
+    return next_action if isinstance(next_action, str) else tuple(next_action)
+
+
+def compile_table(table):
+    """
+    Validate ``table`` and compile it into a read-only ``{state: Transition}``.
+
+    Handlers are checked against the flows registry without importing their
+    modules. Raises ImproperlyConfigured listing every unknown handler and
+    every ``next_action_*`` or global intent target that is not a state.
+    """
+    errors = []
+    for state, row in table.items():
+        name = row.get('action_validator')
+        if not flows.exists(name):
+            errors.append(f"{state}: unknown action_validator {name!r}")
+        for key in ("next_action_if_valid", "next_action_if_invalid"):
+            for target in targets(row[key]):
+                if target not in table:
+                    errors.append(f"{state}: {key} leads to unknown state {target!r}")
+    for state in sorted(ROUTER.states()):
+        if state not in table:
+            errors.append(f"global intent leads to unknown state {state!r}")
+    if errors:
+        raise ImproperlyConfigured("Invalid ACTION_TABLE:\n" + "\n".join(errors))
+    return MappingProxyType({
+        state: Transition(
+            state=state,
+            handler=flows.LazyHandler(row['action_validator']),
+            next_if_valid=freeze(row['next_action_if_valid']),
+            next_if_invalid=freeze(row['next_action_if_invalid']),
+            valid_response=row['valid_response'],
+            invalid_response=row['invalid_response'],
+            response_type=row['response_type'],
+        )
+        for state, row in table.items()
+    })
+
+
+TRANSITIONS = compile_table(ACTION_TABLE)
+
+
+def transition(state):
+    """Return the compiled transition of ``state``, None for anything that is not a state."""
+    return TRANSITIONS.get(state) if isinstance(state, str) else None
@@ -0,0 +1,145 @@
+"""Rendered tutorial steps, cached per tutorial content version."""
+# pylint: disable=import-error
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_redis import get_redis_connection
+from tutorials.models import Lesson, Tutorial
+from services import metrics
+from services.flows.base import HOST
+
+logger = logging.getLogger(__name__)
+
+# Hash of tutorial id -> content version, bumped when the tutorial or any of
+# its lessons is saved, reordered or removed. A lesson's version is the
+# version of its tutorial, so a step is found from (tutorial, position)
+# without asking the database which lesson is there.
+VERSION_KEY = "edubot:steps:versions"
+
+# Lessons sent as WhatsApp media messages, keyed by their content type.
+MEDIA = ("image", "video", "audio", "document")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def render(lesson):
+    """
+    The step payload of ``lesson``: its tutorial's step count and the
+    message the chatbot sends, None for content types it cannot send.
+    """
+    if lesson.content_type == "text":
+        message = {
+            "response_type": "tutorial",
+            "text": f"*{lesson.title}*\n\n{lesson.instructions}",
+        }
+    elif lesson.content_type in MEDIA:
+        message = {
+            "response_type": lesson.content_type,
+            "text": f"{lesson.instructions}" if lesson.content_type == "document" else f"*{lesson.title}*\n\n{lesson.instructions}",
+            lesson.content_type: f"{HOST}{lesson.file.url}" if lesson.file else None,
+        }
+    else:
+        message = None
+    return {
+        "lesson": lesson.id,
+        "step_count": lesson.tutorial_class.step_count,
+        "message": message,
+    }
+
+
+def version(tutorial_id):
+    """The content version of a tutorial every process should be serving."""
+    return int(get_redis_connection("default").hget(VERSION_KEY, str(tutorial_id)) or 0)
+
+
+def key(tutorial_id, content_version, position):
+    """Cache key of the rendered step at ``position``."""
+    return f"edubot:step:{tutorial_id}:{content_version}:{position}"
+
+
+def load(tutorial_id, content_version, position):
+    """Render the step at ``position`` from the database and cache it, None past either end."""
+    lesson = Lesson.step(tutorial_id, position)
+    if lesson is None:
+        return None
+    step = render(lesson)
+    cache.set(key(tutorial_id, content_version, position), step, settings.TUTORIAL_STEP_CACHE_TTL)
+    metrics.incr("steps.rendered")
+    return step
+
+
+def step(tutorial_id, position):
+    """
+    The rendered step at ``position`` of a published tutorial, None past
+    either end. Serving a step warms the one after it in the background.
+    """
+    content_version = version(tutorial_id)
+    rendered = cache.get(key(tutorial_id, content_version, position))
+    if rendered is None:
+        metrics.incr("steps.misses")
+        rendered = load(tutorial_id, content_version, position)
+    else:
+        metrics.incr("steps.hits")
+    if rendered is not None and position < rendered["step_count"]:
+        prefetch(tutorial_id, content_version, position + 1)
+    return rendered
+
+
+def warm(tutorial_id, content_version, position):
+    """Render the step at ``position`` unless it is cached already."""
+    close_old_connections()
+    try:
+        if cache.get(key(tutorial_id, content_version, position)) is None:
+            load(tutorial_id, content_version, position)
+    except Exception:  # pylint: disable=broad-except
+        # A step that is not warmed is rendered by the turn that needs it.
+        logger.exception("Could not warm step %s of tutorial %s", position, tutorial_id)
+    finally:
+        close_old_connections()
+
+
+def executor():
+    """Process-wide pool the next steps are rendered in."""
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TUTORIAL_STEP_PREFETCH_WORKERS,
+                thread_name_prefix="step-prefetch",
+            )
+        return _executor
+
+
+def prefetch(tutorial_id, content_version, position):
+    """Warm the step at ``position`` once the turn's transaction is committed."""
+    if not settings.TUTORIAL_STEP_PREFETCH_WORKERS:
+        return
+    transaction.on_commit(
+        lambda: executor().submit(warm, tutorial_id, content_version, position))
+
+
+def bump(tutorial_id):
+    """Invalidate the rendered steps of a tutorial in every process."""
+    get_redis_connection("default").hincrby(VERSION_KEY, str(tutorial_id), 1)
+
+
+# pylint: disable=unused-argument
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    """Bump the lesson's tutorial once the change is committed."""
+    tutorial_id = instance.tutorial_class_id
+    if tutorial_id:
+        transaction.on_commit(lambda: bump(tutorial_id))
+
+
+@receiver([post_save, post_delete], sender=Tutorial)
+def tutorial_changed(sender, instance, **kwargs):
+    """Bump the tutorial once the change is committed."""
+    tutorial_id = instance.id
+    transaction.on_commit(lambda: bump(tutorial_id))
@@ -0,0 +1,128 @@
+"""Classify raw webhook bodies so status callbacks skip the chatbot pipeline."""
+import json
+from services import dedupe, metrics, senders
+
+MESSAGE = "message"
+STATUS = "status"
+UNKNOWN = "unknown"
+
+
+def change_values(payload):
+    """Return the ``value`` of every change in a Cloud API webhook."""
+    return [
+        change.get('value') or {}
+        for entry in payload.get('entry') or []
+        for change in entry.get('changes') or []
+    ]
+
+
+def classify(body):
+    """
+    Return ``(kind, payload)`` for a raw request body.
+
+    Statuses arrive either in the Cloud API envelope (``value.statuses``) or,
+    on the navigation endpoint, as a bare status object with ``recipient_id``.
+    A body that carries any message is a MESSAGE, even if it also has statuses.
+    """
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return UNKNOWN, None
+    if not isinstance(payload, dict):
+        return UNKNOWN, None
+    if "status" in payload and "recipient_id" in payload:
+        return STATUS, payload
+    try:
+        values = change_values(payload)
+    except (AttributeError, TypeError):
+        return UNKNOWN, payload
+    if any(value.get('messages') for value in values):
+        return MESSAGE, payload
+    if any(value.get('statuses') for value in values):
+        return STATUS, payload
+    return UNKNOWN, payload
+
+
+def statuses(payload):
+    """Return the status objects of a payload classified as STATUS."""
+    if "recipient_id" in payload:
+        return [payload]
+    return [status for value in change_values(payload) for status in value.get('statuses') or []]
+
+
+def message_contact(value, message):
+    """Return the contact that sent ``message``, falling back to the first one."""
+    contacts = value.get('contacts') or [{}]
+    for contact in contacts:
+        if contact.get('wa_id') == message.get('from'):
+            return contact
+    return contacts[0]
+
+
+def iter_messages(payload):
+    """
+    Yield every message of a webhook, across all entries and changes, as the
+    flat dict ActionPickerService works with: the change ``value`` narrowed to
+    that one message plus ``body``, ``username`` and ``phone_number``.
+    """
+    for value in change_values(payload):
+        for message in value.get('messages') or []:
+            contact = message_contact(value, message)
+            parsed = dict(value, messages=[message], contacts=[contact])
+            message_type = message['type']
+            if message_type == "text":
+                parsed['body'] = message['text']['body']
+            elif message_type == "button":
+                parsed['body'] = message['button']['payload']
+            elif message_type == "interactive":
+                if message['interactive']['type'] == "button_reply":
+                    parsed['body'] = message['interactive']['button_reply']['id']
+                else:
+                    parsed['body'] = message['interactive']['list_reply']['id']
+            elif message_type == "document":
+                parsed['media_id'] = message['document']['id']
+
+            parsed['username'] = contact['profile']['name']
+            parsed['phone_number'] = contact['wa_id']
+            yield parsed
+
+
+def split_messages(payload):
+    """
+    Yield one single-message webhook per message of a batch.
+
+    Messages are ordered by their WhatsApp timestamp; the sort is stable, so
+    each phone number's messages keep the order Meta delivered them in.
+    """
+    envelopes = []
+    for entry in payload.get('entry') or []:
+        for change in entry.get('changes') or []:
+            value = change.get('value') or {}
+            for message in value.get('messages') or []:
+                envelopes.append({
+                    "object": payload.get('object'),
+                    "entry": [dict(entry, changes=[dict(change, value=dict(
+                        value,
+                        messages=[message],
+                        contacts=[message_contact(value, message)],
+                    ))])],
+                })
+    envelopes.sort(key=lambda envelope: int(
+        envelope['entry'][0]['changes'][0]['value']['messages'][0].get('timestamp') or 0))
+    yield from envelopes
+
+
+def fan_out(payload):
+    """
+    Split a webhook into the single-message webhooks that still need a reply,
+    dropping redeliveries and recording how many messages the batch carried.
+    Each sender is pinned to the number the message arrived on.
+    """
+    envelopes = list(split_messages(payload))
+    metrics.incr("webhook.batches")
+    metrics.incr("webhook.messages_fanned_out", len(envelopes))
+    if len(envelopes) > 1:
+        metrics.incr("webhook.multi_message_batches")
+    envelopes = [envelope for envelope in envelopes if not dedupe.is_replay(envelope)]
+    senders.route_inbound(envelopes)
+    return envelopes
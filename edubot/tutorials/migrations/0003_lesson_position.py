@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+def number_steps(apps, schema_editor):
+    """Position each tutorial's steps in the id order they were played in."""
+    Tutorial = apps.get_model('tutorials', 'Tutorial')
+    Lesson = apps.get_model('tutorials', 'Lesson')
+    numbered = set()
+    for tutorial in Tutorial.objects.all():
+        # A lesson listed in several tutorials keeps the first one.
+        lessons = [lesson for lesson in tutorial.steps.order_by('id') if lesson.id not in numbered]
+        numbered.update(lesson.id for lesson in lessons)
+        for position, lesson in enumerate(lessons, 1):
+            lesson.tutorial_class_id = tutorial.id
+            lesson.position = position
+        Lesson.objects.bulk_update(lessons, ['tutorial_class', 'position'])
+        tutorial.step_count = len(lessons)
+        tutorial.save(update_fields=['step_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorials', '0002_callrequest_call_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='position',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tutorial',
+            name='step_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('tutorial_class', 'position'), name='lesson_tutorial_position'),
+        ),
+        migrations.RunPython(number_steps, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 """Models for the tutorials app."""
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
 class Lesson(models.Model):
     """A lesson is a single unit of instruction."""
@@ -24,17 +25,42 @@ class Lesson(models.Model):
     )
     instructions = models.TextField(default="Instruction", null=False)
     file = models.FileField(upload_to='lessons/', null=True, blank=True)
+    # 1-based place of the lesson in its tutorial, None once it is removed
+    # from the steps.
+    position = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         """Unicode representation of Lesson."""
         return f"{self.title}"
 
+    class Meta:
+        """Meta definition for Lesson."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tutorial_class', 'position'], name='lesson_tutorial_position'),
+        ]
+
     @classmethod
     def lesson_exists(cls, tutorial, title):
         """Check if the lesson exists."""
         #pylint: disable=no-member
         return cls.objects.filter(tutorial_class=tutorial, title=title).exists()
 
+    @classmethod
+    def step(cls, tutorial_id, position):
+        """
+        The lesson at ``position`` of a published tutorial, None past either
+        end. Its ``tutorial_class`` is joined in, so the tutorial's
+        ``step_count`` comes with the same row.
+        """
+        #pylint: disable=no-member
+        return cls.objects.select_related('tutorial_class').filter(
+            tutorial_class_id=tutorial_id,
+            tutorial_class__published=True,
+            position=position,
+        ).first()
+
 class Tutorial(models.Model):
     """A tutorial is a collection of lessons."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -45,11 +71,76 @@ class Tutorial(models.Model):
     steps = models.ManyToManyField('Lesson')
     title = models.CharField(max_length=200)
     description = models.TextField()
+    # Number of positioned lessons, kept by the step methods below.
+    step_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         """Unicode representation of Tutorial."""
         return f"{self.title}"
 
+    def ordered_steps(self):
+        """The tutorial's lessons in step order."""
+        #pylint: disable=no-member
+        return self.tutorial_class.filter(position__isnull=False).order_by('position')
+
+    @transaction.atomic
+    def append_step(self, lesson):
+        """Add ``lesson`` after the last step."""
+        #pylint: disable=no-member
+        tutorial = Tutorial.objects.select_for_update().get(pk=self.pk)
+        lesson.tutorial_class = tutorial
+        lesson.position = tutorial.step_count + 1
+        lesson.save(update_fields=['tutorial_class', 'position'])
+        tutorial.steps.add(lesson)
+        self.step_count = tutorial.step_count = lesson.position
+        tutorial.save(update_fields=['step_count'])
+
+    @transaction.atomic
+    def remove_step(self, lesson_id):
+        """Take a lesson out of the steps, closing the gap it leaves."""
+        #pylint: disable=no-member
+        tutorial = Tutorial.objects.select_for_update().get(pk=self.pk)
+        tutorial.steps.remove(lesson_id)
+        lesson = Lesson.objects.filter(
+            tutorial_class=tutorial, id=lesson_id, position__isnull=False).first()
+        if lesson is None:
+            return
+        Lesson.objects.filter(pk=lesson.pk).update(position=None)
+        # Positions are unique and checked row by row, so the later steps
+        # are moved past the last one before they are shifted into the gap.
+        Lesson.objects.filter(
+            tutorial_class=tutorial, position__gt=lesson.position,
+        ).update(position=F('position') + tutorial.step_count)
+        Lesson.objects.filter(
+            tutorial_class=tutorial, position__gt=tutorial.step_count,
+        ).update(position=F('position') - tutorial.step_count - 1)
+        self.step_count = tutorial.step_count = tutorial.step_count - 1
+        tutorial.save(update_fields=['step_count'])
+
+    @transaction.atomic
+    def reorder_steps(self, lesson_ids):
+        """
+        Renumber the steps in the order of ``lesson_ids``. Returns False,
+        changing nothing, unless the ids are exactly the current steps.
+        """
+        #pylint: disable=no-member
+        tutorial = Tutorial.objects.select_for_update().get(pk=self.pk)
+        lessons = {
+            lesson.id: lesson for lesson in Lesson.objects.filter(
+                tutorial_class=tutorial, position__isnull=False)
+        }
+        if len(lesson_ids) != len(lessons) or set(lesson_ids) != set(lessons):
+            return False
+        for position, lesson_id in enumerate(lesson_ids, 1):
+            lessons[lesson_id].position = position
+        # Clear the old positions first so no two steps share one mid-update.
+        Lesson.objects.filter(pk__in=lesson_ids).update(position=None)
+        Lesson.objects.bulk_update(lessons.values(), ['position'])
+        # bulk_update sends no signals, saving the tutorial tells its
+        # receivers the steps changed.
+        tutorial.save(update_fields=['step_count'])
+        return True
+
 class CallRequest(models.Model):
     """A call request is a request for a call."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
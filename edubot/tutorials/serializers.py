@@ -17,7 +17,7 @@ class TutorialSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Override the to_representation method."""
         representation = super().to_representation(instance)
-        representation['steps'] = StepSerializer(instance=instance.steps.all(), many=True).data
+        representation['steps'] = StepSerializer(instance=instance.ordered_steps(), many=True).data
         representation['course_name'] = instance.course.name
         return representation
     
@@ -31,7 +31,10 @@ class StepSerializer(serializers.ModelSerializer):
     class Meta:
         """Meta class for the lesson model"""
         model = Lesson
-        fields = ['id', 'title', 'instructions', 'tutorial_class', 'content_type', 'file']
+        fields = ['id', 'title', 'instructions', 'tutorial_class', 'content_type', 'file', 'position']
+        read_only_fields = ['position']
+        # Positions are given out by the Tutorial step methods, not validated here.
+        validators = []
         extra_kwargs = {
             'title': {'required': True},
             'instructions': {'required': True},
@@ -63,6 +66,12 @@ class StepSerializer(serializers.ModelSerializer):
         return representation
 
 
+class ReorderStepsSerializer(serializers.Serializer):
+    """Serializer for the new order of a tutorial's steps."""
+    #pylint: disable=abstract-method
+    steps = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
 class CallRequestSerializer(serializers.ModelSerializer):
     """Serializer for the call request model."""
     class Meta:
@@ -103,5 +112,8 @@ class LessonSerializer(serializers.ModelSerializer):
         """Meta class for the lesson model"""
         model = Lesson
         fields = '__all__'
+        read_only_fields = ('position',)
+        # Positions are given out by the Tutorial step methods, not validated here.
+        validators = []
 
     
@@ -1,12 +1,11 @@
 """Views for the tutorials app."""
 import json
+from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.renderers import JSONRenderer
 from rest_framework.decorators import action
 from rest_framework import viewsets
 from django.http import JsonResponse
-from decouple import config
-import requests
 
 #Local imports.
 #pylint: disable=no-name-in-module
@@ -19,6 +18,7 @@ from tutorials.models import (
 from tutorials.serializers import (
     TutorialSerializer,
     StepSerializer,
+    ReorderStepsSerializer,
     LessonSerializer,
     CallRequestSerializer,
     
@@ -27,6 +27,7 @@ from tutorials.serializers import (
 #pylint: disable=no-name-in-module
 from users.permissions import IsStaff
 from users.models import User
+from api.models import OutboundMessage
 
 
 
@@ -52,8 +53,7 @@ class TutorialViewSet(viewsets.ModelViewSet):
         serializer = StepSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
-            serializer.validated_data['tutorial_class'].steps.add(serializer.instance)
-            serializer.validated_data['tutorial_class'].save()
+            serializer.validated_data['tutorial_class'].append_step(serializer.instance)
             return JsonResponse(serializer.data, status=201)
         return JsonResponse(serializer.errors, status=400)
 
@@ -64,12 +64,30 @@ class TutorialViewSet(viewsets.ModelViewSet):
         #pylint: disable=no-member
         tutorial = Tutorial.objects.filter(id=tutorial_id).first()
         #pylint: disable=expression-not-assigned
-        tutorial.steps.remove(step_id) if tutorial and tutorial.steps.filter(id=step_id).exists() else None
+        tutorial.remove_step(int(step_id)) if tutorial else None
         return JsonResponse(
             {"message":"Step removed successfully" if tutorial else "Tutorial not found"},
             status=200 if tutorial else 404
             )
 
+    #pylint: disable=unused-argument
+    @action(detail=True, methods=['post'], url_path='reorder_steps')
+    def reorder_steps(self, request, pk=None):
+        """Renumber the steps of a tutorial in the order of the given lesson ids."""
+        tutorial = self.get_object()
+        serializer = ReorderStepsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        if not tutorial.reorder_steps(serializer.validated_data['steps']):
+            return JsonResponse(
+                {"steps": ["Must list every step of the tutorial exactly once"]},
+                status=400
+            )
+        return JsonResponse(
+            {"steps": StepSerializer(instance=tutorial.ordered_steps(), many=True).data},
+            status=200
+        )
+
 
 class CallRequestViewSet(viewsets.ModelViewSet):
     """Viewset for the CallRequest model."""
@@ -87,6 +105,7 @@ class CallRequestViewSet(viewsets.ModelViewSet):
             return CallRequest.objects.all()
         return CallRequest.objects.filter(course__instructors__in=self.request.user)
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         data =  super().update(request, *args, **kwargs)
         if data.status_code == 200:
@@ -122,12 +141,7 @@ class CallRequestViewSet(viewsets.ModelViewSet):
                     }
                 })
             }
-            url = f"https://graph.facebook.com/v15.0/{config('Phone_Number_ID')}/messages"
-            requests.post(
-                url=url,
-                data=payload,
-                headers={'Authorization': f'Bearer {config("CLOUD_API_TOKEN")}'}
-            )
+            OutboundMessage.enqueue(payload)
         return data
 
 
@@ -152,4 +166,23 @@ class LessonViewSet(viewsets.ModelViewSet):
     renderer_classes = [JSONRenderer]
     serializer_class = LessonSerializer
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Move the lesson's step to the end of the tutorial it is reassigned to."""
+        lesson = serializer.instance
+        tutorial = serializer.validated_data.get('tutorial_class', lesson.tutorial_class)
+        moved = bool(lesson.position) and getattr(tutorial, 'pk', None) != lesson.tutorial_class_id
+        if moved:
+            lesson.tutorial_class.remove_step(lesson.id)
+            lesson.position = None
+        serializer.save()
+        if moved and tutorial is not None:
+            tutorial.append_step(serializer.instance)
+
+    def perform_destroy(self, instance):
+        """Close the gap the lesson leaves in its tutorial's steps."""
+        if instance.tutorial_class_id and instance.position:
+            instance.tutorial_class.remove_step(instance.id)
+        instance.delete()
+
     
\ No newline at end of file